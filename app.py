@@ -1,10 +1,27 @@
+import time
+SCRIPT_START = time.perf_counter()
+
+import hashlib
+import json
+import logging
+import os
+
 import streamlit as st
 import pandas as pd
 import numpy as np
-import joblib
-import plotly.graph_objects as go
-import plotly.express as px
-from datetime import datetime
+
+from instrumentation import PROFILER, memory_high_water_bytes
+from registry import ModelHandle, ModelRegistry, load_local_model, warm_up
+from response_surface import ResponseSurface
+from rollups import add_yield_proxy, load_rollups, year_over_year
+from schema import DASHBOARD_INPUTS, FeatureSchema, SchemaError, schema_path
+from scoring import score_batch, ward_multipliers
+from surrogate import LatencyBudget, load_surrogate as load_surrogate_artifact
+from tiering import DASHBOARD_TIERS
+# plotly is imported inside the sections that draw figures, after first paint
+
+IMPORT_SECONDS = time.perf_counter() - SCRIPT_START
+logger = logging.getLogger("mkulima.dashboard")
 
 # ==================== CONFIGURATION ====================
 st.set_page_config(
@@ -12,18 +29,72 @@ st.set_page_config(
     page_icon="",
     layout="wide"
 )
+PROFILER.start_rerun()
 
 # ==================== LOAD YOUR RF MODEL ====================
-@st.cache_resource
+# Versioned models are published to the registry by the training notebook;
+# MODEL_PATH is only used when the registry is empty
+MODEL_REGISTRY_DIR = os.environ.get(
+    "MKULIMA_MODEL_REGISTRY",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "model_registry")
+)
+MODEL_PATH = os.environ.get("MKULIMA_MODEL_PATH", "sweet_popatoes_stress_model.pkl")
+# How long the Risk Assessment tab waits for a model still loading in the background
+MODEL_WAIT_SECONDS = float(os.environ.get("MKULIMA_MODEL_WAIT", "30"))
+# Full-model predict time above which predictions switch to the version's
+# distilled surrogate, when one was exported
+LATENCY_BUDGET_MS = float(os.environ.get("MKULIMA_LATENCY_BUDGET_MS", "250"))
+
+@PROFILER.cache(st.cache_resource, "get_model_handle")
+def get_model_handle():
+    # One handle per process; the watcher thread loads and warms the first
+    # model in the background and swaps new versions into it, so this cache
+    # entry never has to be cleared
+    handle = ModelHandle(ModelRegistry(MODEL_REGISTRY_DIR))
+    return handle.start_watcher(load_now=True)
+
+@PROFILER.cache(st.cache_resource, "load_model")
 def load_model():
-    try:
-        model = joblib.load(r"D:\MKULIMA_SHAPEUP\sweet_popatoes_stress_model (1).pkl")
-        return model
-    except:
-        st.warning("Model not found. Using simulated predictions.")
+    model = load_local_model(MODEL_PATH)
+    if model is not None:
+        warm_up(model)
+    return model
+
+@st.cache_resource
+def process_startup():
+    # Timings of the first rerun in this process (cold start)
+    return {}
+
+# Starts loading now; nothing waits for it until the Risk Assessment tab
+model_handle = get_model_handle()
+
+@st.cache_resource
+def load_feature_schema(version):
+    # Schema published with a registry version, or saved next to MODEL_PATH
+    if version is not None:
+        published = model_handle.registry.load_manifest(version).get('feature_schema')
+        return FeatureSchema.from_dict(published) if published else FeatureSchema.default()
+    path = schema_path(MODEL_PATH)
+    return FeatureSchema.load(path) if os.path.exists(path) else FeatureSchema.default()
+
+@PROFILER.cache(st.cache_resource, "load_surface")
+def load_surface(version):
+    # Precomputed slider response surface for this model version, memory-mapped
+    path = model_handle.registry.surface_path(version)
+    if not os.path.exists(path + ".npy"):
         return None
+    return ResponseSurface.load(path)
+
+@PROFILER.cache(st.cache_resource, "load_surrogate")
+def load_surrogate(version):
+    # (FlatForest, metrics) distilled from this model version, or None
+    return load_surrogate_artifact(model_handle.registry.surrogate_path(version))
+
+@st.cache_resource
+def latency_budget(version):
+    # Shared by all sessions so every user's predictions inform the switch
+    return LatencyBudget(LATENCY_BUDGET_MS)
 
-model = load_model()
 
 # ==================== GATUNDU NORTH WARDS DATA ====================
 GATUNDU_NORTH_WARDS = {
@@ -115,12 +186,31 @@ st.sidebar.markdown(f"""
 - Drought Tolerance: {SWEET_POTATO_PROFILE['drought_tolerance']}
 """)
 
+# Header and sidebar are on screen; everything below may import or load more
+startup_timings = {
+    'imports_s': IMPORT_SECONDS,
+    'first_paint_s': time.perf_counter() - SCRIPT_START,
+}
+
 # ==================== MAIN DASHBOARD ====================
 tab1, tab2, tab3 = st.tabs(["📊 Ward Comparison", "🎯 Risk Assessment", "📈 Historical Analysis"])
 
-with tab1:
-    st.header("Ward-to-Ward Comparison")
-    
+# ==================== CACHED WARD TABLES & FIGURES ====================
+# Derived tables and figures depend only on GATUNDU_NORTH_WARDS, so they are
+# built once per data version instead of on every rerun
+WARDS_DATA_VERSION = hashlib.sha1(
+    json.dumps(GATUNDU_NORTH_WARDS, sort_keys=True).encode()
+).hexdigest()
+
+# Fragments rerun only their own section when their widgets change
+fragment = getattr(st, "fragment", None) or getattr(st, "experimental_fragment", lambda f: f)
+
+@st.cache_data
+def ward_color_map(data_version):
+    return {ward: data['color'] for ward, data in GATUNDU_NORTH_WARDS.items()}
+
+@st.cache_data
+def build_ward_comparison(data_version):
     # FIXED: Clean market access values and handle them properly
     market_access_levels = ["Poor", "Moderate", "Good", "Excellent"]
     
@@ -139,7 +229,7 @@ with tab1:
         # Convert population string to integer
         try:
             population_int = int(data['population'].replace(',', ''))
-        except:
+        except ValueError:
             population_int = 40000  # Default value
         
         comparison_data.append({
@@ -154,81 +244,75 @@ with tab1:
             'Risk Score': np.random.uniform(0.2, 0.8)  # Simulated for now
         })
     
-    df_comparison = pd.DataFrame(comparison_data)
+    return pd.DataFrame(comparison_data)
+
+@PROFILER.cache(st.cache_resource, "build_comparison_figures")
+def build_comparison_figures(data_version):
+    import plotly.express as px
+    import plotly.graph_objects as go
     
-    # Visual comparison
-    col1, col2 = st.columns(2)
+    df_comparison = build_ward_comparison(data_version)
+    color_map = ward_color_map(data_version)
     
-    with col1:
-        # Yield comparison
-        fig_yield = px.bar(df_comparison, 
-                          x='Ward', 
-                          y='Avg Yield (ton/ha)',
-                          color='Ward',
-                          color_discrete_map={
-                              ward: data['color'] 
-                              for ward, data in GATUNDU_NORTH_WARDS.items()
-                          },
-                          title="Sweet Potato Yield by Ward",
-                          text='Avg Yield (ton/ha)')
-        fig_yield.update_traces(texttemplate='%{text:.1f}', textposition='outside')
-        st.plotly_chart(fig_yield, use_container_width=True)
-        
-        # Irrigation coverage
-        fig_irrigation = px.pie(df_comparison,
-                               values='Irrigation %',
-                               names='Ward',
-                               title="Irrigation Coverage by Ward",
-                               color='Ward',
-                               color_discrete_map={
-                                   ward: data['color'] 
-                                   for ward, data in GATUNDU_NORTH_WARDS.items()
-                               })
-        st.plotly_chart(fig_irrigation, use_container_width=True)
+    # Yield comparison
+    fig_yield = px.bar(df_comparison, 
+                      x='Ward', 
+                      y='Avg Yield (ton/ha)',
+                      color='Ward',
+                      color_discrete_map=color_map,
+                      title="Sweet Potato Yield by Ward",
+                      text='Avg Yield (ton/ha)')
+    fig_yield.update_traces(texttemplate='%{text:.1f}', textposition='outside')
     
-    with col2:
-        # Area under cultivation
-        fig_area = px.bar(df_comparison,
-                         x='Ward',
-                         y='Sweet Potato Area (ha)',
-                         color='Ward',
-                         color_discrete_map={
-                             ward: data['color'] 
-                             for ward, data in GATUNDU_NORTH_WARDS.items()
-                         },
-                         title="Sweet Potato Cultivation Area",
-                         text='Sweet Potato Area (ha)')
-        fig_area.update_traces(texttemplate='%{text:.0f} ha', textposition='outside')
-        st.plotly_chart(fig_area, use_container_width=True)
-        
-        # Risk radar chart - FIXED: Use Market Access Index instead of trying to find string
-        fig_radar = go.Figure()
-        
-        for ward in GATUNDU_NORTH_WARDS.keys():
-            ward_df = df_comparison[df_comparison['Ward'] == ward]
-            fig_radar.add_trace(go.Scatterpolar(
-                r=[
-                    ward_df['Avg Yield (ton/ha)'].values[0]/10,  # Scale down
-                    ward_df['Irrigation %'].values[0]/20,        # Scale down
-                    ward_df['Market Access Index'].values[0]/3,  # Scale to 0-1
-                    1 - ward_df['Risk Score'].values[0]          # Inverted risk
-                ],
-                theta=['Yield', 'Irrigation', 'Market', 'Safety'],
-                name=ward,
-                fill='toself'
-            ))
-        
-        fig_radar.update_layout(
-            polar=dict(
-                radialaxis=dict(
-                    visible=True,
-                    range=[0, 1]
-                )),
-            showlegend=True,
-            title="Ward Performance Radar Chart"
-        )
-        st.plotly_chart(fig_radar, use_container_width=True)
+    # Irrigation coverage
+    fig_irrigation = px.pie(df_comparison,
+                           values='Irrigation %',
+                           names='Ward',
+                           title="Irrigation Coverage by Ward",
+                           color='Ward',
+                           color_discrete_map=color_map)
+    
+    # Area under cultivation
+    fig_area = px.bar(df_comparison,
+                     x='Ward',
+                     y='Sweet Potato Area (ha)',
+                     color='Ward',
+                     color_discrete_map=color_map,
+                     title="Sweet Potato Cultivation Area",
+                     text='Sweet Potato Area (ha)')
+    fig_area.update_traces(texttemplate='%{text:.0f} ha', textposition='outside')
+    
+    # Risk radar chart - one trace per row, no per-ward filtering
+    radar = pd.DataFrame({
+        'Ward': df_comparison['Ward'],
+        'Yield': df_comparison['Avg Yield (ton/ha)'] / 10,           # Scale down
+        'Irrigation': df_comparison['Irrigation %'] / 20,           # Scale down
+        'Market': df_comparison['Market Access Index'] / 3,         # Scale to 0-1
+        'Safety': 1 - df_comparison['Risk Score']                   # Inverted risk
+    })
+    fig_radar = go.Figure()
+    for row in radar.itertuples(index=False):
+        fig_radar.add_trace(go.Scatterpolar(
+            r=[row.Yield, row.Irrigation, row.Market, row.Safety],
+            theta=['Yield', 'Irrigation', 'Market', 'Safety'],
+            name=row.Ward,
+            fill='toself'
+        ))
+    
+    fig_radar.update_layout(
+        polar=dict(
+            radialaxis=dict(
+                visible=True,
+                range=[0, 1]
+            )),
+        showlegend=True,
+        title="Ward Performance Radar Chart"
+    )
     
+    return fig_yield, fig_irrigation, fig_area, fig_radar
+
+@fragment
+def ward_details_section():
     # Detailed ward information
     st.subheader(" Detailed Ward Profiles")
     selected_ward = st.selectbox("Select ward for details:", list(GATUNDU_NORTH_WARDS.keys()))
@@ -265,8 +349,27 @@ with tab1:
         for risk in ward_data['risk_factors']:
             st.write(f"⚠️ {risk}")
 
-# Rest of your code remains the same...
-with tab2:
+with tab1, PROFILER.span("tab1"):
+    st.header("Ward-to-Ward Comparison")
+    
+    fig_yield, fig_irrigation, fig_area, fig_radar = build_comparison_figures(WARDS_DATA_VERSION)
+    
+    # Visual comparison
+    col1, col2 = st.columns(2)
+    
+    with PROFILER.span("plotly_chart"):
+        with col1:
+            st.plotly_chart(fig_yield, use_container_width=True)
+            st.plotly_chart(fig_irrigation, use_container_width=True)
+        
+        with col2:
+            st.plotly_chart(fig_area, use_container_width=True)
+            st.plotly_chart(fig_radar, use_container_width=True)
+    
+    ward_details_section()
+
+@fragment
+def risk_assessment_section():
     st.header(" Sweet Potato Risk Assessment")
     st.markdown("**Using your Random Forest model for stress prediction**")
     
@@ -328,48 +431,53 @@ with tab2:
                 )
                 
                 ward_inputs[ward] = [lst, soil_moisture, ndvi]
+                
+                # Live feedback from the precomputed surface, no forest call
+                if surface is not None:
+                    live_stress = surface.query(ward_inputs[ward])[0] * ward_multipliers([ward])[0]
+                    st.metric(
+                        "Live stress",
+                        f"{live_stress:.3f}",
+                        DASHBOARD_TIERS.classify([live_stress])[0],
+                        delta_color="off",
+                        help=f"Interpolated (max error {surface.error['max_abs']:.3f})" if surface.error else None
+                    )
         
         # Run RF predictions
-        if st.button("Run Random Forest Predictions", type="primary"):
+        if st.button("Run Random Forest Predictions", type="primary", disabled=model_error is not None):
             st.subheader(" Prediction Results")
             
-            results = []
+            # Score every selected ward in a single batch call
+            wards = list(ward_inputs.keys())
+            features_array = np.array([ward_inputs[w] for w in wards])
+            PROFILER.observe("predict_batch_rows", len(features_array))
+            use_surrogate = surrogate is not None and budget.use_surrogate()
+            predictor = surrogate[0] if use_surrogate else model
+            predict_start = time.perf_counter()
+            with PROFILER.span("predict_surrogate" if use_surrogate else "predict"):
+                scored = score_batch(predictor, features_array, wards=wards, schema=slider_schema)
+            if not use_surrogate and model is not None:
+                budget.record((time.perf_counter() - predict_start) * 1000)
+            if use_surrogate:
+                metrics = surrogate[1]
+                st.caption(
+                    f"Scored with the compact surrogate: the full model is taking "
+                    f"{budget.median_ms:.0f} ms (budget {LATENCY_BUDGET_MS:.0f} ms). "
+                    f"Surrogate error vs. the full model: p99 {metrics['p99_abs']:.3f}, "
+                    f"{metrics['tier_agreement']:.1%} same risk tier."
+                )
             
-            for ward, features in ward_inputs.items():
-                features_array = np.array([features])
-                
-                if model is not None:
-                    # Use actual RF model
-                    try:
-                        if hasattr(model, 'predict_proba'):
-                            stress_prob = model.predict_proba(features_array)[0][1]
-                        else:
-                            stress_prob = float(model.predict(features_array)[0])
-                    except:
-                        # Fallback calculation
-                        stress_prob = (features[0]/40 * 0.4) + ((100-features[1])/100 * 0.4) + ((1-features[2])/2 * 0.2)
-                else:
-                    # Simulated prediction
-                    stress_prob = (features[0]/40 * 0.4) + ((100-features[1])/100 * 0.4) + ((1-features[2])/2 * 0.2)
-                
-                # Adjust based on ward characteristics
-                if ward == "Gituamba":
-                    stress_prob *= 1.2  # Higher risk area
-                elif ward == "Kamwangi":
-                    stress_prob *= 0.9  # Better conditions
-                
-                results.append({
-                    'Ward': ward,
-                    'LST': features[0],
-                    'Soil Moisture': features[1],
-                    'NDVI': features[2],
-                    'Stress Probability': stress_prob,
-                    'Risk Level': 'HIGH' if stress_prob > 0.6 else ('MODERATE' if stress_prob > 0.3 else 'LOW')
+            with PROFILER.span("results_dataframe"):
+                results_df = pd.DataFrame({
+                    'Ward': wards,
+                    'LST': features_array[:, 0],
+                    'Soil Moisture': features_array[:, 1],
+                    'NDVI': features_array[:, 2],
+                    'Stress Probability': scored['Stress Probability'].values,
+                    'Risk Level': scored['Risk Level'].values
                 })
             
             # Display results
-            results_df = pd.DataFrame(results)
-            
             col1, col2 = st.columns(2)
             
             with col1:
@@ -383,40 +491,80 @@ with tab2:
             
             with col2:
                 # Comparative bar chart
-                fig = px.bar(results_df,
-                            x='Ward',
-                            y='Stress Probability',
-                            color='Risk Level',
-                            color_discrete_map={
-                                'LOW': '#4CAF50',
-                                'MODERATE': '#FFC107',
-                                'HIGH': '#F44336'
-                            },
-                            title="Stress Probability by Ward",
-                            text='Stress Probability')
-                fig.update_traces(texttemplate='%{text:.3f}', textposition='outside')
-                st.plotly_chart(fig, use_container_width=True)
+                import plotly.express as px
+                with PROFILER.span("figure"):
+                    fig = px.bar(results_df,
+                                x='Ward',
+                                y='Stress Probability',
+                                color='Risk Level',
+                                color_discrete_map=DASHBOARD_TIERS.color_map(),
+                                title="Stress Probability by Ward",
+                                text='Stress Probability')
+                    fig.update_traces(texttemplate='%{text:.3f}', textposition='outside')
+                with PROFILER.span("plotly_chart"):
+                    st.plotly_chart(fig, use_container_width=True)
             
             # Insurance recommendations
             st.subheader("💰 Insurance Recommendations")
             
-            for result in results:
+            for ward, risk_level, premium in zip(wards, scored['Risk Level'], scored['Premium']):
                 col_a, col_b = st.columns([1, 3])
                 with col_a:
-                    st.metric(f"{result['Ward']}", result['Risk Level'])
+                    st.metric(f"{ward}", risk_level)
                 
                 with col_b:
-                    if result['Stress Probability'] > 0.6:
-                        st.write("**High Premium (25-40% increase)** - Consider yield protection insurance")
-                    elif result['Stress Probability'] > 0.3:
-                        st.write("**Moderate Premium (10-20% increase)** - Standard coverage with monitoring")
-                    else:
-                        st.write("**Low Premium (0-10% increase)** - Basic coverage sufficient")
-
-with tab3:
-    st.header("📈 Historical Sweet Potato Performance")
-    
-    # Generate historical data
+                    st.write(premium)
+
+# ==================== MODEL ====================
+# First use of the model: wait for the background load (usually finished
+# while tab 1 was rendering)
+wait_start = time.perf_counter()
+with PROFILER.span("model_wait"):
+    # Read model and manifest together so a concurrent swap can't mix versions
+    model, model_manifest = model_handle.wait_ready(MODEL_WAIT_SECONDS)
+    if model is None and model_handle.ready.is_set():
+        model = load_model()
+startup_timings['model_wait_s'] = time.perf_counter() - wait_start
+startup_timings['model_load_s'] = model_handle.load_seconds
+surface = load_surface(model_manifest['version']) if model_manifest else None
+surrogate = load_surrogate(model_manifest['version']) if model_manifest else None
+budget = latency_budget(model_manifest['version'] if model_manifest else None)
+
+# Sliders -> the model's exact input matrix; a model that doesn't match its
+# schema is reported instead of silently scored with the fallback formula
+slider_schema, model_error = None, None
+if model is not None:
+    try:
+        feature_schema = load_feature_schema(model_manifest['version'] if model_manifest else None)
+        slider_schema = feature_schema.check_model(model).compile(DASHBOARD_INPUTS)
+    except SchemaError as exc:
+        model_error = str(exc)
+    if surrogate is not None and slider_schema is not None:
+        try:
+            feature_schema.check_model(surrogate[0])
+        except SchemaError:
+            surrogate = None
+
+with tab2, PROFILER.span("tab2"):
+    if model_handle.last_error:
+        st.warning(f"Could not load the latest registry model ({model_handle.last_error}).")
+    if model_error:
+        st.error(f"The model does not match its feature schema: {model_error}")
+    if model is None and not model_handle.ready.is_set():
+        st.info("The model is still loading. Using simulated predictions for now.")
+    elif model is None:
+        st.warning(f"No model in {MODEL_REGISTRY_DIR} or at {MODEL_PATH}. Using simulated predictions.")
+    risk_assessment_section()
+
+# Materialized ward/year rollups written by the training notebook
+ROLLUP_DIR = os.environ.get(
+    "MKULIMA_ROLLUP_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "rollups")
+)
+
+@st.cache_data
+def simulated_history(data_version):
+    # Generate historical data (used until real rollups are materialized)
     years = list(range(2018, 2024))
     
     # Create ward-specific historical trends
@@ -451,7 +599,25 @@ with tab3:
                 'Temperature (°C)': np.random.uniform(22, 28)
             })
     
-    hist_df = pd.DataFrame(historical_data)
+    return pd.DataFrame(historical_data)
+
+@PROFILER.cache(st.cache_data(ttl=600), "load_history")
+def load_history(data_version):
+    # Returns (yearly table, is_simulated)
+    rollups = load_rollups(ROLLUP_DIR)
+    if rollups is None:
+        return simulated_history(data_version), True
+    base_yields = {ward: data['avg_yield_ton_ha'] for ward, data in GATUNDU_NORTH_WARDS.items()}
+    return add_yield_proxy(rollups[0], base_yields), False
+
+@fragment
+def historical_section():
+    st.header("📈 Historical Sweet Potato Performance")
+    
+    hist_df, simulated = load_history(WARDS_DATA_VERSION)
+    if simulated:
+        st.caption(f"Simulated history: no materialized rollups found in {ROLLUP_DIR}")
+    first_year, last_year = int(hist_df['Year'].min()), int(hist_df['Year'].max())
     
     # Interactive visualization
     st.subheader("Yield Trends Over Time")
@@ -466,44 +632,43 @@ with tab3:
         filtered_df = hist_df[hist_df['Ward'].isin(selected_wards_hist)]
         
         # Line chart for yield trends
-        fig = px.line(filtered_df,
-                     x='Year',
-                     y='Yield (ton/ha)',
-                     color='Ward',
-                     markers=True,
-                     title="Sweet Potato Yield Trends (2018-2023)",
-                     color_discrete_map={
-                         ward: data['color'] 
-                         for ward, data in GATUNDU_NORTH_WARDS.items()
-                     })
-        st.plotly_chart(fig, use_container_width=True)
+        import plotly.express as px
+        with PROFILER.span("figure"):
+            fig = px.line(filtered_df,
+                         x='Year',
+                         y='Yield (ton/ha)',
+                         color='Ward',
+                         markers=True,
+                         title=f"Sweet Potato Yield Trends ({first_year}-{last_year})",
+                         color_discrete_map=ward_color_map(WARDS_DATA_VERSION))
+        with PROFILER.span("plotly_chart"):
+            st.plotly_chart(fig, use_container_width=True)
         
         # Show 2021 drought impact
         st.subheader(" 2021 Drought Impact Analysis")
         
-        # Calculate impact
-        impact_data = []
-        for ward in selected_wards_hist:
-            ward_data = hist_df[hist_df['Ward'] == ward]
-            normal_yield = ward_data[ward_data['Year'] == 2020]['Yield (ton/ha)'].values[0]
-            drought_yield = ward_data[ward_data['Year'] == 2021]['Yield (ton/ha)'].values[0]
-            reduction = ((normal_yield - drought_yield) / normal_yield) * 100
-            
-            impact_data.append({
-                'Ward': ward,
-                'Normal Yield (2020)': normal_yield,
-                'Drought Yield (2021)': drought_yield,
-                'Reduction %': reduction
+        if {2020, 2021} <= set(hist_df['Year']):
+            # Calculate impact for all selected wards at once
+            impact_df = year_over_year(hist_df, 'Yield (ton/ha)', 2020, 2021, selected_wards_hist)
+            impact_df = impact_df.rename(columns={
+                'base': 'Normal Yield (2020)',
+                'compare': 'Drought Yield (2021)'
             })
-        
-        impact_df = pd.DataFrame(impact_data)
-        st.dataframe(impact_df.style.format({
-            'Normal Yield (2020)': '{:.1f}',
-            'Drought Yield (2021)': '{:.1f}',
-            'Reduction %': '{:.1f}%'
-        }), use_container_width=True)
+            st.dataframe(impact_df.style.format({
+                'Normal Yield (2020)': '{:.1f}',
+                'Drought Yield (2021)': '{:.1f}',
+                'Reduction %': '{:.1f}%'
+            }), use_container_width=True)
+        else:
+            st.info("2020 and 2021 are not both covered by the available history.")
+
+with tab3, PROFILER.span("tab3"):
+    historical_section()
 
 # ==================== FOOTER ====================
+if model_manifest:
+    st.sidebar.caption(f"Model {model_manifest['version']} · {model_manifest['sha256'][:12]}")
+
 st.sidebar.markdown("---")
 st.sidebar.markdown("###  Sweet Potato Notes")
 st.sidebar.info("""
@@ -521,4 +686,32 @@ st.sidebar.write("""
 **Chania Ward**: Best market access  
 **Githobokoni Ward**: Good soils, frost risk  
 **Gituamba Ward**: Highest yields, urban pressure
-""")
\ No newline at end of file
+""")
+
+# ==================== STARTUP TIMINGS ====================
+startup_timings['script_s'] = time.perf_counter() - SCRIPT_START
+st.session_state['startup_timings'] = startup_timings
+cold_start = process_startup()
+if not cold_start:
+    cold_start.update(startup_timings)
+    cold = {k: v for k, v in startup_timings.items() if v is not None}
+    for name, seconds in cold.items():
+        PROFILER.observe(f"cold_start_{name}", seconds)
+    logger.info("Dashboard cold start: %s", ", ".join(f"{k}={v:.3f}" for k, v in cold.items()))
+
+# ==================== DEBUG PANEL ====================
+# Hidden unless profiling is on (MKULIMA_PROFILE=1) and the URL has ?debug=1
+rerun_record = PROFILER.end_rerun()
+if rerun_record and st.query_params.get("debug") == "1":
+    with st.sidebar.expander("Debug: rerun timings", expanded=True):
+        st.write(f"Rerun: {rerun_record['rerun_s'] * 1000:.1f} ms · "
+                 f"peak RSS {memory_high_water_bytes() / 2**20:.0f} MB")
+        st.write("Cold start: " + ", ".join(
+            f"{k} {v:.3f}s" for k, v in cold_start.items() if v is not None))
+        st.dataframe(pd.DataFrame(rerun_record['spans'], columns=['Span', 'Seconds']),
+                     use_container_width=True)
+        st.dataframe(pd.DataFrame(
+            [(fn, *stats) for fn, stats in PROFILER.cache_stats().items()],
+            columns=['Cache', 'Calls', 'Misses', 'Hits']
+        ), use_container_width=True)
+        st.code(PROFILER.prometheus_text(), language="text")
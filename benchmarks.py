@@ -0,0 +1,270 @@
+"""Reproducible offline benchmarks for the pipeline, inference and dashboard.
+
+Everything runs on synthetic data shaped like ``ml_data`` (OBJECTID, date
+and the four ``mean_*`` features), so no Earth Engine access is needed.
+
+    python benchmarks.py --out bench.json
+    python benchmarks.py --out bench.json --baseline baseline.json   # exit 1 on regressions
+    python benchmarks.py --quick --only merge,csi,predict
+
+Results are a flat ``{"suite/case/metric": value}`` mapping written as JSON
+with some environment metadata. Metrics ending in ``_s`` are timings (lower
+is better) and metrics ending in ``_per_s`` are throughputs (higher is
+better); a metric regresses when it is worse than the baseline by more
+than ``--tolerance``.
+"""
+
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+import joblib
+import numpy as np
+import pandas as pd
+import sklearn
+
+from compositing import composite_features
+from csi import CSINormalizer
+from features import FEATURE_COLS, merge_index_csvs
+from forest_engine import FlatForest, compile_forest
+from training import TARGET_COL, train_final
+
+APP_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'app.py')
+
+SUITES = ('merge', 'composite', 'csi', 'training', 'predict', 'app')
+TREE_COUNTS = (25, 50, 100, 200)
+BATCH_SIZES = (1, 10, 100, 1_000, 10_000)
+
+
+# ==================== SYNTHETIC DATA ====================
+def synthetic_ml_data(n_parcels=500, n_dates=60, seed=0):
+    """Parcel x date feature table with realistic ranges and a few gaps."""
+    rng = np.random.default_rng(seed)
+    dates = pd.date_range('2020-01-01', periods=n_dates, freq='8D')
+    ids = np.repeat(np.arange(1, n_parcels + 1), n_dates)
+    day = np.tile(np.arange(n_dates), n_parcels)
+    season = np.sin(2 * np.pi * day / 46)
+
+    df = pd.DataFrame({
+        'OBJECTID': ids,
+        'date': np.tile(dates, n_parcels),
+        'mean_LST': 24 + 4 * season + rng.normal(0, 1.5, len(ids)),
+        'mean_EVI': np.clip(0.45 - 0.15 * season + rng.normal(0, 0.08, len(ids)), 0, 1),
+        'mean_SM': np.clip(30 - 8 * season + rng.normal(0, 4, len(ids)), 0, None),
+        'mean_RAINFALL': rng.gamma(0.8, 3.0, len(ids)),
+    })
+    for col in FEATURE_COLS:
+        df.loc[rng.random(len(df)) < 0.05, col] = np.nan
+    return df
+
+
+def write_index_csvs(df, folder):
+    """Split ``df`` into one GEE-style export per index (OBJECTID, date, mean)."""
+    os.makedirs(folder, exist_ok=True)
+    for col in FEATURE_COLS:
+        part = df[['OBJECTID', 'date', col]].dropna().rename(columns={col: 'mean'})
+        part = part.assign(date=part['date'].dt.strftime('%Y-%m-%d'))
+        part.to_csv(os.path.join(folder, f"{col[len('mean_'):]}.csv"), index=False)
+
+
+# ==================== TIMING ====================
+def timeit(fn, repeat=5, min_time=0.0):
+    """Median wall time of ``fn()`` over ``repeat`` runs (at least ``min_time`` total)."""
+    times = []
+    start = time.perf_counter()
+    while len(times) < repeat or time.perf_counter() - start < min_time:
+        t0 = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - t0)
+    return float(np.median(times))
+
+
+# ==================== SUITES ====================
+def bench_merge(df, repeat):
+    with tempfile.TemporaryDirectory() as folder:
+        write_index_csvs(df, folder)
+        return {'merge/index_csvs/seconds_s': timeit(lambda: merge_index_csvs(folder), repeat)}
+
+
+def bench_composite(df, repeat):
+    return {'composite/10D/seconds_s': timeit(lambda: composite_features(df, FEATURE_COLS, freq='10D'), repeat)}
+
+
+def bench_csi(df, repeat):
+    def run():
+        normalizer = CSINormalizer().fit([df])
+        return normalizer.transform(df)
+    return {'csi/fit_transform/seconds_s': timeit(run, repeat)}
+
+
+def _training_frame(df):
+    data = df.dropna(subset=FEATURE_COLS)
+    return data.assign(**{TARGET_COL: CSINormalizer().fit([data]).transform(data)})
+
+
+def bench_training(df, tree_counts):
+    data = _training_frame(df)
+    out = {}
+    for n in tree_counts:
+        start = time.perf_counter()
+        train_final(data, {'n_estimators': n})
+        out[f'training/n_estimators={n}/seconds_s'] = time.perf_counter() - start
+    return out
+
+
+def bench_predict(df, batch_sizes, n_estimators=200):
+    data = _training_frame(df)
+    rf = train_final(data, {'n_estimators': n_estimators})
+    # Single-threaded predict: per-request latency, not the training pool
+    rf.set_params(n_jobs=1)
+    flat = compile_forest(rf)
+    X = data[FEATURE_COLS]
+
+    # Cold load of each serving artifact: the pickle vs. the memory-mapped .npz
+    out = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        pkl_path, npz_path = os.path.join(tmp, 'model.pkl'), os.path.join(tmp, 'model.npz')
+        joblib.dump(rf, pkl_path)
+        flat.save(npz_path)
+        out['predict/sklearn/load_s'] = timeit(lambda: joblib.load(pkl_path), repeat=3)
+        out['predict/flat/load_s'] = timeit(lambda: FlatForest.load(npz_path), repeat=3)
+    for name, model in (('sklearn', rf), ('flat', flat)):
+        for size in batch_sizes:
+            rows = X.iloc[np.arange(size) % len(X)]
+            if name == 'flat':
+                rows = rows.to_numpy()
+            seconds = timeit(lambda: model.predict(rows), repeat=5, min_time=0.2)
+            out[f'predict/{name}/batch={size}/latency_s'] = seconds
+            out[f'predict/{name}/batch={size}/rows_per_s'] = size / seconds
+    return out
+
+
+def bench_app(repeat):
+    """Rerun time of each dashboard tab, driven headlessly through AppTest."""
+    from streamlit.testing.v1 import AppTest
+
+    at = AppTest.from_file(APP_PATH, default_timeout=120)
+    start = time.perf_counter()
+    at.run()
+    out = {'app/first_run/seconds_s': time.perf_counter() - start}
+    if at.exception:
+        raise RuntimeError(f"app.py raised: {at.exception[0].value}")
+    # Measured by app.py itself: header + sidebar on screen, model wait
+    timings = at.session_state['startup_timings']
+    out['app/first_run/imports_s'] = timings['imports_s']
+    out['app/first_run/first_paint_s'] = timings['first_paint_s']
+    out['app/first_run/model_wait_s'] = timings['model_wait_s']
+
+    wards = at.selectbox[0].options
+    steps = {
+        'tab1_ward_details': lambda i: at.selectbox[0].select(wards[i % len(wards)]).run(),
+        'tab2_predictions': lambda i: at.button[0].click().run(),
+        'tab2_slider': lambda i: at.slider[0].set_value(25 + i % 5).run(),
+        'tab3_history': lambda i: at.multiselect[1].set_value(list(wards[:1 + i % len(wards)])).run(),
+    }
+    for name, step in steps.items():
+        times = []
+        for i in range(repeat):
+            t0 = time.perf_counter()
+            step(i + 1)
+            times.append(time.perf_counter() - t0)
+        if at.exception:
+            raise RuntimeError(f"app.py raised during {name}: {at.exception[0].value}")
+        out[f'app/{name}/seconds_s'] = float(np.median(times))
+    return out
+
+
+def run_benchmarks(suites=SUITES, quick=False, seed=0):
+    n_parcels, n_dates = (200, 40) if quick else (2_000, 120)
+    repeat = 3 if quick else 5
+    df = synthetic_ml_data(n_parcels, n_dates, seed)
+
+    results = {}
+    for suite in suites:
+        start = time.perf_counter()
+        if suite == 'merge':
+            results.update(bench_merge(df, repeat))
+        elif suite == 'composite':
+            results.update(bench_composite(df, repeat))
+        elif suite == 'csi':
+            results.update(bench_csi(df, repeat))
+        elif suite == 'training':
+            results.update(bench_training(df, TREE_COUNTS[:2] if quick else TREE_COUNTS))
+        elif suite == 'predict':
+            results.update(bench_predict(df, BATCH_SIZES[:4] if quick else BATCH_SIZES,
+                                         n_estimators=50 if quick else 200))
+        elif suite == 'app':
+            results.update(bench_app(repeat))
+        else:
+            raise ValueError(f"Unknown benchmark suite: {suite!r}")
+        print(f" {suite}: {time.perf_counter() - start:.1f}s")
+
+    return {
+        'meta': {
+            'created': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'pandas': pd.__version__,
+            'sklearn': sklearn.__version__,
+            'machine': platform.machine(),
+            'cpu_count': os.cpu_count(),
+            'rows': len(df),
+            'quick': quick,
+        },
+        'results': results,
+    }
+
+
+# ==================== BASELINE ====================
+def compare(results, baseline, tolerance=0.2):
+    """Per-metric comparison against a baseline; rows sorted worst first."""
+    rows = []
+    for key, value in results.items():
+        if key not in baseline:
+            continue
+        base = baseline[key]
+        higher_is_better = key.endswith('_per_s')
+        ratio = value / base if base else np.inf
+        worse = ratio < 1 / (1 + tolerance) if higher_is_better else ratio > 1 + tolerance
+        rows.append({'metric': key, 'baseline': base, 'current': value,
+                     'ratio': ratio, 'regression': bool(worse)})
+    report = pd.DataFrame(rows, columns=['metric', 'baseline', 'current', 'ratio', 'regression'])
+    return report.sort_values(['regression', 'metric'], ascending=[False, True]).reset_index(drop=True)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the MKULIMA benchmark suite")
+    parser.add_argument('--out', default='bench.json')
+    parser.add_argument('--baseline')
+    parser.add_argument('--tolerance', type=float, default=0.2)
+    parser.add_argument('--only', help=f"comma-separated subset of {','.join(SUITES)}")
+    parser.add_argument('--quick', action='store_true', help="smaller data for a fast smoke run")
+    args = parser.parse_args(argv)
+
+    suites = args.only.split(',') if args.only else SUITES
+    report = run_benchmarks(suites, args.quick)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        comparison = compare(report['results'], baseline['results'], args.tolerance)
+        report['baseline'] = {'path': args.baseline, 'tolerance': args.tolerance,
+                              'comparison': comparison.to_dict(orient='records')}
+        print(comparison.to_string(index=False))
+
+    with open(args.out, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f" Wrote {len(report['results'])} results to {args.out}")
+
+    if args.baseline and comparison['regression'].any():
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
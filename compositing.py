@@ -0,0 +1,292 @@
+"""Per-parcel temporal compositing, masking and gap filling.
+
+The exports are irregular in time: Sentinel-2 indices every few days (and
+cloud-contaminated), MODIS LST daily with gaps, SMAP every 2-3 days, CHIRPS
+daily. After the wide merge most parcel-days miss at least one feature, so
+``dropna`` throws most rows away.
+
+Each feature is laid out as a dense parcels x dates array over its own
+observation dates, masked (valid range, cloud dips, per-parcel outliers),
+reduced to fixed-interval composites (``'10D'``, ``'dekad'`` or ``'MS'``)
+and short gaps between composites are filled by linear interpolation. Every
+step works on the whole array at once, so the cost is a few numpy passes per
+feature regardless of the number of parcels.
+"""
+
+import warnings
+
+import numpy as np
+import pandas as pd
+
+from features import KEY_COLS
+
+# Physically plausible values; anything outside is a bad retrieval
+VALID_RANGES = {
+    'mean_NDVI': (-1.0, 1.0),
+    'mean_EVI': (-1.0, 1.0),
+    'mean_SAVI': (-1.5, 1.5),
+    'mean_LST': (-10.0, 70.0),
+    'mean_SM': (0.0, 30.0),
+    'mean_RAINFALL': (0.0, 500.0),
+}
+
+# Optical indices: clouds and haze pull values down, so a drop below both
+# neighbouring observations by more than this much is treated as cloud
+CLOUD_DIP = {
+    'mean_NDVI': 0.15,
+    'mean_EVI': 0.12,
+    'mean_SAVI': 0.12,
+}
+
+# Per-interval reducer per feature. Maximum-value compositing for the optical
+# indices (the clearest scene wins); rainfall stays a daily rate (mm/day)
+COMPOSITE_REDUCERS = {
+    'mean_NDVI': 'max',
+    'mean_EVI': 'max',
+    'mean_SAVI': 'max',
+    'mean_LST': 'median',
+    'mean_SM': 'median',
+    'mean_RAINFALL': 'mean',
+}
+
+REDUCERS = {
+    'median': np.nanmedian,
+    'max': np.nanmax,
+    'min': np.nanmin,
+    'mean': np.nanmean,
+}
+
+# Robust z-score (per parcel, over time) above which a value is an outlier.
+# Rainfall is left out: it is heavy-tailed and storms are real
+OUTLIER_Z = {
+    'mean_NDVI': 3.5,
+    'mean_EVI': 3.5,
+    'mean_SAVI': 3.5,
+    'mean_LST': 3.5,
+    'mean_SM': 3.5,
+}
+
+
+# ==================== DENSE ARRAYS ====================
+def to_cube(df, value_col):
+    """Dense (parcels x dates) array of ``value_col``, NaN where not observed.
+
+    Returns ``(cube, parcels, dates)``; ``dates`` are the sorted dates on
+    which any parcel has a value. Repeated readings are averaged.
+    """
+    obs = df.loc[df[value_col].notna(), KEY_COLS + [value_col]]
+    parcels, p_idx = np.unique(obs['OBJECTID'].to_numpy(), return_inverse=True)
+    dates, d_idx = np.unique(obs['date'].to_numpy(), return_inverse=True)
+
+    flat = p_idx * len(dates) + d_idx
+    counts = np.bincount(flat, minlength=len(parcels) * len(dates))
+    sums = np.bincount(flat, weights=obs[value_col].to_numpy(dtype=np.float64),
+                       minlength=len(parcels) * len(dates))
+    with np.errstate(invalid='ignore', divide='ignore'):
+        cube = (sums / counts).reshape(len(parcels), len(dates))
+    return cube, parcels, pd.DatetimeIndex(dates)
+
+
+def _neighbours(valid):
+    """Column of the previous and next valid value for every cell (-1 / T if none)."""
+    n_cols = valid.shape[1]
+    cols = np.arange(n_cols)
+    prev = np.maximum.accumulate(np.where(valid, cols, -1), axis=1)
+    nxt = np.minimum.accumulate(np.where(valid, cols, n_cols)[:, ::-1], axis=1)[:, ::-1]
+    return prev, nxt
+
+
+def _shift_valid(prev, nxt, n_cols):
+    """Neighbour columns of each cell excluding the cell itself."""
+    before = np.concatenate([np.full((len(prev), 1), -1), prev[:, :-1]], axis=1)
+    after = np.concatenate([nxt[:, 1:], np.full((len(nxt), 1), n_cols)], axis=1)
+    return before, after
+
+
+# ==================== MASKING ====================
+def mask_range(cube, value_col, ranges=VALID_RANGES):
+    """NaN out values outside the feature's valid range; returns the mask."""
+    low, high = ranges.get(value_col, (-np.inf, np.inf))
+    with np.errstate(invalid='ignore'):
+        bad = (cube < low) | (cube > high)
+    cube[bad] = np.nan
+    return bad
+
+
+def mask_dips(cube, threshold):
+    """NaN out values lower than both neighbouring observations by ``threshold``.
+
+    A cloud or shadow over the parcel depresses the optical indices for a
+    single scene, while real canopy changes persist, so only isolated drops
+    are removed. Neighbours are the nearest valid observations of the same
+    parcel. Returns the mask.
+    """
+    valid = ~np.isnan(cube)
+    n_cols = cube.shape[1]
+    before, after = _shift_valid(*_neighbours(valid), n_cols)
+    has_both = valid & (before >= 0) & (after < n_cols)
+    rows = np.arange(len(cube))[:, None]
+    left = cube[rows, np.clip(before, 0, n_cols - 1)]
+    right = cube[rows, np.clip(after, 0, n_cols - 1)]
+    with np.errstate(invalid='ignore'):
+        dip = has_both & (np.minimum(left, right) - cube > threshold)
+    cube[dip] = np.nan
+    return dip
+
+
+def mask_outliers(cube, z=3.5):
+    """NaN out values whose robust z-score within their parcel exceeds ``z``.
+
+    Uses the per-parcel median and median absolute deviation over time;
+    parcels with no spread are left alone. Returns the mask.
+    """
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', RuntimeWarning)
+        median = np.nanmedian(cube, axis=1, keepdims=True)
+        mad = np.nanmedian(np.abs(cube - median), axis=1, keepdims=True)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        score = 0.6745 * np.abs(cube - median) / mad
+        bad = (mad > 0) & (score > z)
+    cube[bad] = np.nan
+    return bad
+
+
+# ==================== COMPOSITES ====================
+def period_starts(dates, freq='10D'):
+    """Start of the compositing interval of every date.
+
+    ``'MS'``: calendar months; ``'dekad'``: days 1-10, 11-20, 21-end of each
+    month; any fixed frequency such as ``'10D'`` is anchored at the epoch, so
+    interval boundaries do not move between runs.
+    """
+    dates = pd.DatetimeIndex(dates)
+    if freq == 'MS':
+        return dates.to_period('M').to_timestamp()
+    if freq == 'dekad':
+        day = np.minimum((dates.day - 1) // 10, 2) * 10 + 1
+        return pd.DatetimeIndex(pd.to_datetime({'year': dates.year, 'month': dates.month, 'day': day}))
+    return dates.floor(freq)
+
+
+def interval_days(periods, freq='10D', first=None, last=None):
+    """Length in days of each compositing interval starting at ``periods``,
+    clipped to the observed dates ``first``..``last`` when given."""
+    periods = pd.DatetimeIndex(periods)
+    if freq in ('MS', 'dekad'):
+        span = pd.Timedelta(days=32)
+    else:
+        span = pd.to_timedelta(freq) + pd.Timedelta(days=1)
+    days = pd.date_range(periods.min(), periods.max() + span, freq='D')
+    starts = pd.DatetimeIndex(np.unique(period_starts(days, freq)))
+    ends = starts[np.searchsorted(starts.values, periods.values, side='right')]
+    if first is not None:
+        periods = periods.where(periods >= first, pd.Timestamp(first))
+    if last is not None:
+        limit = pd.Timestamp(last) + pd.Timedelta(days=1)
+        ends = ends.where(ends <= limit, limit)
+    return (ends - periods).days.to_numpy()
+
+
+def composite(cube, dates, freq='10D', how='median', periods=None):
+    """Reduce a parcels x dates array to one column per interval.
+
+    ``periods`` fixes the output intervals (e.g. a shared axis for all
+    features); intervals without observations are NaN. Returns
+    ``(composites, periods)``.
+    """
+    starts = pd.DatetimeIndex(period_starts(dates, freq))
+    if periods is None:
+        periods = pd.DatetimeIndex(np.unique(starts))
+    reducer = REDUCERS[how]
+    out = np.full((len(cube), len(periods)), np.nan)
+    # dates are sorted, so each interval is one contiguous slice of columns
+    bounds = np.searchsorted(starts.values, periods.values, side='left')
+    ends = np.searchsorted(starts.values, periods.values, side='right')
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', RuntimeWarning)  # all-NaN intervals
+        for j, (start, stop) in enumerate(zip(bounds, ends)):
+            if stop > start:
+                out[:, j] = reducer(cube[:, start:stop], axis=1)
+    return out, periods
+
+
+def fill_gaps(cube, max_gap=1):
+    """Linearly interpolate runs of at most ``max_gap`` missing columns.
+
+    Only gaps with a valid value on both sides are filled; leading and
+    trailing gaps and longer runs stay NaN. Returns the mask of filled cells.
+    """
+    valid = ~np.isnan(cube)
+    n_cols = cube.shape[1]
+    prev, nxt = _neighbours(valid)
+    fill = ~valid & (prev >= 0) & (nxt < n_cols) & (nxt - prev - 1 <= max_gap)
+    if not fill.any():
+        return fill
+    rows, cols = np.nonzero(fill)
+    p, n = prev[rows, cols], nxt[rows, cols]
+    weight = (cols - p) / (n - p)
+    cube[rows, cols] = cube[rows, p] + weight * (cube[rows, n] - cube[rows, p])
+    return fill
+
+
+# ==================== PIPELINE ====================
+def composite_features(df, feature_cols, freq='10D', reducers=COMPOSITE_REDUCERS,
+                       max_gap=1, outlier_z=OUTLIER_Z, cloud_dip=CLOUD_DIP):
+    """Masked, gap-filled fixed-interval composites of ``feature_cols``.
+
+    ``df`` has OBJECTID, date and the feature columns (wide merge or feature
+    store rows). Returns ``(composites, report)``: one row per parcel and
+    interval (``date`` is the interval start, ``interval_days`` its observed
+    length)
+    and per-feature counts of masked and filled cells.
+    """
+    cubes = {}
+    for col in feature_cols:
+        cube, parcels, dates = to_cube(df, col)
+        stats = {'observations': int((~np.isnan(cube)).sum()),
+                 'range_masked': int(mask_range(cube, col).sum())}
+        if col in cloud_dip:
+            stats['cloud_masked'] = int(mask_dips(cube, cloud_dip[col]).sum())
+        if col in outlier_z:
+            stats['outliers_masked'] = int(mask_outliers(cube, outlier_z[col]).sum())
+        cubes[col] = (cube, parcels, dates, stats)
+
+    # Shared parcel and interval axes for all features, with no missing intervals
+    all_parcels = np.unique(np.concatenate([c[1] for c in cubes.values()]))
+    first = min(c[2].min() for c in cubes.values())
+    last = max(c[2].max() for c in cubes.values())
+    grid = pd.DatetimeIndex(np.unique(period_starts(pd.date_range(first, last, freq='D'), freq)))
+
+    # The first interval is labelled from the first observation, so it is not
+    # attributed to the month (or year) before the data starts
+    labels = grid.where(grid >= first, first)
+    out = {
+        'OBJECTID': np.repeat(all_parcels, len(grid)),
+        'date': np.tile(labels.values, len(all_parcels)),
+        'interval_days': np.tile(interval_days(grid, freq, first, last), len(all_parcels)),
+    }
+    report = {}
+    for col, (cube, parcels, dates, stats) in cubes.items():
+        comp, _ = composite(cube, dates, freq, reducers.get(col, 'median'), periods=grid)
+        stats['composites'] = int((~np.isnan(comp)).sum())
+        stats['gap_filled'] = int(fill_gaps(comp, max_gap).sum()) if max_gap else 0
+        dense = np.full((len(all_parcels), len(grid)), np.nan)
+        dense[np.searchsorted(all_parcels, parcels)] = comp
+        out[col] = dense.ravel()
+        report[col] = stats
+
+    composites = pd.DataFrame(out)
+    composites = composites[composites[feature_cols].notna().any(axis=1)].reset_index(drop=True)
+    report = (
+        pd.DataFrame(report).T
+        .reindex(columns=['observations', 'range_masked', 'cloud_masked', 'outliers_masked',
+                          'composites', 'gap_filled'])
+        .fillna(0).astype(int)
+    )
+    report.attrs.update(
+        rows_in=len(df),
+        complete_rows_in=int(df[feature_cols].notna().all(axis=1).sum()),
+        rows_out=len(composites),
+        complete_rows_out=int(composites[feature_cols].notna().all(axis=1).sum()),
+    )
+    return composites, report
@@ -0,0 +1,134 @@
+"""Crop Stress Index (CSI_ref) with persisted normalization statistics.
+
+CSI_ref is the weighted sum of min-max normalized features, oriented so
+that 1 means stress: low EVI, low soil moisture, low rainfall and high LST.
+The normalization bounds are accumulated in one streaming pass over chunks
+(``partial_fit``), saved next to the model artifact and reused to score new
+batches without reloading the whole history.
+"""
+
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+# feature -> (weight, +1 if higher means more stress else -1)
+CSI_WEIGHTS = {
+    'mean_EVI': (0.4, -1),
+    'mean_SM': (0.3, -1),
+    'mean_LST': (0.2, +1),
+    'mean_RAINFALL': (0.1, -1),
+}
+
+# Reservoir size per feature when robust quantile bounds are requested
+RESERVOIR_SIZE = 100_000
+
+
+class CSINormalizer:
+    """Streaming min/max (or robust quantile) bounds per CSI feature.
+
+    With ``quantiles=None`` the bounds are the exact min and max. With e.g.
+    ``quantiles=(0.01, 0.99)`` they are estimated from a fixed-size uniform
+    reservoir sample, so memory stays bounded however much history is seen.
+    """
+
+    def __init__(self, weights=None, quantiles=None, seed=42):
+        self.weights = dict(weights or CSI_WEIGHTS)
+        self.quantiles = tuple(quantiles) if quantiles is not None else None
+        self.lo = {f: np.inf for f in self.weights}
+        self.hi = {f: -np.inf for f in self.weights}
+        self.n_seen = 0
+        self._rng = np.random.default_rng(seed)
+        self._reservoir = {f: np.empty(0) for f in self.weights}
+
+    def partial_fit(self, chunk):
+        for feat in self.weights:
+            values = chunk[feat].to_numpy(dtype=np.float64)
+            values = values[~np.isnan(values)]
+            if values.size == 0:
+                continue
+            self.lo[feat] = min(self.lo[feat], values.min())
+            self.hi[feat] = max(self.hi[feat], values.max())
+            if self.quantiles is not None:
+                self._sample(feat, values)
+        self.n_seen += len(chunk)
+        return self
+
+    def _sample(self, feat, values):
+        # Vectorized reservoir sampling: keep the RESERVOIR_SIZE smallest random keys
+        keys = self._rng.random(values.size)
+        res = self._reservoir[feat]
+        if res.size:
+            values = np.concatenate([res[0], values])
+            keys = np.concatenate([res[1], keys])
+        if values.size > RESERVOIR_SIZE:
+            keep = np.argpartition(keys, RESERVOIR_SIZE)[:RESERVOIR_SIZE]
+            values, keys = values[keep], keys[keep]
+        self._reservoir[feat] = np.vstack([values, keys])
+
+    def fit(self, chunks):
+        """One pass over an iterable of DataFrame chunks (or a single frame)."""
+        if isinstance(chunks, pd.DataFrame):
+            chunks = [chunks]
+        for chunk in chunks:
+            self.partial_fit(chunk)
+        return self
+
+    def bounds(self):
+        """{feature: (low, high)} used for normalization."""
+        if self.quantiles is None:
+            return {f: (self.lo[f], self.hi[f]) for f in self.weights}
+        return {
+            f: tuple(np.quantile(self._reservoir[f][0], self.quantiles))
+            for f in self.weights
+        }
+
+    def transform(self, df, clip=False):
+        """Weighted CSI for every row of ``df``, vectorized."""
+        bounds = self.bounds()
+        csi = np.zeros(len(df))
+        for feat, (weight, direction) in self.weights.items():
+            lo, hi = bounds[feat]
+            x = df[feat].to_numpy(dtype=np.float64)
+            norm = (x - lo) / (hi - lo) if direction > 0 else (hi - x) / (hi - lo)
+            if clip:
+                norm = np.clip(norm, 0.0, 1.0)
+            csi += weight * norm
+        return pd.Series(csi, index=df.index, name='CSI_ref')
+
+    # ==================== PERSISTENCE ====================
+    def to_dict(self):
+        return {
+            'weights': {f: list(w) for f, w in self.weights.items()},
+            'quantiles': self.quantiles,
+            'bounds': {f: [float(lo), float(hi)] for f, (lo, hi) in self.bounds().items()},
+            'n_seen': self.n_seen,
+        }
+
+    def save(self, path):
+        with open(path, 'w') as f:
+            json.dump(self.to_dict(), f, indent=2)
+
+    @classmethod
+    def load(cls, path):
+        with open(path) as f:
+            data = json.load(f)
+        norm = cls({f: tuple(w) for f, w in data['weights'].items()})
+        # Saved bounds are final: expose them as the exact min/max
+        for feat, (lo, hi) in data['bounds'].items():
+            norm.lo[feat], norm.hi[feat] = lo, hi
+        norm.n_seen = data.get('n_seen', 0)
+        return norm
+
+
+def stats_path(model_path):
+    """Normalization stats file stored next to a model artifact."""
+    return f"{os.path.splitext(model_path)[0]}.csi.json"
+
+
+def compute_csi(df, normalizer=None, clip=False):
+    """CSI_ref for ``df``; fits bounds on ``df`` itself if none are given."""
+    if normalizer is None:
+        normalizer = CSINormalizer().fit(df)
+    return normalizer.transform(df, clip=clip)
@@ -0,0 +1,182 @@
+"""Export job orchestration for the per-parcel feature tables.
+
+``ExportManager`` submits export jobs with bounded concurrency, polls them
+with exponential backoff and records every state change in a JSON
+checkpoint, so a rerun only resubmits jobs that failed or never ran and
+resumes polling the ones still in flight. Checkpoint entries are tied to
+the export window they were run for; a new window starts every job over.
+
+The task client is pluggable: ``EarthEngineClient`` talks to ``ee.batch``;
+``FakeExportClient`` is a local stand-in for testing the pipeline without
+Earth Engine.
+"""
+
+import json
+import os
+import time
+
+PENDING_STATES = ('READY', 'RUNNING')
+DONE_STATE = 'COMPLETED'
+FAILED_STATES = ('FAILED', 'CANCELLED', 'CANCEL_REQUESTED')
+
+
+# ==================== TASK CLIENTS ====================
+class EarthEngineClient:
+    """Submits ``ee.batch.Export.table.toDrive`` tasks.
+
+    Each job gets its own description (``<prefix>_<name>_Export``) and file
+    (``<name>.csv``), so outputs never collide and the file names map
+    straight onto the ``mean_<name>`` feature columns.
+    """
+
+    def __init__(self, folder, prefix, selectors=None):
+        import ee  # only needed when actually talking to Earth Engine
+        self.ee = ee
+        self.folder = folder
+        self.prefix = prefix
+        self.selectors = selectors
+
+    def submit(self, name, collection):
+        task = self.ee.batch.Export.table.toDrive(
+            collection=collection,
+            description=f"{self.prefix}_{name}_Export",
+            folder=self.folder,
+            fileNamePrefix=name,
+            fileFormat='CSV',
+            selectors=self.selectors,
+        )
+        task.start()
+        return task.id
+
+    def status(self, task_id):
+        return self.ee.data.getTaskStatus(task_id)[0]['state']
+
+
+class FakeExportClient:
+    """In-memory client: each task completes after ``polls_to_finish`` polls.
+
+    Names in ``fail`` fail on their first ``fail[name]`` attempts.
+    """
+
+    def __init__(self, polls_to_finish=2, fail=None):
+        self.polls_to_finish = polls_to_finish
+        self.fail = dict(fail or {})
+        self.tasks = {}
+        self.submitted = []
+
+    def submit(self, name, collection):
+        task_id = f"FAKE_{len(self.submitted)}"
+        attempt = sum(1 for n in self.submitted if n == name)
+        failing = attempt < self.fail.get(name, 0)
+        self.tasks[task_id] = {'polls': 0, 'fail': failing}
+        self.submitted.append(name)
+        return task_id
+
+    def status(self, task_id):
+        task = self.tasks[task_id]
+        task['polls'] += 1
+        if task['polls'] < self.polls_to_finish:
+            return 'RUNNING'
+        return 'FAILED' if task['fail'] else DONE_STATE
+
+
+# ==================== ORCHESTRATOR ====================
+class ExportManager:
+    def __init__(self, client, checkpoint_path, max_concurrent=2, poll_interval=5.0,
+                 max_poll_interval=120.0, max_attempts=3, sleep=time.sleep):
+        self.client = client
+        self.checkpoint_path = checkpoint_path
+        self.max_concurrent = max_concurrent
+        self.poll_interval = poll_interval
+        self.max_poll_interval = max_poll_interval
+        self.max_attempts = max_attempts
+        self.sleep = sleep
+        self.state = self._load_checkpoint()
+
+    def _load_checkpoint(self):
+        if os.path.exists(self.checkpoint_path):
+            with open(self.checkpoint_path) as f:
+                return json.load(f)
+        return {}
+
+    def _save_checkpoint(self):
+        tmp = f"{self.checkpoint_path}.tmp"
+        with open(tmp, 'w') as f:
+            json.dump(self.state, f, indent=2, sort_keys=True)
+        os.replace(tmp, self.checkpoint_path)
+
+    def _submit(self, name, collection, window):
+        entry = self.state.setdefault(name, {'attempts': 0, 'window': window})
+        entry['task_id'] = self.client.submit(name, collection)
+        entry['state'] = 'READY'
+        entry['attempts'] += 1
+        print(f" Submitted export '{name}' (attempt {entry['attempts']})")
+
+    def run(self, jobs, window=None):
+        """Run ``{name: collection}`` jobs to completion.
+
+        ``window`` identifies what the jobs export (e.g. ``"2016-01-01/2025-12-01"``);
+        checkpoint entries recorded for a different window are discarded, so a
+        COMPLETED export of an older date range is run again.
+
+        Returns ``{name: final state}``; jobs that exhaust ``max_attempts``
+        are left as FAILED in the checkpoint and picked up by the next run.
+        """
+        for name in jobs:
+            entry = self.state.get(name)
+            if entry and entry.get('window') != window:
+                del self.state[name]
+            # A fresh run gets a fresh attempt budget for jobs that failed before
+            elif entry and entry.get('state') in FAILED_STATES:
+                entry['attempts'] = 0
+
+        interval = self.poll_interval
+        while True:
+            running = [n for n in jobs if self.state.get(n, {}).get('state') in PENDING_STATES]
+            todo = [
+                n for n in jobs
+                if self.state.get(n, {}).get('state') not in PENDING_STATES + (DONE_STATE,)
+                and self.state.get(n, {}).get('attempts', 0) < self.max_attempts
+            ]
+            if not running and not todo:
+                break
+
+            for name in todo[:max(0, self.max_concurrent - len(running))]:
+                self._submit(name, jobs[name], window)
+                running.append(name)
+            self._save_checkpoint()
+
+            self.sleep(interval)
+            changed = False
+            for name in running:
+                entry = self.state[name]
+                new_state = self.client.status(entry['task_id'])
+                if new_state != entry['state']:
+                    entry['state'] = new_state
+                    changed = True
+                    print(f" Export '{name}': {new_state}")
+            self._save_checkpoint()
+
+            # Back off while nothing moves, poll quickly again after progress
+            interval = self.poll_interval if changed else min(interval * 2, self.max_poll_interval)
+
+        return {n: self.state.get(n, {}).get('state') for n in jobs}
+
+
+# ==================== COMBINED EXPORT ====================
+def combined_collection(stats_by_name):
+    """Tag each per-index stats collection and merge them into one table.
+
+    The single export carries OBJECTID, date, mean and an ``index`` column;
+    ``features.widen_combined_export`` pivots it to the wide feature table.
+    """
+    import ee
+
+    def tag(name):
+        return lambda f: f.set('index', name)
+
+    tagged = [fc.map(tag(name)) for name, fc in stats_by_name.items()]
+    merged = tagged[0]
+    for fc in tagged[1:]:
+        merged = merged.merge(fc)
+    return ee.FeatureCollection(merged)
@@ -0,0 +1,118 @@
+"""Local Parquet feature store partitioned by year and month.
+
+Rows are keyed on (OBJECTID, date) and laid out as::
+
+    <store_dir>/year=2024/month=3/part-0.parquet
+
+Writing a batch only replaces the month partitions it contains, so a
+monthly refresh appends the new month without touching history. Reads push
+date-range and parcel filters down to partition pruning / row-group
+statistics and only materialize the requested columns.
+"""
+
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+except ImportError:  # optional dependency
+    pa = None
+    ds = None
+
+from features import KEY_COLS
+
+PARTITION_COLS = ['year', 'month']
+
+
+def _require_pyarrow():
+    if ds is None:
+        raise ImportError("The feature store needs pyarrow: pip install pyarrow")
+
+
+def _partitioning():
+    return ds.partitioning(
+        pa.schema([('year', pa.int16()), ('month', pa.int8())]),
+        flavor='hive',
+    )
+
+
+def write_features(df, store_dir):
+    """Write (or replace) the month partitions present in ``df``.
+
+    ``df`` must carry OBJECTID and a datetime ``date`` column; rows are sorted
+    by key so row-group min/max statistics stay tight for OBJECTID filters.
+    """
+    _require_pyarrow()
+    df = df.copy()
+    df['date'] = pd.to_datetime(df['date'])
+    df['year'] = df['date'].dt.year.astype('int16')
+    df['month'] = df['date'].dt.month.astype('int8')
+    df = df.sort_values(PARTITION_COLS + KEY_COLS, kind='stable')
+
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    ds.write_dataset(
+        table,
+        store_dir,
+        format='parquet',
+        partitioning=_partitioning(),
+        existing_data_behavior='delete_matching',
+        basename_template='part-{i}.parquet',
+    )
+
+
+# Monthly refreshes are just a write of the new month's rows
+append_month = write_features
+
+
+def open_store(store_dir):
+    _require_pyarrow()
+    return ds.dataset(store_dir, format='parquet', partitioning=_partitioning())
+
+
+def _month_filter(start, end):
+    year, month = ds.field('year'), ds.field('month')
+    expr = None
+    if start is not None:
+        expr = (year > start.year) | ((year == start.year) & (month >= start.month))
+    if end is not None:
+        upper = (year < end.year) | ((year == end.year) & (month <= end.month))
+        expr = upper if expr is None else expr & upper
+    return expr
+
+
+def read_features(store_dir, start=None, end=None, object_ids=None, columns=None):
+    """Read a slice of the store as a DataFrame.
+
+    ``start``/``end`` are inclusive dates, ``object_ids`` restricts parcels
+    and ``columns`` projects feature columns (keys are always returned).
+    """
+    dataset = open_store(store_dir)
+    start = pd.Timestamp(start) if start is not None else None
+    end = pd.Timestamp(end) if end is not None else None
+
+    expr = _month_filter(start, end)
+    date_type = dataset.schema.field('date').type
+    if start is not None:
+        expr &= ds.field('date') >= pa.scalar(start, type=date_type)
+    if end is not None:
+        expr &= ds.field('date') <= pa.scalar(end, type=date_type)
+    if object_ids is not None:
+        ids = ds.field('OBJECTID').isin(pa.array(list(object_ids), type=dataset.schema.field('OBJECTID').type))
+        expr = ids if expr is None else expr & ids
+
+    if columns is not None:
+        columns = KEY_COLS + [c for c in columns if c not in KEY_COLS]
+
+    table = dataset.to_table(columns=columns, filter=expr)
+    df = table.to_pandas()
+    return df.drop(columns=[c for c in PARTITION_COLS if c in df.columns])
+
+
+def list_partitions(store_dir):
+    """Sorted (year, month) pairs currently in the store."""
+    dataset = open_store(store_dir)
+    parts = set()
+    for frag in dataset.get_fragments():
+        keys = ds.get_partition_keys(frag.partition_expression)
+        parts.add((int(keys['year']), int(keys['month'])))
+    return sorted(parts)
@@ -0,0 +1,146 @@
+"""Feature-table construction from the per-index GEE CSV exports."""
+
+import os
+
+import numpy as np
+import pandas as pd
+
+KEY_COLS = ['OBJECTID', 'date']
+FEATURE_COLS = ['mean_LST', 'mean_EVI', 'mean_SM', 'mean_RAINFALL']
+
+# Only these columns are read from each export, with fixed dtypes
+CSV_USECOLS = ['OBJECTID', 'date', 'mean']
+CSV_DTYPES = {'OBJECTID': 'int64', 'date': 'str', 'mean': 'float64'}
+
+
+def list_index_csvs(folder_path):
+    """Sorted CSV filenames in the exports folder."""
+    return sorted(f for f in os.listdir(folder_path) if f.endswith('.csv'))
+
+
+def feature_name(filename):
+    """'LST.csv' -> 'mean_LST'."""
+    return f"mean_{os.path.splitext(os.path.basename(filename))[0]}"
+
+
+def read_index_csv(path):
+    """Read one export keeping only OBJECTID, date and mean."""
+    df = pd.read_csv(path, usecols=CSV_USECOLS, dtype=CSV_DTYPES)
+    df['date'] = pd.to_datetime(df['date'], format='%Y-%m-%d')
+    return df
+
+
+def merge_index_frames(frames):
+    """Build the wide OBJECTID x date table from ``{feature: long frame}``.
+
+    All frames are stacked once and pivoted in a single group-by, instead of
+    an outer ``pd.merge`` per file. Repeated (OBJECTID, date) readings within
+    one index (e.g. overlapping scenes on the same day) are averaged.
+    """
+    names = list(frames)
+    long = pd.concat(
+        [f.assign(feature=np.int16(i)) for i, f in enumerate(frames.values())],
+        ignore_index=True,
+    )
+    wide = (
+        long.groupby(KEY_COLS + ['feature'], sort=True)['mean']
+        .mean()
+        .unstack('feature')
+    )
+    wide = wide.reindex(columns=range(len(names)))
+    wide.columns = names
+    return wide.reset_index()
+
+
+def merge_index_csvs(folder_path, csv_files=None):
+    """Read every export in ``folder_path`` once and return the wide table."""
+    if csv_files is None:
+        csv_files = list_index_csvs(folder_path)
+    if not csv_files:
+        raise FileNotFoundError(f"No CSV files found in {folder_path}")
+    frames = {
+        feature_name(f): read_index_csv(os.path.join(folder_path, f))
+        for f in csv_files
+    }
+    return merge_index_frames(frames)
+
+
+def widen_combined_export(path):
+    """Wide table from the single combined export (see ``exports.combined_collection``)."""
+    df = pd.read_csv(path, usecols=CSV_USECOLS + ['index'], dtype={**CSV_DTYPES, 'index': 'category'})
+    df['date'] = pd.to_datetime(df['date'], format='%Y-%m-%d')
+    frames = {
+        f"mean_{name}": part.drop(columns='index')
+        for name, part in df.groupby('index', observed=True, sort=True)
+    }
+    return merge_index_frames(frames)
+
+
+# ==================== ROLLING RAINFALL ====================
+class RainfallAccumulator:
+    """Per-parcel rolling rainfall sums from one cumulative sum.
+
+    Daily rainfall is laid out as a dense parcels x days array and each
+    window total is the difference of two prefix sums, so every window length
+    comes out of the same scan. Matching the Earth Engine version, the
+    ``Rain_{w}d`` value on day ``d`` covers the ``w`` days before ``d``
+    (``d`` itself excluded); missing days count as no rain.
+
+    ``extend`` can be called again with later days only: the last
+    ``max(windows)`` days are kept so new windows continue seamlessly.
+    """
+
+    def __init__(self, windows=(7, 30, 60), value_col='mean_RAINFALL'):
+        self.windows = tuple(sorted(int(w) for w in windows))
+        self.value_col = value_col
+        self.parcels = np.array([], dtype=np.int64)
+        self.history = np.zeros((0, 0))
+        self.last_date = None
+
+    def extend(self, rain_df):
+        """Add new daily rows and return Rain_{w}d for each new parcel-day."""
+        daily = (
+            rain_df.groupby(['OBJECTID', 'date'])[self.value_col].sum()
+            .unstack('date')
+        )
+        if self.last_date is not None and daily.columns.min() <= self.last_date:
+            raise ValueError(f"New rainfall must start after {self.last_date.date()}")
+
+        first = self.last_date + pd.Timedelta(days=1) if self.last_date is not None else daily.columns.min()
+        days = pd.date_range(first, daily.columns.max(), freq='D')
+        parcels = np.union1d(self.parcels, daily.index.to_numpy())
+
+        new = daily.reindex(index=parcels, columns=days).to_numpy(dtype=np.float64)
+        new = np.nan_to_num(new, nan=0.0)
+        history = self._align_history(parcels)
+
+        values = np.concatenate([history, new], axis=1)
+        csum = np.zeros((len(parcels), values.shape[1] + 1))
+        np.cumsum(values, axis=1, out=csum[:, 1:])
+
+        # Day k (in `values` coordinates) sums days [k - w, k)
+        k = np.arange(history.shape[1], values.shape[1])
+        out = {
+            'OBJECTID': np.repeat(parcels, len(days)),
+            'date': np.tile(days.to_numpy(), len(parcels)),
+        }
+        for w in self.windows:
+            out[f'Rain_{w}d'] = (csum[:, k] - csum[:, np.maximum(k - w, 0)]).ravel()
+
+        keep = self.windows[-1]
+        self.history = values[:, -keep:].copy()
+        self.parcels = parcels
+        self.last_date = days[-1]
+        return pd.DataFrame(out)
+
+    def _align_history(self, parcels):
+        if self.history.shape[1] == 0:
+            return np.zeros((len(parcels), 0))
+        aligned = np.zeros((len(parcels), self.history.shape[1]))
+        aligned[np.searchsorted(parcels, self.parcels)] = self.history
+        return aligned
+
+
+def rolling_rainfall(rain_df, windows=(7, 30, 60), value_col='mean_RAINFALL'):
+    """Rain_{w}d features for every parcel-day in ``rain_df`` in one pass."""
+    return RainfallAccumulator(windows, value_col).extend(rain_df)
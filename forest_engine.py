@@ -0,0 +1,299 @@
+"""Flattened, array-backed engine for the stress Random Forest.
+
+``compile_forest`` packs a trained scikit-learn forest into a handful of
+contiguous NumPy arrays (one entry per node across all trees) and
+``FlatForest.predict`` scores whole batches by stepping every (row, tree)
+pair one level at a time, dropping pairs as they reach a leaf. The
+compiled artifact is an uncompressed ``.npz`` file that ``load``
+memory-maps, so it opens without unpickling 200 sklearn tree objects or
+reading the whole file.
+"""
+
+import io
+import struct
+import zipfile
+
+import numpy as np
+
+# Rows scored per traversal pass; bounds the (rows x trees) leaf matrix
+CHUNK_ROWS = 16384
+# (row, tree) pairs stepped together: trees are walked in blocks of about
+# this many pairs, so a block's nodes stay in cache on large batches while
+# small batches still step every tree in one pass
+BLOCK_PAIRS = 65536
+
+
+class FlatForest:
+    """Tree ensemble stored as flat per-node arrays.
+
+    Leaves point to themselves and carry feature 0, so a (row, tree) pair
+    has reached its leaf once stepping it no longer moves it.
+    """
+
+    def __init__(self, feature, threshold, left, right, value, missing_left, roots,
+                 max_depth, n_features, feature_names=None):
+        self.feature = feature
+        self.threshold = threshold
+        self.left = left
+        self.right = right
+        self.value = value
+        self.missing_left = missing_left
+        self.roots = roots
+        self.max_depth = int(max_depth)
+        self.n_features_in_ = int(n_features)
+        if feature_names is not None:
+            self.feature_names_in_ = np.asarray(feature_names, dtype=object)
+
+    @property
+    def n_estimators(self):
+        return len(self.roots)
+
+    @property
+    def n_nodes(self):
+        return len(self.feature)
+
+    def apply(self, X):
+        """Leaf node index reached by every row in every tree, shape (N, T)."""
+        X = self._check_input(X)
+        out = np.empty((X.shape[0], self.n_estimators), dtype=np.int32)
+        for start in range(0, X.shape[0], CHUNK_ROWS):
+            stop = start + CHUNK_ROWS
+            out[start:stop] = self._traverse(X[start:stop])
+        return out
+
+    def predict(self, X):
+        """Mean leaf value over all trees, matching ``RandomForestRegressor.predict``."""
+        X = self._check_input(X)
+        out = np.empty(X.shape[0], dtype=np.float64)
+        for start in range(0, X.shape[0], CHUNK_ROWS):
+            stop = start + CHUNK_ROWS
+            out[start:stop] = self.value[self._traverse(X[start:stop])].mean(axis=1)
+        return out
+
+    def predict_one(self, x):
+        """``predict`` for a single row, walked in plain Python.
+
+        Numpy's per-call overhead dominates one-row predictions of small
+        forests; this is a few microseconds per tree level instead.
+        """
+        if len(x) != self.n_features_in_:
+            raise ValueError(f"x has {len(x)} features, but the forest expects {self.n_features_in_}")
+        feature, threshold, left, right, value, missing_left = self._lists()
+        x = [float(np.float32(v)) for v in x]
+        total = 0.0
+        for node in self.roots.tolist():
+            while left[node] != node:
+                v = x[feature[node]]
+                if v != v:
+                    node = left[node] if missing_left[node] else right[node]
+                else:
+                    node = left[node] if v <= threshold[node] else right[node]
+            total += value[node]
+        return total / len(self.roots)
+
+    def _lists(self):
+        if getattr(self, '_lists_cache', None) is None:
+            self._lists_cache = tuple(a.tolist() for a in (
+                self.feature, self.threshold, self.left, self.right, self.value, self.missing_left))
+        return self._lists_cache
+
+    def _check_input(self, X):
+        if hasattr(X, 'to_numpy'):
+            X = X.to_numpy()
+        # sklearn compares float32 inputs against float64 thresholds
+        X = np.asarray(X, dtype=np.float32)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+        if X.shape[1] != self.n_features_in_:
+            raise ValueError(
+                f"X has {X.shape[1]} features, but the forest expects {self.n_features_in_}"
+            )
+        return X
+
+    def _traverse(self, X):
+        n_rows, n_features = X.shape
+        x_flat = X.ravel()
+        # children[2*i] is the left child of node i, children[2*i + 1] the right
+        children = self._children()
+        out = np.empty((self.n_estimators, n_rows), dtype=np.int32)
+        block = max(1, BLOCK_PAIRS // n_rows)
+        rows = np.arange(n_rows, dtype=np.int64) * n_features
+        for first in range(0, self.n_estimators, block):
+            roots = self.roots[first:first + block]
+            # Tree-major pairs: consecutive pairs walk the same tree
+            node = np.repeat(roots.astype(np.int64), n_rows)
+            row_base = np.tile(rows, len(roots))
+            active = np.arange(node.size)
+            while active.size:
+                cur = node[active]
+                x = x_flat.take(row_base[active] + self.feature.take(cur))
+                go_right = ~(x <= self.threshold.take(cur))
+                nan = np.isnan(x)
+                if nan.any():
+                    go_right[nan] = ~self.missing_left.take(cur[nan])
+                nxt = children.take(2 * cur + go_right)
+                node[active] = nxt
+                active = active[nxt != cur]
+            out[first:first + block] = node.reshape(len(roots), n_rows)
+        return out.T
+
+    def _children(self):
+        if getattr(self, '_children_cache', None) is None:
+            self._children_cache = np.column_stack([self.left, self.right]).ravel()
+        return self._children_cache
+
+    # ==================== SERIALIZATION ====================
+    def to_arrays(self):
+        arrays = {
+            'feature': self.feature,
+            'threshold': self.threshold,
+            'left': self.left,
+            'right': self.right,
+            'value': self.value,
+            'missing_left': self.missing_left,
+            'roots': self.roots,
+            'meta': np.array([self.max_depth, self.n_features_in_], dtype=np.int64),
+            # Stored so every loader maps the child table instead of building
+            # its own (one copy per replica otherwise)
+            'children': self._children(),
+        }
+        if hasattr(self, 'feature_names_in_'):
+            arrays['feature_names'] = np.asarray(self.feature_names_in_, dtype=str)
+        return arrays
+
+    @classmethod
+    def from_arrays(cls, arrays):
+        max_depth, n_features = (int(v) for v in arrays['meta'])
+        feature_names = arrays['feature_names'] if 'feature_names' in arrays else None
+        forest = cls(
+            arrays['feature'], arrays['threshold'], arrays['left'], arrays['right'],
+            arrays['value'], arrays['missing_left'], arrays['roots'],
+            max_depth, n_features, feature_names,
+        )
+        if 'children' in arrays:  # absent in files saved before it was stored
+            forest._children_cache = arrays['children']
+        return forest
+
+    def save(self, path):
+        # Uncompressed, so ``load`` can memory-map every array in place
+        save_npz_aligned(path, self.to_arrays())
+
+    @classmethod
+    def load(cls, path, mmap=True):
+        """Forest from ``save``; arrays are memory-mapped (read-only) unless
+        ``mmap`` is False or the file is compressed (older artifacts)."""
+        arrays = _mmap_npz(path) if mmap else None
+        if arrays is None:
+            with np.load(path, allow_pickle=False) as data:
+                arrays = {k: data[k] for k in data.files}
+        return cls.from_arrays(arrays)
+
+
+# Zip extra-field id used only as padding so array data starts aligned
+_PAD_EXTRA_ID = 0xA11D
+
+
+def save_npz_aligned(path, arrays, align=64):
+    """``np.savez`` with every member's data aligned to ``align`` bytes.
+
+    Members are stored uncompressed and their local headers padded, so each
+    ``.npy`` (whose own header is a multiple of 64 bytes) starts on an
+    aligned offset and ``_mmap_npz`` can map it without copies: numpy falls
+    back to copying whole arrays when indexing unaligned memory.
+    """
+    with zipfile.ZipFile(path, 'w', zipfile.ZIP_STORED, allowZip64=True) as archive:
+        for name, arr in arrays.items():
+            buf = io.BytesIO()
+            np.lib.format.write_array(buf, np.ascontiguousarray(arr), allow_pickle=False)
+            info = zipfile.ZipInfo(f"{name}.npy", date_time=(1980, 1, 1, 0, 0, 0))
+            info.compress_type = zipfile.ZIP_STORED
+            data_start = archive.fp.tell() + 30 + len(info.filename.encode()) + 4
+            pad = -data_start % align
+            info.extra = struct.pack('<HH', _PAD_EXTRA_ID, pad) + b'\0' * pad
+            archive.writestr(info, buf.getvalue())
+
+
+def _mmap_npz(path):
+    """{name: read-only memmap} for an uncompressed, aligned ``.npz``, or None.
+
+    ``np.load`` ignores ``mmap_mode`` for archives, but stored members are
+    plain ``.npy`` files at fixed offsets. Compressed or unaligned archives
+    (``np.savez`` output, older artifacts) return None and are read instead.
+    """
+    arrays = {}
+    with zipfile.ZipFile(path) as archive, open(path, 'rb') as f:
+        for info in archive.infolist():
+            if info.compress_type != zipfile.ZIP_STORED or not info.filename.endswith('.npy'):
+                return None
+            # Local file header: 30 fixed bytes, then the name and extra field
+            f.seek(info.header_offset + 26)
+            name_len, extra_len = struct.unpack('<HH', f.read(4))
+            f.seek(info.header_offset + 30 + name_len + extra_len)
+            version = np.lib.format.read_magic(f)
+            if version == (1, 0):
+                shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(f)
+            else:
+                shape, fortran_order, dtype = np.lib.format.read_array_header_2_0(f)
+            offset = f.tell()
+            if dtype.hasobject or offset % dtype.alignment:
+                return None
+            name = info.filename[:-len('.npy')]
+            if int(np.prod(shape)) == 0:
+                arrays[name] = np.empty(shape, dtype=dtype)
+            else:
+                mapped = np.memmap(path, dtype=dtype, mode='r', offset=offset, shape=shape,
+                                   order='F' if fortran_order else 'C')
+                # Plain ndarray views skip memmap's per-operation bookkeeping
+                arrays[name] = mapped.view(np.ndarray)
+    return arrays
+
+
+def compile_forest(rf):
+    """Pack a fitted ``RandomForestRegressor`` (or any list of fitted
+    regression trees exposing ``tree_``) into a ``FlatForest``."""
+    estimators = getattr(rf, 'estimators_', rf)
+    if len(estimators) == 0:
+        raise ValueError("Cannot compile an empty forest")
+
+    features, thresholds, lefts, rights, values, missing, roots = [], [], [], [], [], [], []
+    offset = 0
+    max_depth = 0
+    for est in estimators:
+        tree = est.tree_
+        if tree.n_outputs != 1:
+            raise ValueError("Only single-output regression forests are supported")
+        n = tree.node_count
+        idx = np.arange(n, dtype=np.int32) + offset
+        is_leaf = tree.children_left == -1
+
+        features.append(np.where(is_leaf, 0, tree.feature).astype(np.int32))
+        thresholds.append(np.where(is_leaf, np.inf, tree.threshold).astype(np.float64))
+        lefts.append(np.where(is_leaf, idx, tree.children_left + offset).astype(np.int32))
+        rights.append(np.where(is_leaf, idx, tree.children_right + offset).astype(np.int32))
+        values.append(tree.value[:, 0, 0].astype(np.float64))
+        go_left = getattr(tree, 'missing_go_to_left', None)
+        if go_left is None:
+            go_left = np.zeros(n, dtype=bool)
+        missing.append(np.asarray(go_left, dtype=bool))
+        roots.append(offset)
+
+        max_depth = max(max_depth, tree.max_depth)
+        offset += n
+
+    return FlatForest(
+        np.concatenate(features),
+        np.concatenate(thresholds),
+        np.concatenate(lefts),
+        np.concatenate(rights),
+        np.concatenate(values),
+        np.concatenate(missing),
+        np.array(roots, dtype=np.int32),
+        max_depth,
+        getattr(rf, 'n_features_in_', estimators[0].n_features_in_),
+        getattr(rf, 'feature_names_in_', None),
+    )
+
+
+def load_forest(path):
+    """Load a forest saved with ``FlatForest.save``."""
+    return FlatForest.load(path)
@@ -0,0 +1,224 @@
+"""Opt-in timing spans, counters and memory high-water marks.
+
+Disabled unless ``MKULIMA_PROFILE=1``; when disabled ``span`` returns one
+shared no-op context manager and ``cache`` returns the plain Streamlit cache
+decorator, so instrumented code pays only a function call.
+
+When enabled:
+
+* ``span(name)`` times a block; nested spans are reported as ``outer/inner``.
+  Each thread (one per Streamlit session rerun) keeps the spans of its
+  current rerun for the debug panel, and process-wide totals are kept for
+  the Prometheus output.
+* ``cache(decorator, name)`` wraps a ``st.cache_*`` function and counts
+  calls and misses (the body only runs on a miss).
+* ``observe(name, value)`` tracks sizes such as prediction batch rows.
+* ``stage(name)`` times consecutive notebook stages without indenting cells.
+* ``end_rerun()`` appends the rerun's breakdown to ``MKULIMA_PROFILE_LOG``
+  (JSON lines) and rewrites ``MKULIMA_PROFILE_PROM`` (Prometheus text).
+"""
+
+import contextlib
+import functools
+import json
+import os
+import threading
+import time
+
+try:
+    import resource
+except ImportError:  # not available on Windows
+    resource = None
+
+_NULL_SPAN = contextlib.nullcontext()
+
+
+def memory_high_water_bytes():
+    """Peak resident set size of this process so far."""
+    if resource is None:
+        return 0
+    # ru_maxrss is in KiB on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+class _Span:
+    __slots__ = ('profiler', 'name', 'path', 'start')
+
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self):
+        stack = self.profiler._local_stack()
+        self.path = f"{stack[-1]}/{self.name}" if stack else self.name
+        stack.append(self.path)
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        seconds = time.perf_counter() - self.start
+        self.profiler._local_stack().pop()
+        self.profiler._record_span(self.path, seconds)
+        return False
+
+
+class Profiler:
+    def __init__(self, enabled=False, log_path=None, prom_path=None):
+        self.enabled = enabled
+        self.log_path = log_path
+        self.prom_path = prom_path
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self.spans = {}        # path -> [count, total_s, max_s]
+        self.counters = {}     # (name, labels) -> value
+        self.observations = {}  # name -> [count, sum, max]
+        self._stage = None
+
+    # ==================== RECORDING ====================
+    def span(self, name):
+        if not self.enabled:
+            return _NULL_SPAN
+        return _Span(self, name)
+
+    def count(self, name, value=1, **labels):
+        if not self.enabled:
+            return
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def observe(self, name, value):
+        if not self.enabled:
+            return
+        with self._lock:
+            stat = self.observations.setdefault(name, [0, 0.0, 0.0])
+            stat[0] += 1
+            stat[1] += value
+            stat[2] = max(stat[2], value)
+
+    def cache(self, cache_decorator, name):
+        """``cache_decorator`` (e.g. ``st.cache_resource``) with hit/miss counts."""
+        if not self.enabled:
+            return cache_decorator
+
+        def decorate(fn):
+            @functools.wraps(fn)
+            def on_miss(*args, **kwargs):
+                self.count('cache_misses_total', fn=name)
+                return fn(*args, **kwargs)
+
+            cached = cache_decorator(on_miss)
+
+            @functools.wraps(fn)
+            def call(*args, **kwargs):
+                self.count('cache_calls_total', fn=name)
+                with self.span(f"cache:{name}"):
+                    return cached(*args, **kwargs)
+
+            call.clear = cached.clear
+            return call
+        return decorate
+
+    def stage(self, name):
+        """End the running stage (if any) and start ``name`` (None to just stop)."""
+        if not self.enabled:
+            return
+        if self._stage is not None:
+            seconds = time.perf_counter() - self._stage.start
+            self._stage.__exit__(None, None, None)
+            print(f" [profile] {self._stage.name}: {seconds:.2f}s, "
+                  f"peak RSS {memory_high_water_bytes() / 2**20:.0f} MB")
+        self._stage = _Span(self, name).__enter__() if name is not None else None
+
+    def _local_stack(self):
+        stack = getattr(self._local, 'stack', None)
+        if stack is None:
+            stack = self._local.stack = []
+            self._local.rerun = []
+        return stack
+
+    def _record_span(self, path, seconds):
+        self._local.rerun.append((path, seconds))
+        with self._lock:
+            stat = self.spans.setdefault(path, [0, 0.0, 0.0])
+            stat[0] += 1
+            stat[1] += seconds
+            stat[2] = max(stat[2], seconds)
+
+    # ==================== RERUNS ====================
+    def start_rerun(self):
+        if not self.enabled:
+            return
+        self._local_stack().clear()
+        self._local.rerun = []
+        self._local.rerun_start = time.perf_counter()
+
+    def rerun_breakdown(self):
+        """[(span path, seconds)] recorded by this thread since ``start_rerun``."""
+        return list(getattr(self._local, 'rerun', []))
+
+    def end_rerun(self):
+        if not self.enabled:
+            return None
+        total = time.perf_counter() - getattr(self._local, 'rerun_start', time.perf_counter())
+        self.observe('rerun_seconds', total)
+        record = {
+            'time': time.time(),
+            'rerun_s': round(total, 6),
+            'spans': [[path, round(seconds, 6)] for path, seconds in self.rerun_breakdown()],
+            'memory_high_water_bytes': memory_high_water_bytes(),
+        }
+        if self.log_path:
+            with self._lock, open(self.log_path, 'a') as f:
+                f.write(json.dumps(record) + '\n')
+        if self.prom_path:
+            self.write_prometheus(self.prom_path)
+        return record
+
+    # ==================== EXPORT ====================
+    def cache_stats(self):
+        """{fn: (calls, misses, hits)} for ``cache``-wrapped functions."""
+        stats = {}
+        with self._lock:
+            for (name, labels), value in self.counters.items():
+                if name in ('cache_calls_total', 'cache_misses_total'):
+                    fn = dict(labels)['fn']
+                    calls, misses = stats.get(fn, (0, 0))
+                    stats[fn] = (calls + value, misses) if name == 'cache_calls_total' else (calls, misses + value)
+        return {fn: (calls, misses, calls - misses) for fn, (calls, misses) in stats.items()}
+
+    def prometheus_text(self, prefix='mkulima'):
+        lines = []
+        with self._lock:
+            spans = sorted(self.spans.items())
+            counters = sorted(self.counters.items())
+            observations = sorted(self.observations.items())
+
+        lines.append(f"# TYPE {prefix}_span_seconds summary")
+        for path, (count, total, peak) in spans:
+            lines.append(f'{prefix}_span_seconds_count{{span="{path}"}} {count}')
+            lines.append(f'{prefix}_span_seconds_sum{{span="{path}"}} {total:.6f}')
+            lines.append(f'{prefix}_span_seconds_max{{span="{path}"}} {peak:.6f}')
+        for (name, labels), value in counters:
+            label_text = ','.join(f'{k}="{v}"' for k, v in labels)
+            lines.append(f"{prefix}_{name}{{{label_text}}} {value}")
+        for name, (count, total, peak) in observations:
+            lines.append(f"{prefix}_{name}_count {count}")
+            lines.append(f"{prefix}_{name}_sum {total:.6f}")
+            lines.append(f"{prefix}_{name}_max {peak:.6f}")
+        lines.append(f"# TYPE {prefix}_memory_high_water_bytes gauge")
+        lines.append(f"{prefix}_memory_high_water_bytes {memory_high_water_bytes()}")
+        return '\n'.join(lines) + '\n'
+
+    def write_prometheus(self, path):
+        tmp = f"{path}.tmp"
+        with open(tmp, 'w') as f:
+            f.write(self.prometheus_text())
+        os.replace(tmp, path)
+
+
+PROFILER = Profiler(
+    enabled=os.environ.get('MKULIMA_PROFILE', '').lower() in ('1', 'true', 'yes'),
+    log_path=os.environ.get('MKULIMA_PROFILE_LOG'),
+    prom_path=os.environ.get('MKULIMA_PROFILE_PROM'),
+)
@@ -40,9 +40,15 @@ EXPORT_FILE = 'gatundu_features'
 #------------------------------
 # 3. Load datasets
 # -------------------------------
+def mask_s2_clouds(img):
+    # Scene classification: drop cloud shadow (3), medium/high cloud (8, 9) and cirrus (10)
+    scl = img.select('SCL')
+    return img.updateMask(scl.neq(3).And(scl.neq(8)).And(scl.neq(9)).And(scl.neq(10)))
+
 s2 = ee.ImageCollection('COPERNICUS/S2_SR') \
     .filterBounds(parcels) \
-    .filterDate(START_DATE, END_DATE)
+    .filterDate(START_DATE, END_DATE) \
+    .map(mask_s2_clouds)
 
 rain = ee.ImageCollection('UCSB-CHG/CHIRPS/DAILY') \
     .filterBounds(parcels) \
@@ -75,6 +81,9 @@ def add_indices(img):
     ).rename('SAVI')
     return img.addBands([ndvi, evi, savi])
 
+# Local scenes (archive backfills): spectral.process_scenes computes all three
+# indices in one fused, tiled float32 pass and reduces them per parcel.
+
 s2_indices = s2.map(add_indices)
 
 # -------------------------------
@@ -91,6 +100,9 @@ def compute_stats(img_col, scale):
         ).map(lambda f: f.set('date', img.date().format('YYYY-MM-dd')))
     return img_col.map(stats_per_parcel).flatten()
 
+# For backfills / offline runs on local raster stacks, zonal.py computes the same
+# mean/median/stdDev per parcel with a reusable parcel pixel index per grid.
+
 ndvi_stats = compute_stats(s2_indices.select('NDVI'), 30)
 evi_stats = compute_stats(s2_indices.select('EVI'), 30)
 savi_stats = compute_stats(s2_indices.select('SAVI'), 30)
@@ -98,22 +110,11 @@ lst_stats = compute_stats(lst, 1000)
 sm_stats = compute_stats(sm, 10000)
 rain_stats = compute_stats(rain, 5000)
 
-# 6. Compute rolling rainfall
+# 6. Rolling rainfall
 # -------------------------------
-def rolling_rainfall(rain_col, days):
-    n_days = ee.Date(END_DATE).difference(START_DATE, 'day')
-    dates = ee.List.sequence(0, n_days)
-
-    def sum_window(date_int):
-        date = ee.Date(START_DATE).advance(date_int, 'day')
-        window_start = date.advance(-days, 'day')
-        return rain_col.filterDate(window_start, date).sum().rename(f'Rain_{days}d').set('date', date.format('YYYY-MM-dd'))
-
-    return ee.ImageCollection(dates.map(sum_window))
-
-rain7 = rolling_rainfall(rain, 7)
-rain30 = rolling_rainfall(rain, 30)
-rain60 = rolling_rainfall(rain, 60)
+# Rain_7d / Rain_30d / Rain_60d are computed locally from the exported daily
+# per-parcel rainfall (features.rolling_rainfall) after the merge below:
+# one cumulative sum per parcel instead of a window sum per day per window.
 
 #-------------------------------
 # 7. Merge stats (sample preview)
@@ -132,75 +133,39 @@ print(" Preview of merged NDVI + EVI stats (first 5 features):")
 print(df_preview.head())
 
 # -------------------------------
-# 9. Export NDVI stats as CSV (merge full later)
-# -------------------------------
-task = ee.batch.Export.table.toDrive(
-    collection=ndvi_stats,  # later merge all features into one CSV if needed
-    description='Gatundu_All_Features_Export',
-    folder=EXPORT_FOLDER,
-    fileNamePrefix=EXPORT_FILE,
-    fileFormat='CSV'
-)
-task.start()
-print(" Export task started. Check Google Drive folder:", EXPORT_FOLDER)
-
-# 10. Export LST stats as CSV (merge full later)
-# -------------------------------
-task = ee.batch.Export.table.toDrive(
-    collection=lst_stats,  # later merge all features into one CSV if needed
-    description='LST_Features_Export',
-    folder=EXPORT_FOLDER,
-    fileNamePrefix=EXPORT_FILE,
-    fileFormat='CSV'
-)
-
-task.start()
-print(" Export task started. Check Google Drive folder:", EXPORT_FOLDER)
-
-# 10. Export evi_stats stats as CSV (merge full later)
-# -------------------------------
-task = ee.batch.Export.table.toDrive(
-    collection=evi_stats,  # later merge all features into one CSV if needed
-    description='EVI_Features_Export',
-    folder=EXPORT_FOLDER,
-    fileNamePrefix=EXPORT_FILE,
-    fileFormat='CSV'
-)
-
-task.start()
-print(" Export task started. Check Google Drive folder:", EXPORT_FOLDER)
-
-# 10. Export sm_stats stats as CSV (merge full later)
-# -------------------------------
-task = ee.batch.Export.table.toDrive(
-    collection=sm_stats,  # later merge all features into one CSV if needed
-    description='EVI_Features_Export',
-    folder=EXPORT_FOLDER,
-    fileNamePrefix=EXPORT_FILE,
-    fileFormat='CSV'
-)
-
-task.start()
-print(" Export task started. Check Google Drive folder:", EXPORT_FOLDER)
-
-# 10. Export rain_stats stats as CSV (merge full later)
+# 9. Export per-parcel stats
 # -------------------------------
-task = ee.batch.Export.table.toDrive(
-    collection=rain_stats,  # later merge all features into one CSV if needed
-    description='EVI_Features_Export',
-    folder=EXPORT_FOLDER,
-    fileNamePrefix=EXPORT_FILE,
-    fileFormat='CSV'
-)
-
-task.start()
-print(" Export task started. Check Google Drive folder:", EXPORT_FOLDER)
+# One export per index, each with its own description / file prefix, run with
+# bounded concurrency and polled to completion. Progress is checkpointed, so
+# rerunning this cell only resubmits failed or missing exports (changing the
+# date range runs everything again).
+from exports import EarthEngineClient, ExportManager, combined_collection
+from instrumentation import PROFILER  # stage timings when MKULIMA_PROFILE=1
+PROFILER.stage('exports')
+
+export_jobs = {
+    'NDVI': ndvi_stats,
+    'EVI': evi_stats,
+    'LST': lst_stats,
+    'SM': sm_stats,
+    'RAINFALL': rain_stats,
+}
+SINGLE_WIDE_EXPORT = False  # True: one combined CSV instead of one per index
+COMBINED_EXPORT = 'ALL'      # job name, and so file name, of the combined CSV
+if SINGLE_WIDE_EXPORT:
+    export_jobs = {COMBINED_EXPORT: combined_collection(export_jobs)}
+
+export_client = EarthEngineClient(EXPORT_FOLDER, EXPORT_FILE, selectors=['OBJECTID', 'date', 'mean', 'index'] if SINGLE_WIDE_EXPORT else None)
+export_manager = ExportManager(export_client, 'export_checkpoint.json', max_concurrent=2)
+print(" Export results:", export_manager.run(export_jobs, window=f"{START_DATE}/{END_DATE}"), "- check Google Drive folder:", EXPORT_FOLDER)
 
 ## WE WORK ON CROP STRESS INDEX USING Random Forest
 
 from google.colab import drive
 import os
 import pandas as pd
+from features import list_index_csvs, merge_index_csvs, rolling_rainfall, widen_combined_export
+from feature_store import list_partitions, read_features, write_features
 
 # 1. Mount Google Drive
 drive.mount('/content/drive')
@@ -208,65 +173,50 @@ drive.mount('/content/drive')
 # 2. Define folder path — adjust if your folder is in a sub‑folder
 folder_path = '/content/drive/MyDrive/INDICES_CSV'
 # 3. List CSV files to confirm access
-csv_files = [f for f in os.listdir(folder_path) if f.endswith('.csv')]
+csv_files = list_index_csvs(folder_path)
 print("Found CSV files:", csv_files)
 
 # 4. Load and merge
-dfs = [pd.read_csv(os.path.join(folder_path, f)) for f in csv_files]
-data = pd.concat(dfs, ignore_index=True)
-
-print(data.head())
-print(data.info())
-
-# 2. Load and merge CSVs
-# ===============================
-import pandas as pd
-import os
-
-print(data.columns.tolist())
-
-import os
-
-folder_path = '/content/drive/MyDrive/INDICES_CSV'
-csv_files = [f for f in os.listdir(folder_path) if f.endswith('.csv')]
-print("Found CSV files:", csv_files)
-
-columns_to_keep = ['OBJECTID', 'date', 'mean']  # adjust per CSV
-
-# Initialize merged_data with the first CSV file
-first_file = csv_files[0]
-merged_data = pd.read_csv(os.path.join(folder_path, first_file))
-merged_data = merged_data[columns_to_keep]
-new_col_name_first = f"mean_{os.path.splitext(first_file)[0]}"
-merged_data = merged_data.rename(columns={'mean': new_col_name_first})
-
-# Merge remaining CSVs
-for f in csv_files[1:]:
-    df = pd.read_csv(os.path.join(folder_path, f))
-    # Keep only OBJECTID, date, and mean
-    df = df[columns_to_keep]
-
-    # Rename 'mean' column to avoid duplicates (use filename as suffix)
-    new_col_name = f"mean_{os.path.splitext(f)[0]}"
-    df = df.rename(columns={'mean': new_col_name})
-
-    # Merge
-    merged_data = pd.merge(merged_data, df, on=['OBJECTID', 'date'], how='outer')
+PROFILER.stage('merge')
+# Each CSV is read once (OBJECTID, date, mean only) and the wide
+# OBJECTID x date table is built in a single pivot; the combined export
+# carries an index column instead and is pivoted on that
+if SINGLE_WIDE_EXPORT:
+    merged_data = widen_combined_export(os.path.join(folder_path, f"{COMBINED_EXPORT}.csv"))
+else:
+    merged_data = merge_index_csvs(folder_path, csv_files)
 
 # Inspect merged data
 print(merged_data.head())
 print(merged_data.columns.tolist())
+print(merged_data.info())
+
+# 5. Persist to the local feature store (only the months present are rewritten,
+#    so a monthly refresh can pass just the new month's exports)
+FEATURE_STORE_DIR = '/content/drive/MyDrive/FEATURE_STORE'
+PROFILER.stage('feature_store')
+write_features(merged_data, FEATURE_STORE_DIR)
+print("Feature store partitions:", list_partitions(FEATURE_STORE_DIR))
+
+# 10-day composites per parcel instead of raw parcel-days (most of which miss at
+# least one feature): out-of-range values, cloud dips in EVI and per-parcel
+# outliers are masked, each interval is reduced (max EVI, median LST/SM, mean
+# rainfall) and single missing intervals are interpolated
+PROFILER.stage('compositing')
+from compositing import composite_features
+ml_data, composite_report = composite_features(
+    read_features(FEATURE_STORE_DIR, columns=['mean_LST', 'mean_EVI', 'mean_SM', 'mean_RAINFALL']),
+    ['mean_LST', 'mean_EVI', 'mean_SM', 'mean_RAINFALL'], freq='10D', max_gap=1,
+)
+print(composite_report)
+print("Rows in/out:", composite_report.attrs)
 
-# Keep only identifiers and feature columns
-feature_cols = [col for col in merged_data.columns if col.startswith('mean_')]
-ml_data = merged_data[['OBJECTID', 'date'] + feature_cols].copy()
-
-# Inspect
-print(ml_data.head())
-print(ml_data.columns.tolist())
-
-# Keep only identifiers and feature columns
-ml_data = merged_data[['OBJECTID', 'date', 'mean_LST', 'mean_EVI', 'mean_SM', 'mean_RAINFALL']].copy()
+PROFILER.stage('rolling_rainfall')
+# Rolling rainfall windows from the daily per-parcel rainfall, one pass for all
+# windows; joined on each composite's first day
+rain_daily = read_features(FEATURE_STORE_DIR, columns=['mean_RAINFALL']).dropna(subset=['mean_RAINFALL'])
+rain_windows = rolling_rainfall(rain_daily, windows=(7, 30, 60))
+ml_data = ml_data.merge(rain_windows, on=['OBJECTID', 'date'], how='left')
 
 # Drop rows with missing feature values (optional)
 ml_data = ml_data.dropna(subset=['mean_LST','mean_EVI','mean_SM','mean_RAINFALL'])
@@ -274,53 +224,46 @@ ml_data = ml_data.dropna(subset=['mean_LST','mean_EVI','mean_SM','mean_RAINFALL'
 # Inspect
 print(ml_data.head())
 
-from sklearn.model_selection import train_test_split
-from sklearn.ensemble import RandomForestRegressor
-from sklearn.metrics import mean_squared_error, r2_score
-
-# Example: weighted CSI using EVI, SM, and LST
-evi_max = ml_data['mean_EVI'].max()
-evi_min = ml_data['mean_EVI'].min()
-
-ml_data['CSI_ref'] = (
-    0.5 * (evi_max - ml_data['mean_EVI']) / (evi_max - evi_min) +
-    0.3 * (ml_data['mean_SM'].max() - ml_data['mean_SM']) / (ml_data['mean_SM'].max() - ml_data['mean_SM'].min()) +
-    0.2 * (ml_data['mean_LST'] - ml_data['mean_LST'].min()) / (ml_data['mean_LST'].max() - ml_data['mean_LST'].min())
-)
-
-## Inspect top rows of features and new multi-factor CSI
-print(ml_data[['mean_EVI', 'mean_SM', 'mean_LST', 'mean_RAINFALL', 'CSI_ref']].head(10))
+from csi import CSINormalizer, stats_path
+from training import best_params, search, train_final
 
 # Compute multi-index reference CSI
-# Normalize each feature between 0 and 1
-evi_norm = (ml_data['mean_EVI'].max() - ml_data['mean_EVI']) / (ml_data['mean_EVI'].max() - ml_data['mean_EVI'].min())
-sm_norm = (ml_data['mean_SM'].max() - ml_data['mean_SM']) / (ml_data['mean_SM'].max() - ml_data['mean_SM'].min())
-lst_norm = (ml_data['mean_LST'] - ml_data['mean_LST'].min()) / (ml_data['mean_LST'].max() - ml_data['mean_LST'].min())
-rain_norm = (ml_data['mean_RAINFALL'].max() - ml_data['mean_RAINFALL']) / (ml_data['mean_RAINFALL'].max() - ml_data['mean_RAINFALL'].min())
-
-# Weighted combination to get multi-factor CSI
-ml_data['CSI_ref'] = 0.4*evi_norm + 0.3*sm_norm + 0.2*lst_norm + 0.1*rain_norm
+# Bounds for EVI/SM/LST/RAINFALL come from one streaming pass and are saved
+# next to the model, so new months can be scored without the full history:
+#   CSI = 0.4*EVI_norm + 0.3*SM_norm + 0.2*LST_norm + 0.1*RAIN_norm
+PROFILER.stage('csi')
+csi_norm = CSINormalizer().fit(ml_data)
+ml_data['CSI_ref'] = csi_norm.transform(ml_data)
 
 # Inspect top rows
 print(ml_data[['mean_EVI','mean_SM','mean_LST','mean_RAINFALL','CSI_ref']].head(10))
 
-# Features
-X = ml_data[['mean_LST','mean_EVI','mean_SM','mean_RAINFALL']]
+# Features: the schema fixes the model's column order and units, and how the
+# dashboard inputs map onto them (NDVI -> EVI fitted on the paired exports,
+# soil moisture % -> SMAP mm, default rainfall from Rain_30d). It is saved
+# with the model so every consumer builds the exact same input matrix.
+from schema import DASHBOARD_INPUTS, FeatureSchema, schema_path
+feature_schema = FeatureSchema.fit(ml_data, ndvi_pairs=merged_data)
+print("Feature schema:", feature_schema.to_dict())
+X = feature_schema.compile().transform_frame(ml_data)
 y = ml_data['CSI_ref']
 
-# Split
-X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.3, random_state=42)
+# Hyperparameter search with cross-validation grouped by parcel and time block
+# (no OBJECTID or period appears in both train and test), using every core.
+# Clearly worse configs are dropped after each fold.
+PROFILER.stage('cv_search')
+cv_report = search(ml_data, by='both', n_splits=5, max_configs=12)
+print(cv_report)
 
-# Train RF
-rf = RandomForestRegressor(n_estimators=200, random_state=42)
-rf.fit(X_train, y_train)
+# Train RF on all rows with the best config
+rf_params = best_params(cv_report)
+print("Best params:", rf_params)
+PROFILER.stage('train')
+rf = train_final(ml_data, rf_params)
 
-# Predict
-y_pred = rf.predict(X_test)
-
-# Evaluate
-print("R2 Score:", r2_score(y_test, y_pred))
-print("MSE:", mean_squared_error(y_test, y_pred))
+# Evaluate (grouped CV scores of the chosen config)
+print("R2 Score:", cv_report.loc[0, 'mean_r2'])
+print("MSE:", cv_report.loc[0, 'mean_mse'])
 
 # Feature importance
 import matplotlib.pyplot as plt
@@ -329,18 +272,17 @@ plt.xlabel('Importance')
 plt.title('Feature Importance for Sweet Potato Stress Prediction')
 plt.show()
 
-# Add predictions to DataFrame
-ml_data['Predicted_CSI'] = rf.predict(X)
-
-def insurance_risk(csi):
-    if csi < 0.3:
-        return 'Low Risk'         # Little/no crop stress → low payout
-    elif csi < 0.6:
-        return 'Medium Risk'      # Moderate stress → partial payout
-    else:
-        return 'High Risk'        # Severe stress → full payout
-
-ml_data['Insurance_Risk'] = ml_data['Predicted_CSI'].apply(insurance_risk)
+# Add predictions and insurance tiers to DataFrame, scored like the dashboard
+# (one batch call through scoring.score_batch). Tiers:
+#  <= 0.3 Low Risk    -> little/no crop stress, low payout
+#  <= 0.6 Medium Risk -> moderate stress, partial payout
+#   else  High Risk   -> severe stress, full payout
+from scoring import score_batch
+from tiering import INSURANCE_TIERS
+PROFILER.stage('predict')
+scores = score_batch(rf, X, tiers=INSURANCE_TIERS)
+ml_data['Predicted_CSI'] = scores['Stress Probability'].to_numpy()
+ml_data['Insurance_Risk'] = scores['Risk Level'].values
 
 # Inspect
 print(ml_data[['date','OBJECTID','Predicted_CSI','Insurance_Risk']].head(10))
@@ -349,9 +291,99 @@ ml_data['Predicted_CSI']
 ml_data['Insurance_Risk']
 
 import joblib
+import numpy as np
 
-# Save trained model
+PROFILER.stage('save_and_publish')
+# Save trained model (+ the CSI normalization stats it was trained with)
 joblib.dump(rf, "sweet_popatoes_stress_model.pkl")
+csi_norm.save(stats_path("sweet_popatoes_stress_model.pkl"))
+feature_schema.check_model(rf).save(schema_path("sweet_popatoes_stress_model.pkl"))
+
+# Save the compiled flat forest used by the dashboard (smaller, faster to load)
+from forest_engine import compile_forest
+flat_rf = compile_forest(rf)
+assert np.allclose(flat_rf.predict(X), ml_data['Predicted_CSI'])
+flat_rf.save("sweet_popatoes_stress_model.npz")
+
+# Precompute the dashboard slider response surface (live stress as sliders
+# move) and record its interpolation error. It calls the forest directly, so
+# a slider/schema mismatch raises here instead of tabulating the fallback
+from response_surface import ResponseSurface
+slider_schema = feature_schema.compile(DASHBOARD_INPUTS)
+slider_predict = lambda S: flat_rf.predict(slider_schema.transform(S))
+surface = ResponseSurface.build(slider_predict)
+print("Response surface error:", surface.check_error(slider_predict))
+
+# Distil compact surrogates from the forest (real rows + slider-range samples);
+# the smallest one inside the error budget is exported with the model version
+# and used by the dashboard when the full forest exceeds its latency budget
+from functools import partial
+from surrogate import distill, save_surrogate, slider_samples, within_budget
+surrogate_report, surrogates = distill(flat_rf, X, extra_X=slider_samples(feature_schema, 50_000))
+print(surrogate_report.to_string(index=False))
+surrogate_name = within_budget(surrogate_report)
+if surrogate_name is None:
+    print("No surrogate within the error budget; the dashboard will always use the full forest")
+else:
+    print(f"Exporting surrogate {surrogate_name}")
+
+# Publish a new version to the model registry, with the surface and surrogate
+# written into the version before it goes live; running dashboards pick it up
+# and hot-swap it without a restart
+from registry import SURFACE_NAME, SURROGATE_NAME, ModelRegistry
+artifacts = {SURFACE_NAME: surface.save}
+if surrogate_name is not None:
+    artifacts[SURROGATE_NAME] = partial(
+        save_surrogate, surrogates[surrogate_name],
+        metrics={'name': surrogate_name, **surrogate_report.set_index('model').loc[surrogate_name].to_dict()},
+    )
+registry = ModelRegistry('/content/drive/MyDrive/model_registry')
+model_version = registry.publish(
+    rf,
+    feature_schema=feature_schema,
+    csi_stats=csi_norm.to_dict(),
+    extra={'cv': cv_report.iloc[0][['mean_r2', 'mean_mse']].to_dict()},
+    artifacts=artifacts,
+)
+
+# Publish the model for memory-mapped serving (set MKULIMA_SERVE_DIR)
+from shared_store import SERVE_DIR, publish_forest
+if SERVE_DIR:
+    publish_forest(flat_rf)
+
+# Join parcels to wards (ward boundaries GeoJSON with a 'Ward' property);
+# the OBJECTID -> Ward table is cached until boundaries or parcels change
+from wards import WardIndex, aggregate_by_ward, parcel_wards
+PROFILER.stage('wards_and_rollups')
+WARDS_GEOJSON = '/content/drive/MyDrive/gatundu_north_wards.geojson'
+ward_table = None
+if os.path.exists(WARDS_GEOJSON):
+    ward_index = WardIndex.from_geojson(WARDS_GEOJSON)
+    centroid_fc = parcels.map(
+        lambda f: ee.Feature(f.geometry().centroid(1)).set('OBJECTID', f.get('OBJECTID'))
+    )
+    # getInfo() returns at most 5000 features, so fetch the centroids in pages
+    n_parcels = centroid_fc.size().getInfo()
+    centroids = []
+    for offset in range(0, n_parcels, 5000):
+        centroids += centroid_fc.toList(5000, offset).getInfo()
+    centroid_ids = [c['properties']['OBJECTID'] for c in centroids]
+    centroid_xy = [c['geometry']['coordinates'] for c in centroids]
+    ward_table = parcel_wards(ward_index, centroid_ids, centroid_xy, '/content/drive/MyDrive')
+
+    latest = ml_data[ml_data['date'] == ml_data['date'].max()]
+    print(aggregate_by_ward(latest, ward_table))
+
+# Materialize ward / year / season rollups for the dashboard's Historical
+# Analysis tab
+from rollups import update_rollups
+if ward_table is not None:
+    ward_of = dict(zip(ward_table['OBJECTID'], ward_table['Ward']))
+    update_rollups('/content/drive/MyDrive/rollups', ml_data, ward_of)
+
+PROFILER.stage(None)
+if PROFILER.enabled:
+    PROFILER.write_prometheus('pipeline_profile.prom')
 
 # Save scaler if you used one (optional)
 # joblib.dump(scaler, "scaler.pkl")
@@ -360,4 +392,18 @@ from google.colab import drive
 drive.mount('/content/drive')
 
 !cp sweet_popatoes_stress_model.pkl /content/drive/MyDrive/
+!cp sweet_popatoes_stress_model.npz /content/drive/MyDrive/
+!cp sweet_popatoes_stress_model.csi.json /content/drive/MyDrive/
+!cp sweet_popatoes_stress_model.schema.json /content/drive/MyDrive/
 
+# -------------------------------
+# Monthly refresh (instead of a full retrain)
+# -------------------------------
+# Grow the saved forest with trees fitted on the new month only and retire the
+# oldest ones to keep 200 trees; CSI_ref uses the saved normalization stats and
+# the refreshed model is published to the registry with the saved feature schema.
+# from training import refresh_model
+# new_month = read_features(FEATURE_STORE_DIR, start='2025-11-01', end='2025-11-30',
+#                           columns=['mean_LST', 'mean_EVI', 'mean_SM', 'mean_RAINFALL'])
+# refresh_model("sweet_popatoes_stress_model.pkl", new_month, n_new_trees=20, max_trees=200,
+#               registry=registry)
@@ -0,0 +1,244 @@
+"""Versioned local model registry with atomic hot-swap for the dashboard.
+
+Layout::
+
+    <root>/
+        v0001/model.npz        compiled FlatForest
+        v0001/manifest.json    version, sha256, feature schema, CSI stats
+        v0001/surface.npy      optional slider response surface (+ .json)
+        v0001/surrogate.npz    optional distilled surrogate (+ .json metrics)
+        v0002/...
+        LATEST                 name of the current version
+
+A version directory, including its optional artifacts, is fully written
+before ``LATEST`` is atomically replaced, so readers never see a
+half-published model. ``ModelHandle``
+keeps the active model in the running app and a background thread loads,
+verifies and warms each new version before swapping it in.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+
+from forest_engine import FlatForest, compile_forest, load_forest
+from schema import FeatureSchema
+from shared_store import attach_forest, has_forest
+
+MODEL_FILE = 'model.npz'
+MANIFEST_FILE = 'manifest.json'
+LATEST_FILE = 'LATEST'
+# Optional precomputed slider response surface (surface.npy + surface.json)
+SURFACE_NAME = 'surface'
+# Optional distilled surrogate (surrogate.npz + surrogate.json)
+SURROGATE_NAME = 'surrogate'
+
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class ModelRegistry:
+    def __init__(self, root):
+        self.root = root
+
+    def version_dir(self, version):
+        return os.path.join(self.root, version)
+
+    def surface_path(self, version):
+        """Path prefix of the version's response surface (see response_surface)."""
+        return os.path.join(self.version_dir(version), SURFACE_NAME)
+
+    def surrogate_path(self, version):
+        """Path prefix of the version's distilled surrogate (see surrogate)."""
+        return os.path.join(self.version_dir(version), SURROGATE_NAME)
+
+    def versions(self):
+        if not os.path.isdir(self.root):
+            return []
+        return sorted(
+            d for d in os.listdir(self.root)
+            if d.startswith('v') and os.path.exists(os.path.join(self.root, d, MANIFEST_FILE))
+        )
+
+    def latest_version(self):
+        try:
+            with open(os.path.join(self.root, LATEST_FILE)) as f:
+                return f.read().strip() or None
+        except FileNotFoundError:
+            return None
+
+    def publish(self, model, feature_schema=None, csi_stats=None, extra=None, artifacts=None):
+        """Store ``model`` (sklearn forest or FlatForest) as the next version.
+
+        ``artifacts`` maps an artifact name (``SURFACE_NAME``, ``SURROGATE_NAME``)
+        to a function that writes it given a path prefix; each is written into
+        the version before it becomes visible. If any of them raises, nothing
+        is published.
+        """
+        os.makedirs(self.root, exist_ok=True)
+        forest = model if isinstance(model, FlatForest) else compile_forest(model)
+        if feature_schema is None and hasattr(forest, 'feature_names_in_'):
+            feature_schema = [str(c) for c in forest.feature_names_in_]
+        if isinstance(feature_schema, FeatureSchema):
+            feature_schema = feature_schema.check_model(forest).to_dict()
+
+        staging = tempfile.mkdtemp(prefix='.staging-', dir=self.root)
+        try:
+            version = self._stage(staging, forest, feature_schema, csi_stats, extra, artifacts or {})
+        except BaseException:
+            shutil.rmtree(staging, ignore_errors=True)
+            raise
+        os.rename(staging, self.version_dir(version))
+        self._set_latest(version)
+        return version
+
+    def _stage(self, staging, forest, feature_schema, csi_stats, extra, artifacts):
+        model_path = os.path.join(staging, MODEL_FILE)
+        forest.save(model_path)
+        for name, write in artifacts.items():
+            write(os.path.join(staging, name))
+
+        existing = self.versions()
+        version = f"v{int(existing[-1][1:]) + 1 if existing else 1:04d}"
+        manifest = {
+            'version': version,
+            'sha256': file_sha256(model_path),
+            'created': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+            'n_estimators': forest.n_estimators,
+            'n_nodes': forest.n_nodes,
+            'feature_schema': feature_schema,
+            'csi_stats': csi_stats,
+            'artifacts': sorted(artifacts),
+            **(extra or {}),
+        }
+        with open(os.path.join(staging, MANIFEST_FILE), 'w') as f:
+            json.dump(manifest, f, indent=2)
+        return version
+
+    def _set_latest(self, version):
+        tmp = os.path.join(self.root, f".{LATEST_FILE}.tmp")
+        with open(tmp, 'w') as f:
+            f.write(version)
+        os.replace(tmp, os.path.join(self.root, LATEST_FILE))
+
+    def rollback(self, version):
+        if version not in self.versions():
+            raise ValueError(f"Unknown model version: {version}")
+        self._set_latest(version)
+
+    def load_manifest(self, version):
+        with open(os.path.join(self.version_dir(version), MANIFEST_FILE)) as f:
+            return json.load(f)
+
+    def load(self, version=None):
+        """(FlatForest, manifest) for ``version`` (default: latest), hash-checked."""
+        version = version or self.latest_version()
+        if version is None:
+            raise FileNotFoundError(f"No published model in {self.root}")
+        manifest = self.load_manifest(version)
+        model_path = os.path.join(self.version_dir(version), MODEL_FILE)
+        if file_sha256(model_path) != manifest['sha256']:
+            raise ValueError(f"Model {version} does not match its manifest hash")
+        return FlatForest.load(model_path), manifest
+
+
+def load_local_model(model_path):
+    """Model outside the registry: shared mmap copy, compiled ``.npz``, pickle or None."""
+    # Replicas on the same host attach to one memory-mapped copy of the model
+    if has_forest():
+        return attach_forest()
+    # Prefer the compiled flat forest: loads without unpickling 200 sklearn trees
+    compiled_path = os.path.splitext(model_path)[0] + ".npz"
+    if os.path.exists(compiled_path):
+        return load_forest(compiled_path)
+    if os.path.exists(model_path):
+        import joblib  # imports scikit-learn on unpickle; only needed here
+        return joblib.load(model_path)
+    return None
+
+
+def warm_up(model):
+    """Run one dummy prediction so the first real request pays no setup cost."""
+    model.predict(np.zeros((1, model.n_features_in_)))
+
+
+class ModelHandle:
+    """The app's current model, swapped atomically when a new version lands.
+
+    ``current`` is a single (model, manifest) tuple replaced in one
+    assignment, so a rerun that already read it keeps a consistent pair
+    while the watcher thread loads and warms the next version.
+    """
+
+    def __init__(self, registry, poll_interval=30.0):
+        self.registry = registry
+        self.poll_interval = poll_interval
+        self.current = (None, None)
+        self.last_error = None
+        self.load_seconds = None
+        # Set once the first load attempt has finished (model or not)
+        self.ready = threading.Event()
+        self._lock = threading.Lock()
+        self._thread = None
+
+    @property
+    def model(self):
+        return self.current[0]
+
+    @property
+    def manifest(self):
+        return self.current[1]
+
+    def refresh(self):
+        """Load, warm and swap in the latest version if it changed."""
+        with self._lock:
+            try:
+                latest = self.registry.latest_version()
+                active = self.manifest['version'] if self.manifest else None
+                if latest is None or latest == active:
+                    return False
+                start = time.perf_counter()
+                try:
+                    model, manifest = self.registry.load(latest)
+                    warm_up(model)
+                except Exception as exc:  # keep serving the current model
+                    self.last_error = f"{latest}: {exc}"
+                    return False
+                self.current = (model, manifest)
+                self.load_seconds = time.perf_counter() - start
+                self.last_error = None
+                return True
+            finally:
+                self.ready.set()
+
+    def wait_ready(self, timeout=None):
+        """Block until the first load attempt is done; returns ``current``."""
+        self.ready.wait(timeout)
+        return self.current
+
+    def start_watcher(self, load_now=False):
+        """Start the watcher thread; ``load_now`` loads in it instead of the caller."""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._watch, args=(load_now,),
+                                            name='model-watcher', daemon=True)
+            self._thread.start()
+        return self
+
+    def _watch(self, load_now=False):
+        if load_now:
+            self.refresh()
+        while True:
+            time.sleep(self.poll_interval)
+            self.refresh()
@@ -0,0 +1,104 @@
+"""Precomputed stress response surface over the Risk Assessment sliders.
+
+The tab 2 sliders only span temperature 20-40 °C, soil moisture 20-100 %
+and NDVI 0-1, so the model's response can be tabulated once per model
+version on a dense 3-D grid and queried by trilinear interpolation. The
+grid is stored as a float16/float32 ``.npy`` (memory-mapped on load) with a
+small JSON sidecar holding the axes and the measured interpolation error.
+"""
+
+import json
+
+import numpy as np
+
+# Slider order matches the dashboard inputs: [temperature, soil moisture, NDVI]
+SLIDER_AXES = (
+    ('Temperature (°C)', 20.0, 40.0),
+    ('Soil Moisture (%)', 20.0, 100.0),
+    ('NDVI', 0.0, 1.0),
+)
+GRID_SHAPE = (81, 81, 101)
+
+CHUNK_POINTS = 50_000
+
+
+class ResponseSurface:
+    def __init__(self, values, lows, highs, error=None):
+        self.values = values
+        self.lows = np.asarray(lows, dtype=np.float64)
+        self.highs = np.asarray(highs, dtype=np.float64)
+        self.shape = np.array(values.shape)
+        self.error = error
+
+    @classmethod
+    def build(cls, predict, axes=SLIDER_AXES, shape=GRID_SHAPE, dtype=np.float16):
+        """Evaluate ``predict`` (N x 3 -> N) on every grid node, in chunks.
+
+        Raises ValueError if ``predict`` returns the wrong number of values
+        or any non-finite one, rather than tabulating a broken model.
+        """
+        lows = [lo for _, lo, _ in axes]
+        highs = [hi for _, _, hi in axes]
+        grids = [np.linspace(lo, hi, n) for lo, hi, n in zip(lows, highs, shape)]
+        mesh = np.stack(np.meshgrid(*grids, indexing='ij'), axis=-1).reshape(-1, len(axes))
+
+        flat = np.empty(len(mesh), dtype=np.float64)
+        for start in range(0, len(mesh), CHUNK_POINTS):
+            chunk = mesh[start:start + CHUNK_POINTS]
+            values = np.asarray(predict(chunk), dtype=np.float64)
+            if values.shape != (len(chunk),):
+                raise ValueError(f"predict returned shape {values.shape} for {len(chunk)} grid points")
+            if not np.isfinite(values).all():
+                raise ValueError("predict returned non-finite values on the slider grid")
+            flat[start:start + len(chunk)] = values
+        return cls(flat.reshape(shape).astype(dtype), lows, highs)
+
+    def query(self, points):
+        """Trilinear interpolation at ``points`` (N x 3 or a single row)."""
+        points = np.atleast_2d(np.asarray(points, dtype=np.float64))
+        # Fractional grid coordinates, clamped to the slider ranges
+        pos = (points - self.lows) / (self.highs - self.lows) * (self.shape - 1)
+        pos = np.clip(pos, 0, self.shape - 1)
+        base = np.minimum(pos.astype(np.int64), self.shape - 2)
+        frac = pos - base
+
+        out = np.zeros(len(points))
+        for corner in range(8):
+            offset = np.array([(corner >> 2) & 1, (corner >> 1) & 1, corner & 1])
+            idx = base + offset
+            weight = np.prod(np.where(offset, frac, 1 - frac), axis=1)
+            out += weight * self.values[idx[:, 0], idx[:, 1], idx[:, 2]]
+        return out
+
+    def check_error(self, predict, n_samples=20_000, seed=0):
+        """Max / mean / p99 absolute error against ``predict`` at random points."""
+        rng = np.random.default_rng(seed)
+        points = self.lows + rng.random((n_samples, len(self.lows))) * (self.highs - self.lows)
+        err = np.abs(self.query(points) - predict(points))
+        self.error = {
+            'max_abs': float(err.max()),
+            'mean_abs': float(err.mean()),
+            'p99_abs': float(np.quantile(err, 0.99)),
+            'n_samples': int(n_samples),
+        }
+        return self.error
+
+    # ==================== PERSISTENCE ====================
+    def save(self, path):
+        """Write ``<path>.npy`` and ``<path>.json``."""
+        np.save(f"{path}.npy", self.values)
+        with open(f"{path}.json", 'w') as f:
+            json.dump({
+                'lows': self.lows.tolist(),
+                'highs': self.highs.tolist(),
+                'shape': self.shape.tolist(),
+                'dtype': str(self.values.dtype),
+                'error': self.error,
+            }, f, indent=2)
+
+    @classmethod
+    def load(cls, path, mmap=True):
+        with open(f"{path}.json") as f:
+            meta = json.load(f)
+        values = np.load(f"{path}.npy", mmap_mode='r' if mmap else None)
+        return cls(values, meta['lows'], meta['highs'], meta.get('error'))
@@ -0,0 +1,139 @@
+"""Materialized ward / year / season aggregates of the scored parcel history.
+
+The base table is per (Ward, Year, Month) and stores additive sums, so a
+new month of scored parcels only replaces its own rows (``update_rollups``)
+and the yearly and seasonal tables are re-derived from the small monthly
+table. The dashboard's Historical Analysis tab reads these tables instead
+of regenerating history on every rerun.
+"""
+
+import os
+
+import pandas as pd
+
+ROLLUP_KEYS = ['Ward', 'Year', 'Month']
+
+# Gatundu North rainfall seasons by calendar month
+SEASONS = {
+    1: 'Jan-Feb dry', 2: 'Jan-Feb dry',
+    3: 'Long rains', 4: 'Long rains', 5: 'Long rains',
+    6: 'Jun-Sep cool dry', 7: 'Jun-Sep cool dry', 8: 'Jun-Sep cool dry', 9: 'Jun-Sep cool dry',
+    10: 'Short rains', 11: 'Short rains', 12: 'Short rains',
+}
+
+MONTHLY_FILE = 'ward_monthly.csv'
+YEARLY_FILE = 'ward_yearly.csv'
+SEASONAL_FILE = 'ward_seasonal.csv'
+
+
+def monthly_rollup(scored, ward_of=None):
+    """Additive per (Ward, Year, Month) sums from scored parcel rows.
+
+    ``scored`` needs OBJECTID, date, Predicted_CSI and the mean_* features;
+    ``ward_of`` maps OBJECTID -> ward when there is no ``Ward`` column.
+    Rows are daily unless an ``interval_days`` column (compositing) gives
+    the number of days each row stands for.
+    """
+    df = scored
+    if 'Ward' not in df:
+        df = df.assign(Ward=df['OBJECTID'].map(ward_of))
+    df = df.dropna(subset=['Ward'])
+    dates = pd.to_datetime(df['date'])
+    # Each distinct date covers one day, or its whole interval for composites
+    span = df['interval_days'] if 'interval_days' in df else 1
+    df = df.assign(Year=dates.dt.year, Month=dates.dt.month, day=dates.dt.normalize(), span=span)
+
+    monthly = df.groupby(ROLLUP_KEYS).agg(
+        rows=('Predicted_CSI', 'size'),
+        csi_sum=('Predicted_CSI', 'sum'),
+        evi_sum=('mean_EVI', 'sum'),
+        lst_sum=('mean_LST', 'sum'),
+        rain_sum=('mean_RAINFALL', 'sum'),
+    )
+    monthly.insert(1, 'days', df.drop_duplicates(ROLLUP_KEYS + ['day']).groupby(ROLLUP_KEYS)['span'].sum())
+    monthly = monthly.reset_index()
+    # Ward-average daily rainfall x days covered: additive across months
+    monthly['rain_mm'] = monthly['rain_sum'] / monthly['rows'] * monthly['days']
+    return monthly
+
+
+def _finalize(sums, keys):
+    out = sums[keys].copy()
+    out['Stress Level'] = sums['csi_sum'] / sums['rows']
+    out['EVI'] = sums['evi_sum'] / sums['rows']
+    out['Temperature (°C)'] = sums['lst_sum'] / sums['rows']
+    out['Rainfall (mm)'] = sums['rain_mm']
+    return out
+
+
+def derive_tables(monthly):
+    """Yearly and seasonal tables from the monthly sums."""
+    sum_cols = ['rows', 'csi_sum', 'evi_sum', 'lst_sum', 'rain_mm']
+
+    yearly = _finalize(monthly.groupby(['Ward', 'Year'])[sum_cols].sum().reset_index(), ['Ward', 'Year'])
+    yearly = yearly.sort_values(['Ward', 'Year']).reset_index(drop=True)
+    yearly['Stress YoY'] = yearly.groupby('Ward')['Stress Level'].diff()
+
+    seasonal = monthly.assign(Season=monthly['Month'].map(SEASONS))
+    seasonal = _finalize(
+        seasonal.groupby(['Ward', 'Year', 'Season'])[sum_cols].sum().reset_index(),
+        ['Ward', 'Year', 'Season'],
+    )
+    return yearly, seasonal
+
+
+def update_rollups(rollup_dir, scored_new, ward_of=None):
+    """Merge newly scored months into the stored rollups and re-derive tables.
+
+    Months present in ``scored_new`` replace their existing rows, so
+    re-running a month is idempotent.
+    """
+    os.makedirs(rollup_dir, exist_ok=True)
+    new = monthly_rollup(scored_new, ward_of)
+
+    path = os.path.join(rollup_dir, MONTHLY_FILE)
+    if os.path.exists(path):
+        old = pd.read_csv(path)
+        replaced = old.set_index(ROLLUP_KEYS).index.isin(new.set_index(ROLLUP_KEYS).index)
+        monthly = pd.concat([old[~replaced], new], ignore_index=True)
+    else:
+        monthly = new
+    monthly = monthly.sort_values(ROLLUP_KEYS).reset_index(drop=True)
+
+    yearly, seasonal = derive_tables(monthly)
+    monthly.to_csv(path, index=False)
+    yearly.to_csv(os.path.join(rollup_dir, YEARLY_FILE), index=False)
+    seasonal.to_csv(os.path.join(rollup_dir, SEASONAL_FILE), index=False)
+    return monthly, yearly, seasonal
+
+
+def load_rollups(rollup_dir):
+    """(yearly, seasonal) tables, or None when nothing has been materialized."""
+    yearly_path = os.path.join(rollup_dir, YEARLY_FILE)
+    if not os.path.exists(yearly_path):
+        return None
+    return pd.read_csv(yearly_path), pd.read_csv(os.path.join(rollup_dir, SEASONAL_FILE))
+
+
+def add_yield_proxy(yearly, base_yields):
+    """Add ``Yield (ton/ha)``: the ward's base yield scaled by the year's EVI
+    relative to the ward's long-run EVI, plus its year-over-year change."""
+    yearly = yearly.sort_values(['Ward', 'Year']).copy()
+    rel_evi = yearly['EVI'] / yearly.groupby('Ward')['EVI'].transform('mean')
+    yearly['Yield (ton/ha)'] = yearly['Ward'].map(base_yields) * rel_evi
+    yearly['Yield YoY %'] = yearly.groupby('Ward')['Yield (ton/ha)'].pct_change() * 100
+    return yearly
+
+
+def year_over_year(yearly, value_col, base_year, compare_year, wards=None):
+    """Per-ward comparison of ``value_col`` between two years, vectorized."""
+    table = yearly.pivot(index='Ward', columns='Year', values=value_col)
+    if wards is not None:
+        table = table.reindex(wards)
+    base, other = table[base_year], table[compare_year]
+    return pd.DataFrame({
+        'Ward': table.index,
+        'base': base.to_numpy(),
+        'compare': other.to_numpy(),
+        'Reduction %': ((base - other) / base * 100).to_numpy(),
+    })
@@ -0,0 +1,186 @@
+"""Feature schema saved with the model: column order, units and derivations.
+
+The forest is trained on ``FEATURE_COLS``. Callers that hold other inputs
+(the dashboard sliders: temperature, soil moisture %, NDVI) compile the
+schema for their input layout once; every model column is then an
+identity, a linear derivation of one input (NDVI -> EVI, soil moisture
+% -> SMAP mm) or a constant default (rainfall), so a whole batch becomes
+the model matrix in a single ``X @ A + b``. Missing inputs, wrong widths,
+NaNs and models that do not match the schema raise ``SchemaError``.
+"""
+
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from features import FEATURE_COLS
+from response_surface import SLIDER_AXES
+
+# Dashboard slider inputs, in slider / response-surface order
+DASHBOARD_INPUTS = tuple(name for name, _, _ in SLIDER_AXES)
+
+# SMAP 10 km surface soil moisture ('ssm') is a water depth in mm over a
+# 25.4 mm layer, so a saturation percentage maps linearly onto it
+SMAP_SSM_CAPACITY_MM = 25.4
+
+FEATURE_UNITS = {
+    'mean_LST': '°C',
+    'mean_EVI': 'index',
+    'mean_SM': 'mm',
+    'mean_RAINFALL': 'mm/day',
+}
+
+# Used until FeatureSchema.fit() has seen paired NDVI/EVI exports: a rough
+# Sentinel-2 cropland ratio; fitted coefficients replace it on publish
+DEFAULT_DERIVATIONS = {
+    'mean_LST': {'from': 'Temperature (°C)', 'scale': 1.0, 'offset': 0.0},
+    'mean_EVI': {'from': 'NDVI', 'scale': 0.65, 'offset': 0.0},
+    'mean_SM': {'from': 'Soil Moisture (%)', 'scale': SMAP_SSM_CAPACITY_MM / 100, 'offset': 0.0},
+    'mean_RAINFALL': {'default': 2.5},
+}
+
+
+class SchemaError(ValueError):
+    pass
+
+
+class CompiledSchema:
+    """``transform`` for one input layout: model matrix = inputs @ A + b."""
+
+    def __init__(self, inputs, columns, A, b):
+        self.inputs = tuple(inputs)
+        self.columns = tuple(columns)
+        self.A = A
+        self.b = b
+
+    def transform(self, data):
+        """Model input matrix (N x len(columns), float64) for a batch.
+
+        ``data`` is a DataFrame holding the input columns or an array whose
+        columns are in ``inputs`` order; a single row may be 1-D.
+        """
+        if isinstance(data, pd.DataFrame):
+            missing = [c for c in self.inputs if c not in data]
+            if missing:
+                raise SchemaError(f"Missing input columns: {missing}")
+            X = data[list(self.inputs)].to_numpy(dtype=np.float64)
+        else:
+            X = np.asarray(data, dtype=np.float64)
+            if X.ndim == 1:
+                X = X.reshape(1, -1)
+        if X.ndim != 2 or X.shape[1] != len(self.inputs):
+            raise SchemaError(f"Expected {len(self.inputs)} input columns {list(self.inputs)}, "
+                              f"got shape {X.shape}")
+        if np.isnan(X).any():
+            raise SchemaError("Inputs contain NaN; drop or fill them before scoring")
+        return X @ self.A + self.b
+
+    def transform_frame(self, data):
+        """``transform`` as a DataFrame with the model's column names."""
+        index = data.index if isinstance(data, pd.DataFrame) else None
+        return pd.DataFrame(self.transform(data), columns=list(self.columns), index=index)
+
+
+class FeatureSchema:
+    def __init__(self, columns=FEATURE_COLS, units=None, derivations=None):
+        self.columns = tuple(columns)
+        self.units = dict(FEATURE_UNITS if units is None else units)
+        self.derivations = {c: dict(d) for c, d in (derivations or {}).items()}
+        self._compiled = {}
+
+    @classmethod
+    def default(cls):
+        return cls(FEATURE_COLS, FEATURE_UNITS, DEFAULT_DERIVATIONS)
+
+    @classmethod
+    def fit(cls, data, ndvi_pairs=None):
+        """Schema with derivations estimated from the training data.
+
+        * EVI from NDVI: least-squares line through ``ndvi_pairs``
+          (rows with both ``mean_NDVI`` and ``mean_EVI``); the default
+          mapping is kept when either column is missing (e.g. no NDVI export).
+        * Default rainfall: median daily rate over the past 30 days
+          (``Rain_30d / 30``), or the median of ``mean_RAINFALL``.
+        """
+        derivations = {c: dict(d) for c, d in DEFAULT_DERIVATIONS.items()}
+
+        if ndvi_pairs is not None and {'mean_NDVI', 'mean_EVI'} <= set(ndvi_pairs.columns):
+            pairs = ndvi_pairs[['mean_NDVI', 'mean_EVI']].dropna()
+            if len(pairs) >= 2:
+                scale, offset = np.polyfit(pairs['mean_NDVI'], pairs['mean_EVI'], 1)
+                derivations['mean_EVI'] = {'from': 'NDVI', 'scale': float(scale), 'offset': float(offset)}
+
+        if 'Rain_30d' in data:
+            rain = data['Rain_30d'].dropna() / 30
+        else:
+            rain = data['mean_RAINFALL'].dropna()
+        if len(rain):
+            derivations['mean_RAINFALL'] = {'default': float(rain.median())}
+        return cls(FEATURE_COLS, FEATURE_UNITS, derivations)
+
+    # ==================== COMPILATION ====================
+    def compile(self, inputs=None):
+        """CompiledSchema for ``inputs`` (default: the model columns themselves)."""
+        inputs = tuple(self.columns if inputs is None else inputs)
+        compiled = self._compiled.get(inputs)
+        if compiled is not None:
+            return compiled
+
+        position = {name: i for i, name in enumerate(inputs)}
+        A = np.zeros((len(inputs), len(self.columns)))
+        b = np.zeros(len(self.columns))
+        for j, column in enumerate(self.columns):
+            rule = self.derivations.get(column, {})
+            if column in position:
+                A[position[column], j] = 1.0
+            elif rule.get('from') in position:
+                A[position[rule['from']], j] = rule.get('scale', 1.0)
+                b[j] = rule.get('offset', 0.0)
+            elif 'default' in rule:
+                b[j] = rule['default']
+            else:
+                raise SchemaError(f"Cannot derive model column {column!r} from inputs {list(inputs)}")
+
+        compiled = self._compiled[inputs] = CompiledSchema(inputs, self.columns, A, b)
+        return compiled
+
+    def transform(self, data, inputs=None):
+        return self.compile(inputs).transform(data)
+
+    def check_model(self, model):
+        """Raise unless ``model`` takes exactly this schema's columns, in order."""
+        n = getattr(model, 'n_features_in_', None)
+        if n is not None and n != len(self.columns):
+            raise SchemaError(f"Model expects {n} features, schema has {len(self.columns)}: {list(self.columns)}")
+        names = getattr(model, 'feature_names_in_', None)
+        if names is not None and tuple(str(c) for c in names) != self.columns:
+            raise SchemaError(f"Model features {list(names)} do not match schema {list(self.columns)}")
+        return self
+
+    # ==================== PERSISTENCE ====================
+    def to_dict(self):
+        return {'columns': list(self.columns), 'units': self.units, 'derivations': self.derivations}
+
+    @classmethod
+    def from_dict(cls, data):
+        """Inverse of ``to_dict``; a bare column list (older manifests) gets
+        the default units and derivations."""
+        if isinstance(data, (list, tuple)):
+            return cls(data, FEATURE_UNITS, DEFAULT_DERIVATIONS)
+        return cls(data['columns'], data.get('units'), data.get('derivations'))
+
+    def save(self, path):
+        with open(path, 'w') as f:
+            json.dump(self.to_dict(), f, indent=2)
+
+    @classmethod
+    def load(cls, path):
+        with open(path) as f:
+            return cls.from_dict(json.load(f))
+
+
+def schema_path(model_path):
+    """Schema file saved next to a model: ``model.pkl`` -> ``model.schema.json``."""
+    return f"{os.path.splitext(model_path)[0]}.schema.json"
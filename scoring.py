@@ -0,0 +1,73 @@
+"""Batch stress scoring shared by the dashboard and offline jobs.
+
+Every function here works on a whole N x F feature matrix at once, so a
+200-tree forest is called once per batch instead of once per ward/parcel.
+"""
+
+import numpy as np
+import pandas as pd
+
+from tiering import DASHBOARD_TIERS
+
+# ==================== WARD ADJUSTMENTS ====================
+# Ward-specific adjustments applied on top of the model output
+WARD_STRESS_MULTIPLIERS = {
+    "Gituamba": 1.2,  # Higher risk area
+    "Kamwangi": 0.9,  # Better conditions
+}
+
+
+def simulated_stress(X):
+    """Hand-written stress formula used when no model is available.
+
+    Columns of ``X`` are [temperature, soil moisture, NDVI].
+    """
+    X = np.asarray(X, dtype=float)
+    return (X[:, 0] / 40 * 0.4) + ((100 - X[:, 1]) / 100 * 0.4) + ((1 - X[:, 2]) / 2 * 0.2)
+
+
+def predict_stress(model, X, schema=None):
+    """Predict stress for every row of ``X`` with a single model call.
+
+    ``schema`` (a ``schema.CompiledSchema``) turns ``X`` from its input
+    layout into the model matrix first. Without a model the hand-written
+    formula is used on the dashboard inputs; model errors are raised.
+    """
+    if model is None:
+        X = np.asarray(X, dtype=float)
+        return simulated_stress(X.reshape(1, -1) if X.ndim == 1 else X)
+    if schema is not None:
+        X = schema.transform(X)
+    elif isinstance(X, pd.DataFrame):
+        # Keep the column names sklearn checks against feature_names_in_
+        X = X.astype(float)
+    else:
+        X = np.asarray(X, dtype=float)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+    if hasattr(model, 'predict_proba'):
+        return np.asarray(model.predict_proba(X))[:, 1]
+    return np.asarray(model.predict(X), dtype=float)
+
+
+def ward_multipliers(wards):
+    """Per-row stress multipliers for a sequence of ward names."""
+    return np.array([WARD_STRESS_MULTIPLIERS.get(w, 1.0) for w in wards], dtype=float)
+
+
+def score_batch(model, X, wards=None, tiers=DASHBOARD_TIERS, schema=None):
+    """Score a batch of feature rows in one vectorized call.
+
+    Returns a DataFrame with 'Stress Probability', 'Risk Level' and
+    'Premium' columns, one row per input row; the tier columns are
+    categoricals from ``tiers``. ``schema`` is passed to ``predict_stress``.
+    """
+    stress = predict_stress(model, X, schema)
+    if wards is not None:
+        stress = stress * ward_multipliers(wards)
+
+    return pd.DataFrame({
+        'Stress Probability': stress,
+        'Risk Level': tiers.classify(stress),
+        'Premium': tiers.premium(stress),
+    })
@@ -0,0 +1,349 @@
+"""Headless HTTP scoring service with request micro-batching.
+
+Runs without Streamlit on plain asyncio and uses the dashboard's model
+loading (registry first, with hot-swap, then the local model chain).
+Concurrent requests are queued and coalesced into one model call of up to
+``max_batch`` rows, waiting at most ``max_wait_ms`` for a batch to fill,
+so many small requests cost about as much as one bulk request.
+
+Endpoints::
+
+    POST /score   {"features": [..]} or {"features": [[..], ..]}, optional "wards"
+                  and "columns" (input names, default: the model's feature columns;
+                  the dashboard inputs are derived through the feature schema)
+    GET  /stats   latency percentiles, batch sizes, model version
+    GET  /health
+
+Run locally with ``python service.py --port 8080``.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import time
+from collections import deque
+
+import numpy as np
+
+from registry import ModelHandle, ModelRegistry, load_local_model
+from schema import DASHBOARD_INPUTS, FeatureSchema, SchemaError, schema_path
+from scoring import score_batch
+from tiering import INSURANCE_TIERS
+
+MODEL_REGISTRY_DIR = os.environ.get(
+    "MKULIMA_MODEL_REGISTRY",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "model_registry")
+)
+MODEL_PATH = os.environ.get("MKULIMA_MODEL_PATH", "sweet_popatoes_stress_model.pkl")
+
+MAX_BATCH = 512
+MAX_WAIT_MS = 5.0
+# Latencies kept for the percentile report
+LATENCY_WINDOW = 10_000
+STATUS_TEXT = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed',
+               500: 'Internal Server Error'}
+
+
+class BadRequest(ValueError):
+    pass
+
+
+# ==================== MODEL ====================
+class ServiceModel:
+    """Registry model with hot-swap, falling back to ``load_local_model``."""
+
+    def __init__(self, registry_dir=MODEL_REGISTRY_DIR, model_path=MODEL_PATH):
+        self.handle = ModelHandle(ModelRegistry(registry_dir))
+        self.handle.refresh()
+        self.handle.start_watcher()
+        self.model_path = model_path
+        self.fallback = load_local_model(model_path)
+        self._schemas = {}
+
+    @property
+    def current(self):
+        model, manifest = self.handle.current
+        if model is None:
+            return self.fallback, None
+        return model, manifest
+
+    def schema(self, model, manifest):
+        """Feature schema of the current model, checked against it once per version."""
+        version = manifest['version'] if manifest else None
+        schema = self._schemas.get(version)
+        if schema is None:
+            if manifest and manifest.get('feature_schema'):
+                schema = FeatureSchema.from_dict(manifest['feature_schema'])
+            elif manifest is None and os.path.exists(schema_path(self.model_path)):
+                schema = FeatureSchema.load(schema_path(self.model_path))
+            else:
+                schema = FeatureSchema.default()
+            schema = self._schemas[version] = schema.check_model(model)
+        return schema
+
+
+# ==================== LATENCY ====================
+class LatencyTracker:
+    """Rolling window of request latencies and batch sizes."""
+
+    def __init__(self, window=LATENCY_WINDOW):
+        self.latencies = deque(maxlen=window)
+        self.batch_sizes = deque(maxlen=window)
+        self.requests = 0
+        self.rows = 0
+        self.started = time.monotonic()
+
+    def record(self, seconds, rows):
+        self.latencies.append(seconds)
+        self.requests += 1
+        self.rows += rows
+
+    def record_batch(self, rows):
+        self.batch_sizes.append(rows)
+
+    def summary(self):
+        uptime = time.monotonic() - self.started
+        out = {
+            'requests': self.requests,
+            'rows': self.rows,
+            'uptime_s': round(uptime, 1),
+            'requests_per_s': round(self.requests / uptime, 1) if uptime else 0.0,
+        }
+        if self.latencies:
+            ms = np.fromiter(self.latencies, dtype=np.float64) * 1000
+            for q in (50, 90, 99):
+                out[f'p{q}_ms'] = round(float(np.percentile(ms, q)), 3)
+            out['max_ms'] = round(float(ms.max()), 3)
+        if self.batch_sizes:
+            sizes = np.fromiter(self.batch_sizes, dtype=np.int64)
+            out['batches'] = len(sizes)
+            out['mean_batch_rows'] = round(float(sizes.mean()), 1)
+            out['max_batch_rows'] = int(sizes.max())
+        return out
+
+
+# ==================== MICRO-BATCHING ====================
+class MicroBatcher:
+    """Coalesce concurrent scoring requests into single model calls."""
+
+    def __init__(self, tracker, max_batch=MAX_BATCH, max_wait_ms=MAX_WAIT_MS, tiers=INSURANCE_TIERS):
+        self.tracker = tracker
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000
+        self.tiers = tiers
+        self.queue = asyncio.Queue()
+        self._task = None
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+        return self
+
+    async def submit(self, X, wards=None, model=None):
+        """Score ``X`` with ``model``: the model the request was validated
+        against, so a hot-swap while it is queued cannot change it."""
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put((X, wards, model, future))
+        return await future
+
+    async def _collect(self):
+        batch = [await self.queue.get()]
+        rows = len(batch[0][0])
+        deadline = time.monotonic() + self.max_wait
+        while rows < self.max_batch:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                item = await asyncio.wait_for(self.queue.get(), remaining)
+            except asyncio.TimeoutError:
+                break
+            batch.append(item)
+            rows += len(item[0])
+        return batch
+
+    async def _run(self):
+        while True:
+            batch = await self._collect()
+            # One model call per model version in the batch (a hot-swap can
+            # land between requests), in arrival order
+            groups = {}
+            for item in batch:
+                groups.setdefault(id(item[2]), []).append(item)
+            for group in groups.values():
+                await self._score(group)
+
+    async def _score(self, batch):
+        loop = asyncio.get_running_loop()
+        model = batch[0][2]
+        try:
+            X = np.vstack([item[0] for item in batch])
+            wards = None
+            if any(item[1] is not None for item in batch):
+                wards = [w for X_i, w_i, _, _ in batch for w in (w_i or [None] * len(X_i))]
+            self.tracker.record_batch(len(X))
+            # The forest call runs off the event loop so new requests keep queueing
+            scored = await loop.run_in_executor(None, score_batch, model, X, wards, self.tiers)
+        except Exception as exc:
+            # Only this batch's requests fail; the loop keeps serving
+            for *_, future in batch:
+                if not future.done():
+                    future.set_exception(exc)
+            return
+        # Convert once per batch; per-request slicing is then list slicing
+        columns = {
+            'stress': np.round(scored['Stress Probability'].to_numpy(), 6).tolist(),
+            'risk_level': scored['Risk Level'].astype(str).tolist(),
+            'premium': scored['Premium'].astype(str).tolist(),
+        }
+        start = 0
+        for X_i, *_, future in batch:
+            if not future.done():
+                future.set_result({k: v[start:start + len(X_i)] for k, v in columns.items()})
+            start += len(X_i)
+
+
+# ==================== REQUESTS ====================
+def parse_payload(body):
+    """Feature matrix, optional ward list and input column names from a /score body."""
+    try:
+        payload = json.loads(body or b'{}')
+    except ValueError as exc:
+        raise BadRequest(f"Invalid JSON: {exc}")
+    if not isinstance(payload, dict) or 'features' not in payload:
+        raise BadRequest("Expected a JSON object with 'features'")
+    try:
+        X = np.asarray(payload['features'], dtype=np.float64)
+    except (TypeError, ValueError):
+        raise BadRequest("'features' must be numeric")
+    if X.ndim == 1:
+        X = X.reshape(1, -1)
+    if X.ndim != 2 or len(X) == 0:
+        raise BadRequest("'features' must be a row or a list of rows")
+
+    wards = payload.get('wards')
+    if isinstance(wards, str):
+        wards = [wards]
+    if wards is not None and len(wards) != len(X):
+        raise BadRequest("'wards' must have one entry per feature row")
+    return X, wards, payload.get('columns')
+
+
+class ScoringService:
+    def __init__(self, model, max_batch=MAX_BATCH, max_wait_ms=MAX_WAIT_MS):
+        self.model = model
+        self.tracker = LatencyTracker()
+        self.batcher = MicroBatcher(self.tracker, max_batch, max_wait_ms)
+
+    async def score(self, body):
+        start = time.perf_counter()
+        model, manifest = self.model.current
+        X, wards, columns = parse_payload(body)
+        if model is None:
+            # Hand-written formula: dashboard inputs only
+            if columns not in (None, list(DASHBOARD_INPUTS)) or X.shape[1] != len(DASHBOARD_INPUTS):
+                raise BadRequest(f"No model loaded; send the dashboard inputs {list(DASHBOARD_INPUTS)}")
+        else:
+            schema = self.model.schema(model, manifest)
+            try:
+                X = schema.transform(X, columns)
+            except SchemaError as exc:
+                raise BadRequest(str(exc))
+        scored = await self.batcher.submit(X, wards, model)
+        self.tracker.record(time.perf_counter() - start, len(X))
+        return {'model_version': manifest['version'] if manifest else None, **scored}
+
+    def stats(self):
+        model, manifest = self.model.current
+        return {
+            **self.tracker.summary(),
+            'model_version': manifest['version'] if manifest else None,
+            'model_loaded': model is not None,
+            'max_batch': self.batcher.max_batch,
+            'max_wait_ms': self.batcher.max_wait * 1000,
+        }
+
+    async def route(self, method, path, body):
+        if path == '/score':
+            if method != 'POST':
+                return 405, {'error': 'Use POST'}
+            return 200, await self.score(body)
+        if path == '/stats':
+            return 200, self.stats()
+        if path == '/health':
+            return 200, {'status': 'ok'}
+        return 404, {'error': f'Unknown path {path}'}
+
+    # ==================== HTTP ====================
+    async def handle(self, reader, writer):
+        # Minimal HTTP/1.1 with keep-alive; one request at a time per connection
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                try:
+                    method, path, version = request_line.decode('latin-1').split()
+                except ValueError:
+                    break
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    key, _, value = line.decode('latin-1').partition(':')
+                    headers[key.strip().lower()] = value.strip()
+                body = await reader.readexactly(int(headers.get('content-length', 0) or 0))
+
+                try:
+                    status, payload = await self.route(method, path.split('?', 1)[0], body)
+                except BadRequest as exc:
+                    status, payload = 400, {'error': str(exc)}
+                except Exception as exc:
+                    status, payload = 500, {'error': str(exc)}
+
+                keep_alive = headers.get('connection', '').lower() != 'close' and version == 'HTTP/1.1'
+                data = json.dumps(payload).encode()
+                writer.write(
+                    f"HTTP/1.1 {status} {STATUS_TEXT.get(status, '')}\r\n"
+                    f"Content-Type: application/json\r\n"
+                    f"Content-Length: {len(data)}\r\n"
+                    f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode() + data
+                )
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self, host='127.0.0.1', port=8080):
+        self.batcher.start()
+        server = await asyncio.start_server(self.handle, host, port)
+        print(f"Scoring service on http://{host}:{port} "
+              f"(max_batch={self.batcher.max_batch}, max_wait_ms={self.batcher.max_wait * 1000:g})")
+        async with server:
+            await server.serve_forever()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--max-batch', type=int, default=MAX_BATCH)
+    parser.add_argument('--max-wait-ms', type=float, default=MAX_WAIT_MS)
+    parser.add_argument('--registry', default=MODEL_REGISTRY_DIR)
+    parser.add_argument('--model-path', default=MODEL_PATH)
+    args = parser.parse_args(argv)
+
+    service = ScoringService(ServiceModel(args.registry, args.model_path), args.max_batch, args.max_wait_ms)
+    try:
+        asyncio.run(service.serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
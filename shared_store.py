@@ -0,0 +1,88 @@
+"""Memory-mapped serving of the stress model.
+
+A publisher writes every forest array to its own ``.npy`` file under a
+serving directory (ideally on ``/dev/shm`` or a local SSD). Dashboard
+replicas then attach with ``np.load(..., mmap_mode='r')``: the pages are
+shared through the OS page cache, so adding a worker does not add another
+copy of the forest and nothing is deserialized at startup.
+
+Layout::
+
+    <serve_dir>/
+        forest -> .forest-<id>      symlink, swapped atomically on publish
+        .forest-<id>/<array>.npy
+"""
+
+import os
+import shutil
+import tempfile
+
+import numpy as np
+
+from forest_engine import FlatForest
+
+# Serving directory shared by all replicas on the host
+SERVE_DIR = os.environ.get("MKULIMA_SERVE_DIR", "")
+
+FOREST_DIR = "forest"
+
+
+def _publish_arrays(arrays, target):
+    """Write arrays to a fresh directory and atomically repoint ``target`` at it.
+
+    ``target`` is a symlink replaced with ``os.replace``, so readers see
+    either the old or the new complete set of arrays. The previous
+    directory is kept for readers still attaching to it; older ones are
+    removed (mappings already made stay valid).
+    """
+    parent = os.path.dirname(os.path.abspath(target))
+    name = os.path.basename(target)
+    os.makedirs(parent, exist_ok=True)
+    staging = tempfile.mkdtemp(prefix=f".{name}-", dir=parent)
+    for key, arr in arrays.items():
+        np.save(os.path.join(staging, f"{key}.npy"), np.ascontiguousarray(arr))
+
+    previous = None
+    if os.path.islink(target):
+        previous = os.readlink(target)
+    elif os.path.isdir(target):
+        # Plain directory from before symlinked publishing: move it aside once
+        previous = f".{name}-legacy"
+        shutil.rmtree(os.path.join(parent, previous), ignore_errors=True)
+        os.rename(target, os.path.join(parent, previous))
+
+    link = os.path.join(parent, f".{name}.link-{os.getpid()}")
+    if os.path.lexists(link):
+        os.remove(link)
+    os.symlink(os.path.basename(staging), link)
+    os.replace(link, target)
+
+    keep = {os.path.basename(staging), previous}
+    for entry in os.listdir(parent):
+        if entry.startswith(f".{name}-") and entry not in keep:
+            shutil.rmtree(os.path.join(parent, entry), ignore_errors=True)
+
+
+def _attach_arrays(source):
+    # Resolve the symlink once so every array comes from the same publish
+    source = os.path.realpath(source)
+    arrays = {}
+    for fname in sorted(os.listdir(source)):
+        if fname.endswith(".npy"):
+            arrays[fname[:-4]] = np.load(os.path.join(source, fname), mmap_mode="r")
+    return arrays
+
+
+# ==================== MODEL ====================
+def publish_forest(forest, serve_dir=SERVE_DIR):
+    """Write a ``FlatForest`` to the serving directory."""
+    _publish_arrays(forest.to_arrays(), os.path.join(serve_dir, FOREST_DIR))
+
+
+def attach_forest(serve_dir=SERVE_DIR):
+    """Zero-copy ``FlatForest`` backed by the memory-mapped arrays."""
+    return FlatForest.from_arrays(_attach_arrays(os.path.join(serve_dir, FOREST_DIR)))
+
+
+def has_forest(serve_dir=SERVE_DIR):
+    return bool(serve_dir) and os.path.exists(os.path.join(serve_dir, FOREST_DIR, "roots.npy"))
@@ -0,0 +1,195 @@
+"""Fused, tiled NDVI / EVI / SAVI over local Sentinel-2 scenes.
+
+``add_indices`` in ``mkulima.py`` builds three separate expressions that each
+re-read B8, B4 and B2. Here each band tile is read once, all requested
+indices are computed from it in one float32 pass with preallocated scratch
+buffers. The scene is processed in row strips and each strip is reduced to
+its parcel pixels straight away, so a worker holds the strip buffers plus
+the parcel pixel values, never a full-scene grid. Scenes can be spread over
+a process pool and only small per-parcel tables travel back.
+"""
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from zonal import parcel_stats
+
+try:
+    import rasterio
+    from rasterio.windows import Window
+except ImportError:  # optional dependency, only needed for GeoTIFFs
+    rasterio = None
+    Window = None
+
+INDICES = ('NDVI', 'EVI', 'SAVI')
+
+# Band name -> 1-based band number in the scene file
+S2_BANDS = {'B2': 1, 'B4': 2, 'B8': 3}
+
+TILE_ROWS = 512
+
+
+def fused_indices(nir, red, blue, out, indices=INDICES, scratch=None):
+    """Compute ``indices`` for one tile into the arrays in ``out``.
+
+    ``nir``/``red``/``blue`` are float32 tiles; ``out`` maps index name to a
+    float32 array of the same shape. Formulas match ``add_indices``.
+    """
+    if scratch is None:
+        scratch = (np.empty_like(nir), np.empty_like(nir))
+    diff, denom = scratch
+    np.subtract(nir, red, out=diff)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        if 'NDVI' in indices or 'SAVI' in indices:
+            np.add(nir, red, out=denom)
+            if 'NDVI' in indices:
+                np.divide(diff, denom, out=out['NDVI'])
+            if 'SAVI' in indices:
+                denom += 0.5
+                np.divide(diff, denom, out=out['SAVI'])
+                out['SAVI'] *= 1.5
+        if 'EVI' in indices:
+            # NIR + 6 * RED - 7.5 * BLUE + 1
+            evi = out['EVI']
+            np.multiply(blue, 7.5, out=evi)
+            np.multiply(red, 6.0, out=denom)
+            denom += nir
+            denom -= evi
+            denom += 1.0
+            np.divide(diff, denom, out=out['EVI'])
+            out['EVI'] *= 2.5
+
+
+def _index_strips(read_band, shape, indices, tile_rows, scale):
+    """Yield ``(start, stop, {name: strip})`` over row strips of a scene.
+
+    The strip arrays are reused between iterations; copy what you keep.
+    """
+    height, width = shape
+    rows = min(tile_rows, height)
+    buf = np.empty((3, rows, width), dtype=np.float32)
+    scratch = np.empty((2, rows, width), dtype=np.float32)
+    strips = np.empty((len(indices), rows, width), dtype=np.float32)
+
+    for start in range(0, height, tile_rows):
+        stop = min(start + tile_rows, height)
+        n = stop - start
+        nir, red, blue = buf[0, :n], buf[1, :n], buf[2, :n]
+        nir[...] = read_band('B8', start, stop)
+        red[...] = read_band('B4', start, stop)
+        blue[...] = read_band('B2', start, stop)
+        if scale != 1.0:
+            buf[:, :n] *= scale
+        out = {name: strips[i, :n] for i, name in enumerate(indices)}
+        fused_indices(nir, red, blue, out, indices, (scratch[0, :n], scratch[1, :n]))
+        yield start, stop, out
+
+
+def compute_indices(read_band, shape, indices=INDICES, tile_rows=TILE_ROWS, scale=1.0):
+    """Tiled fused index computation for one scene, as full float32 grids.
+
+    ``read_band(name, row_start, row_stop)`` returns the rows of a band;
+    ``scale`` converts stored values to reflectance (1.0 keeps the raw
+    values, as the Earth Engine code does; S2_SR reflectance is 1e-4).
+    """
+    out = {name: np.empty(shape, dtype=np.float32) for name in indices}
+    for start, stop, strips in _index_strips(read_band, shape, indices, tile_rows, scale):
+        for name, strip in strips.items():
+            out[name][start:stop] = strip
+    return out
+
+
+def reduce_indices(read_band, shape, index, indices=INDICES, tile_rows=TILE_ROWS, scale=1.0):
+    """Per-parcel stats of each index without materializing the scene.
+
+    Each strip is reduced to the values of the parcel pixels it contains,
+    so memory is the strip buffers plus one float32 per parcel pixel and
+    index rather than full-scene grids. Returns ``{name: DataFrame}`` as
+    ``zonal_stats`` would for the full grids.
+    """
+    if tuple(shape) != index.shape:
+        raise ValueError(f"Scene shape {tuple(shape)} does not match index grid {index.shape}")
+    width = shape[1]
+    # Parcel pixels in raster order, so each strip is one contiguous run
+    by_pixel = np.argsort(index.order, kind='stable')
+    pixels = index.order[by_pixel]
+    values = {name: np.empty(len(pixels), dtype=np.float32) for name in indices}
+
+    for start, stop, strips in _index_strips(read_band, shape, indices, tile_rows, scale):
+        lo, hi = np.searchsorted(pixels, [start * width, stop * width])
+        local = pixels[lo:hi] - start * width
+        for name, strip in strips.items():
+            values[name][by_pixel[lo:hi]] = strip.ravel()[local]
+    return {name: parcel_stats(vals, index) for name, vals in values.items()}
+
+
+def compute_indices_array(bands, indices=INDICES, tile_rows=TILE_ROWS, scale=1.0):
+    """``compute_indices`` for in-memory (or memory-mapped) band arrays."""
+    shape = bands['B8'].shape
+    return compute_indices(
+        lambda name, start, stop: bands[name][start:stop],
+        shape, indices, tile_rows, scale,
+    )
+
+
+def compute_indices_file(path, indices=INDICES, band_map=S2_BANDS, tile_rows=TILE_ROWS, scale=1.0):
+    """``compute_indices`` reading band strips from a GeoTIFF window by window."""
+    if rasterio is None:
+        raise ImportError("Reading scenes needs rasterio: pip install rasterio")
+    with rasterio.open(path) as src:
+        def read_band(name, start, stop):
+            window = Window(0, start, src.width, stop - start)
+            return src.read(band_map[name], window=window)
+
+        return compute_indices(read_band, (src.height, src.width), indices, tile_rows, scale)
+
+
+def scene_zonal_stats(path, index, date, indices=INDICES, band_map=S2_BANDS,
+                      tile_rows=TILE_ROWS, scale=1.0):
+    """Per-parcel stats of each index for one scene file.
+
+    Returns ``{index name: DataFrame}`` shaped like the CSV exports.
+    """
+    if rasterio is None:
+        raise ImportError("Reading scenes needs rasterio: pip install rasterio")
+    with rasterio.open(path) as src:
+        def read_band(name, start, stop):
+            window = Window(0, start, src.width, stop - start)
+            return src.read(band_map[name], window=window)
+
+        result = reduce_indices(read_band, (src.height, src.width), index, indices, tile_rows, scale)
+    for stats in result.values():
+        stats.insert(1, 'date', pd.Timestamp(date))
+    return result
+
+
+def process_scenes(scenes, index, indices=INDICES, workers=None, **kwargs):
+    """Run ``scene_zonal_stats`` over ``[(path, date), ...]``.
+
+    With ``workers`` > 1 scenes are processed in a process pool. Returns
+    ``{index name: DataFrame}`` concatenated over all scenes.
+    """
+    if workers is None:
+        workers = os.cpu_count() or 1
+
+    per_index = {name: [] for name in indices}
+    if workers <= 1:
+        results = (scene_zonal_stats(p, index, d, indices, **kwargs) for p, d in scenes)
+        for res in results:
+            for name, df in res.items():
+                per_index[name].append(df)
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(scene_zonal_stats, p, index, d, indices, **kwargs) for p, d in scenes]
+            for fut in futures:
+                for name, df in fut.result().items():
+                    per_index[name].append(df)
+
+    return {
+        name: pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+        for name, frames in per_index.items()
+    }
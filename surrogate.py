@@ -0,0 +1,238 @@
+"""Compact surrogates distilled from the stress forest.
+
+The full forest (200 deep trees, over a million nodes) is more than the
+dashboard and mobile clients need. ``distill`` fits small candidate models
+to the forest's own predictions over the real ``ml_data`` rows (plus,
+optionally, samples spread over the dashboard slider ranges), and reports
+for each one the error against the forest, the agreement of the 0.3/0.6
+insurance tiers, size and latency. Every candidate compiles to a
+``FlatForest``, so the exported artifact is a tiny ``.npz`` served by the
+same engine; ``within_budget`` picks the smallest one inside an error
+budget. ``LatencyBudget`` decides when a caller should switch to it.
+"""
+
+import json
+import os
+import threading
+import time
+from collections import deque
+
+import numpy as np
+import pandas as pd
+
+from forest_engine import FlatForest, compile_forest
+from response_surface import SLIDER_AXES
+from schema import DASHBOARD_INPUTS
+from tiering import INSURANCE_TIERS
+
+# Candidate surrogates, smallest first: (kind, estimator parameters). sklearn
+# is only imported by ``distill``, so the dashboard can import this module
+# for ``load_surrogate`` / ``LatencyBudget`` without paying for it
+CANDIDATES = {
+    'tree_depth8': ('tree', {'max_depth': 8, 'min_samples_leaf': 20}),
+    'tree_depth12': ('tree', {'max_depth': 12, 'min_samples_leaf': 10}),
+    'boosted_30x3': ('boosted', {'n_estimators': 30, 'max_depth': 3, 'learning_rate': 0.3, 'subsample': 0.8}),
+    'boosted_100x4': ('boosted', {'n_estimators': 100, 'max_depth': 4, 'learning_rate': 0.15, 'subsample': 0.8}),
+}
+
+# Default error budget against the full forest
+ERROR_BUDGET = {'p99_abs': 0.05, 'tier_agreement': 0.98}
+
+MAX_TRAIN_ROWS = 200_000
+
+# Largest forest whose ``predict_one`` (Python lists of every node) is timed
+PREDICT_ONE_MAX_NODES = 200_000
+
+
+def make_candidate(kind, params, seed=0):
+    """Unfitted sklearn estimator for a ``CANDIDATES`` entry."""
+    if kind == 'tree':
+        from sklearn.tree import DecisionTreeRegressor
+        return DecisionTreeRegressor(random_state=seed, **params)
+    if kind == 'boosted':
+        from sklearn.ensemble import GradientBoostingRegressor
+        return GradientBoostingRegressor(random_state=seed, **params)
+    raise ValueError(f"Unknown surrogate kind: {kind!r}")
+
+
+def compile_surrogate(model, X_probe):
+    """FlatForest equivalent of a fitted tree or gradient-boosted ensemble.
+
+    A boosted ensemble predicts ``init + lr * sum(trees)``; FlatForest
+    averages its trees, so every leaf is rescaled to ``init + lr * T * v``.
+    """
+    if not hasattr(model, 'estimators_'):
+        return compile_forest([model])
+    trees = list(model.estimators_[:, 0])
+    flat = compile_forest(trees)
+    probe = np.asarray(X_probe[:1], dtype=np.float64)
+    init = model.predict(probe)[0] - model.learning_rate * sum(t.predict(probe)[0] for t in trees)
+    flat.value = flat.value * (model.learning_rate * len(trees)) + init
+    flat.n_features_in_ = model.n_features_in_
+    if hasattr(model, 'feature_names_in_'):
+        flat.feature_names_in_ = np.asarray(model.feature_names_in_, dtype=object)
+    return flat
+
+
+def model_nbytes(flat):
+    return sum(a.nbytes for a in flat.to_arrays().values())
+
+
+def _row_latency_us(model, X, repeat=200):
+    """Single-row predict latency: the faster of ``predict`` and ``predict_one``.
+
+    ``predict_one`` is only timed up to ``PREDICT_ONE_MAX_NODES``: its first
+    call copies every node array into Python lists (GBs for the teacher).
+    """
+    row = X[0]
+    best = np.inf
+    fns = [lambda: model.predict(row)]
+    if model.n_nodes <= PREDICT_ONE_MAX_NODES:
+        fns.append(lambda: model.predict_one(row))
+    for fn in fns:
+        fn()
+        start = time.perf_counter()
+        for _ in range(repeat):
+            fn()
+        best = min(best, (time.perf_counter() - start) / repeat * 1e6)
+    return best
+
+
+def error_report(reference, approx, tiers=INSURANCE_TIERS):
+    """Error of ``approx`` against ``reference`` and risk-tier agreement."""
+    err = np.abs(approx - reference)
+    ref_tiers = tiers.codes(reference)
+    new_tiers = tiers.codes(approx)
+    return {
+        'mae': float(err.mean()),
+        'rmse': float(np.sqrt((err ** 2).mean())),
+        'p99_abs': float(np.quantile(err, 0.99)),
+        'max_abs': float(err.max()),
+        'tier_agreement': float((ref_tiers == new_tiers).mean()),
+        'tier_up': int((new_tiers > ref_tiers).sum()),
+        'tier_down': int((new_tiers < ref_tiers).sum()),
+    }
+
+
+def slider_samples(schema, n, seed=0):
+    """Model-space rows for ``n`` random points over the dashboard slider ranges."""
+    rng = np.random.default_rng(seed)
+    lows = np.array([lo for _, lo, _ in SLIDER_AXES])
+    highs = np.array([hi for _, _, hi in SLIDER_AXES])
+    points = lows + rng.random((n, len(lows))) * (highs - lows)
+    return schema.transform(points, DASHBOARD_INPUTS)
+
+
+def distill(teacher, X, candidates=CANDIDATES, test_frac=0.2, extra_X=None,
+            max_rows=MAX_TRAIN_ROWS, tiers=INSURANCE_TIERS, seed=42):
+    """Fit every candidate to ``teacher``'s predictions on ``X``.
+
+    ``X`` is the model matrix of real rows (e.g. ``schema.transform(ml_data)``);
+    ``extra_X`` adds synthetic rows such as ``slider_samples``. Returns
+    ``(report, surrogates)``: one report row per candidate (error vs. the
+    teacher on held-out rows, tier agreement, nodes, bytes, single-row
+    latency in microseconds) and the compiled FlatForest of each.
+    """
+    X = np.asarray(X, dtype=np.float64)
+    if extra_X is not None:
+        X = np.vstack([X, np.asarray(extra_X, dtype=np.float64)])
+    rng = np.random.default_rng(seed)
+    if len(X) > max_rows:
+        X = X[rng.choice(len(X), max_rows, replace=False)]
+    teacher_flat = teacher if isinstance(teacher, FlatForest) else compile_forest(teacher)
+    y = teacher_flat.predict(X)
+
+    test = rng.random(len(X)) < test_frac
+    X_train, y_train, X_test, y_test = X[~test], y[~test], X[test], y[test]
+
+    rows = [{
+        'model': 'teacher',
+        **error_report(y_test, y_test, tiers),
+        'n_nodes': teacher_flat.n_nodes,
+        'bytes': model_nbytes(teacher_flat),
+        'fit_seconds': 0.0,
+        'row_us': _row_latency_us(teacher_flat, X_test, repeat=5),
+    }]
+    surrogates = {}
+    for name, (kind, params) in candidates.items():
+        start = time.perf_counter()
+        model = make_candidate(kind, params, seed).fit(X_train, y_train)
+        fit_seconds = time.perf_counter() - start
+        flat = surrogates[name] = compile_surrogate(model, X_train)
+        if hasattr(teacher_flat, 'feature_names_in_'):
+            flat.feature_names_in_ = teacher_flat.feature_names_in_
+        rows.append({
+            'model': name,
+            **error_report(y_test, flat.predict(X_test), tiers),
+            'n_nodes': flat.n_nodes,
+            'bytes': model_nbytes(flat),
+            'fit_seconds': fit_seconds,
+            'row_us': _row_latency_us(flat, X_test),
+        })
+
+    report = pd.DataFrame(rows)
+    report['bytes_fraction'] = report['bytes'] / report.loc[0, 'bytes']
+    return report, surrogates
+
+
+def within_budget(report, budget=ERROR_BUDGET):
+    """Name of the smallest candidate inside ``budget``, or None."""
+    ok = report[
+        (report['model'] != 'teacher')
+        & (report['p99_abs'] <= budget['p99_abs'])
+        & (report['tier_agreement'] >= budget['tier_agreement'])
+    ]
+    if ok.empty:
+        return None
+    return ok.sort_values(['bytes', 'row_us']).iloc[0]['model']
+
+
+# ==================== ARTIFACT ====================
+def save_surrogate(flat, path, metrics):
+    """Write ``<path>.npz`` (the surrogate) and ``<path>.json`` (its validated metrics)."""
+    flat.save(f"{path}.npz")
+    with open(f"{path}.json", 'w') as f:
+        json.dump({k: (v.item() if hasattr(v, 'item') else v) for k, v in metrics.items()}, f, indent=2)
+
+
+def load_surrogate(path):
+    """(FlatForest, metrics) or None when no surrogate was exported."""
+    if not os.path.exists(f"{path}.npz"):
+        return None
+    with open(f"{path}.json") as f:
+        metrics = json.load(f)
+    return FlatForest.load(f"{path}.npz"), metrics
+
+
+# ==================== LATENCY BUDGET ====================
+class LatencyBudget:
+    """Full model or surrogate, from the full model's recent predict times.
+
+    The surrogate is used while the median of the last ``window`` full-model
+    calls exceeds ``budget_ms``; every ``recheck_every``-th call still goes
+    to the full model so a transient slowdown does not stick.
+    """
+
+    def __init__(self, budget_ms, window=5, recheck_every=10):
+        self.budget_ms = budget_ms
+        self.recent = deque(maxlen=window)
+        self.recheck_every = recheck_every
+        self.surrogate_calls = 0
+        self._lock = threading.Lock()
+
+    @property
+    def median_ms(self):
+        with self._lock:
+            return float(np.median(self.recent)) if self.recent else 0.0
+
+    def use_surrogate(self):
+        with self._lock:
+            if not self.recent or np.median(self.recent) <= self.budget_ms:
+                return False
+            self.surrogate_calls += 1
+            return self.surrogate_calls % self.recheck_every != 0
+
+    def record(self, ms):
+        """Record one full-model predict time in milliseconds."""
+        with self._lock:
+            self.recent.append(ms)
@@ -0,0 +1,40 @@
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+# The modules live at the repository root, next to app.py
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def make_features(n=None, seed=0, parcels=None, days=None, missing=0.0):
+    """Synthetic export features: LST ~ N(25, 3), EVI ~ U(0, 1), SM ~ N(30, 5)
+    and RAINFALL ~ Gamma(0.8, 3.0).
+
+    ``n`` plain rows, or with ``parcels`` and ``days`` one row per parcel-day
+    keyed by OBJECTID / date. ``missing`` drops that fraction of rows.
+    """
+    rng = np.random.default_rng(seed)
+    keys = {}
+    if parcels is not None:
+        parcels, days = list(parcels), pd.DatetimeIndex(days)
+        n = len(parcels) * len(days)
+        keys = {'OBJECTID': np.repeat(parcels, len(days)), 'date': np.tile(days, len(parcels))}
+    df = pd.DataFrame({
+        **keys,
+        'mean_LST': rng.normal(25, 3, n),
+        'mean_EVI': rng.random(n),
+        'mean_SM': rng.normal(30, 5, n),
+        'mean_RAINFALL': rng.gamma(0.8, 3.0, n),
+    })
+    if missing:
+        df = df[rng.random(n) >= missing]
+    return df
+
+
+@pytest.fixture
+def synthetic_features():
+    """``make_features``, shared by the feature, CSI, schema and training tests."""
+    return make_features
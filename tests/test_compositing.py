@@ -0,0 +1,67 @@
+import numpy as np
+import pandas as pd
+
+from compositing import composite, fill_gaps, mask_dips, mask_outliers, mask_range, period_starts, to_cube
+
+nan = np.nan
+
+
+def test_mask_range_drops_implausible_values():
+    cube = np.array([[0.2, 1.4, -0.1, nan, -2.0]])
+    bad = mask_range(cube, 'mean_EVI')
+    assert bad.tolist() == [[False, True, False, False, True]]
+    np.testing.assert_array_equal(cube, [[0.2, nan, -0.1, nan, nan]])
+
+
+def test_mask_dips_removes_isolated_drops_only():
+    cube = np.array([
+        [0.6, 0.3, 0.6, 0.6],    # single-scene dip -> cloud
+        [0.6, 0.3, 0.3, 0.3],    # lasting drop -> real change
+        [0.3, 0.6, nan, 0.6],    # first value has one neighbour only
+        [0.6, 0.35, nan, 0.62],  # neighbours are the nearest valid values
+    ])
+    dip = mask_dips(cube, 0.12)
+    assert dip.tolist() == [
+        [False, True, False, False],
+        [False, False, False, False],
+        [False, False, False, False],
+        [False, True, False, False],
+    ]
+
+
+def test_mask_outliers_uses_each_parcels_own_spread():
+    rng = np.random.default_rng(0)
+    cube = np.vstack([25 + rng.normal(0, 0.5, 30), np.full(30, 10.0)])
+    cube[0, 7] = 45.0
+    bad = mask_outliers(cube)
+    assert np.flatnonzero(bad[0]).tolist() == [7]
+    assert not bad[1].any()
+
+
+def test_fill_gaps_interpolates_short_interior_gaps():
+    cube = np.array([[nan, 1.0, nan, 3.0, nan, nan, 6.0, nan]])
+    filled = fill_gaps(cube, max_gap=1)
+    assert np.flatnonzero(filled[0]).tolist() == [2]
+    np.testing.assert_array_equal(cube, [[nan, 1.0, 2.0, 3.0, nan, nan, 6.0, nan]])
+
+
+def test_dekads_split_months_at_the_10th_and_20th():
+    starts = period_starts(pd.to_datetime(['2023-02-01', '2023-02-10', '2023-02-11', '2023-02-28']), 'dekad')
+    assert [d.day for d in starts] == [1, 1, 11, 21]
+
+
+def test_composite_matches_groupby():
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame({
+        'OBJECTID': rng.integers(1, 6, 400),
+        'date': pd.Timestamp('2023-01-01') + pd.to_timedelta(rng.integers(0, 90, 400), unit='D'),
+        'mean_EVI': rng.random(400),
+    })
+    cube, parcels, dates = to_cube(df, 'mean_EVI')
+    out, periods = composite(cube, dates, '10D', 'max')
+
+    daily = df.groupby(['OBJECTID', 'date'])['mean_EVI'].mean().reset_index()
+    expected = (daily.assign(period=period_starts(daily['date'], '10D'))
+                .groupby(['OBJECTID', 'period'])['mean_EVI'].max()
+                .unstack().reindex(index=parcels, columns=periods))
+    np.testing.assert_allclose(out, expected.to_numpy())
@@ -0,0 +1,64 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from csi import CSINormalizer, compute_csi
+
+
+@pytest.fixture
+def feature_frame(synthetic_features):
+    def make(n=1000, seed=0):
+        df = synthetic_features(n, seed)
+        df.loc[::17, 'mean_EVI'] = np.nan
+        return df
+    return make
+
+
+def notebook_csi(df):
+    """The original notebook formula: min-max over the whole table."""
+    def low_is_stress(c):
+        return (df[c].max() - df[c]) / (df[c].max() - df[c].min())
+    lst = (df['mean_LST'] - df['mean_LST'].min()) / (df['mean_LST'].max() - df['mean_LST'].min())
+    return (0.4 * low_is_stress('mean_EVI') + 0.3 * low_is_stress('mean_SM')
+            + 0.2 * lst + 0.1 * low_is_stress('mean_RAINFALL'))
+
+
+def test_matches_the_notebook_formula(feature_frame):
+    df = feature_frame()
+    np.testing.assert_allclose(compute_csi(df), notebook_csi(df), rtol=1e-12)
+
+
+def test_partial_fit_over_chunks_matches_one_pass(feature_frame):
+    df = feature_frame()
+    chunked = CSINormalizer().fit(df.iloc[i:i + 128] for i in range(0, len(df), 128))
+    whole = CSINormalizer().fit(df)
+    assert chunked.bounds() == whole.bounds()
+    assert chunked.n_seen == len(df)
+
+
+def test_quantile_bounds_from_the_reservoir(feature_frame, monkeypatch):
+    monkeypatch.setattr('csi.RESERVOIR_SIZE', 2000)
+    df = feature_frame(20_000)
+    norm = CSINormalizer(quantiles=(0.01, 0.99)).fit(df.iloc[i:i + 1000] for i in range(0, len(df), 1000))
+    for feat, (lo, hi) in norm.bounds().items():
+        values = df[feat].dropna()
+        # Within two percentiles of the true quantiles
+        assert values.quantile(0.0) <= lo <= values.quantile(0.03)
+        assert values.quantile(0.97) <= hi <= values.quantile(1.0)
+
+
+def test_saved_stats_reproduce_the_transform(feature_frame, tmp_path):
+    df = feature_frame()
+    norm = CSINormalizer(quantiles=(0.05, 0.95)).fit(df)
+    path = tmp_path / 'model.csi.json'
+    norm.save(path)
+    new_rows = feature_frame(50, seed=1)
+    np.testing.assert_allclose(CSINormalizer.load(path).transform(new_rows), norm.transform(new_rows))
+
+
+@pytest.mark.parametrize('clip', [False, True])
+def test_clip_bounds_scores_for_rows_outside_the_fitted_range(feature_frame, clip):
+    norm = CSINormalizer().fit(feature_frame())
+    extreme = pd.DataFrame({'mean_LST': [60.0], 'mean_EVI': [-1.0], 'mean_SM': [0.0], 'mean_RAINFALL': [0.0]})
+    score = norm.transform(extreme, clip=clip).iloc[0]
+    assert (score == pytest.approx(1.0)) if clip else score > 1.0
@@ -0,0 +1,83 @@
+import pytest
+
+from exports import DONE_STATE, PENDING_STATES, ExportManager, FakeExportClient
+
+JOBS = {'EVI': object(), 'LST': object()}
+
+
+def manager(tmp_path, client):
+    return ExportManager(client, str(tmp_path / 'checkpoint.json'), sleep=lambda s: None)
+
+
+def test_rerun_skips_completed_jobs_for_the_same_window(tmp_path):
+    client = FakeExportClient()
+    assert manager(tmp_path, client).run(JOBS, window='2016/2024') == dict.fromkeys(JOBS, DONE_STATE)
+    manager(tmp_path, client).run(JOBS, window='2016/2024')
+    assert sorted(client.submitted) == ['EVI', 'LST']
+
+
+def test_new_window_reruns_completed_jobs(tmp_path):
+    client = FakeExportClient()
+    manager(tmp_path, client).run(JOBS, window='2016/2024')
+    assert manager(tmp_path, client).run(JOBS, window='2016/2025') == dict.fromkeys(JOBS, DONE_STATE)
+    assert sorted(client.submitted) == ['EVI', 'EVI', 'LST', 'LST']
+
+
+def test_failed_jobs_are_retried(tmp_path):
+    client = FakeExportClient(fail={'EVI': 1})
+    assert manager(tmp_path, client).run(JOBS, window='w') == dict.fromkeys(JOBS, DONE_STATE)
+    assert client.submitted.count('EVI') == 2
+
+
+class InFlightClient(FakeExportClient):
+    """Records the most tasks ever submitted and not yet finished."""
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.in_flight = set()
+        self.peak = 0
+
+    def submit(self, name, collection):
+        task_id = super().submit(name, collection)
+        self.in_flight.add(task_id)
+        self.peak = max(self.peak, len(self.in_flight))
+        return task_id
+
+    def status(self, task_id):
+        state = super().status(task_id)
+        if state not in PENDING_STATES:
+            self.in_flight.discard(task_id)
+        return state
+
+
+@pytest.mark.parametrize('max_concurrent', [1, 2, 3])
+def test_no_more_than_max_concurrent_jobs_run_at_once(tmp_path, max_concurrent):
+    client = InFlightClient(polls_to_finish=3, fail={'c': 1})
+    jobs = {name: object() for name in 'abcdefg'}
+    export = ExportManager(client, str(tmp_path / 'checkpoint.json'), max_concurrent=max_concurrent,
+                           sleep=lambda s: None)
+    assert export.run(jobs) == dict.fromkeys(jobs, DONE_STATE)
+    assert client.peak == max_concurrent
+    assert len(client.submitted) == len(jobs) + 1
+
+
+@pytest.mark.parametrize('max_poll_interval, expected', [
+    (120.0, [5.0, 5.0, 10.0, 20.0, 40.0]),
+    (15.0, [5.0, 5.0, 10.0, 15.0, 15.0]),
+])
+def test_polling_backs_off_while_nothing_changes(tmp_path, max_poll_interval, expected):
+    sleeps = []
+    # READY -> RUNNING on the first poll, COMPLETED on the fifth
+    export = ExportManager(FakeExportClient(polls_to_finish=5), str(tmp_path / 'checkpoint.json'),
+                           poll_interval=5.0, max_poll_interval=max_poll_interval, sleep=sleeps.append)
+    export.run({'EVI': object()})
+    assert sleeps == expected
+
+
+def test_progress_resets_the_poll_interval(tmp_path):
+    sleeps = []
+    # One slot: the second job is submitted when the first completes
+    export = ExportManager(FakeExportClient(polls_to_finish=4), str(tmp_path / 'checkpoint.json'),
+                           max_concurrent=1, poll_interval=1.0, sleep=sleeps.append)
+    export.run(JOBS)
+    assert sleeps == [1.0, 1.0, 2.0, 4.0, 1.0, 1.0, 2.0, 4.0]
@@ -0,0 +1,61 @@
+import pandas as pd
+import pytest
+
+pytest.importorskip('pyarrow')
+
+from feature_store import append_month, list_partitions, read_features, write_features  # noqa: E402
+
+
+@pytest.fixture
+def feature_days(synthetic_features):
+    def make(start, periods, parcels=(1, 2, 3), seed=0):
+        return synthetic_features(seed=seed, parcels=parcels, days=pd.date_range(start, periods=periods))
+    return make
+
+
+def sort_keys(df):
+    return df.sort_values(['OBJECTID', 'date']).reset_index(drop=True)
+
+
+@pytest.fixture
+def store(feature_days, tmp_path):
+    df = feature_days('2023-01-01', 120)
+    write_features(df, tmp_path)
+    return tmp_path, df
+
+
+def test_round_trip_is_partitioned_by_month(store):
+    store_dir, df = store
+    assert list_partitions(store_dir) == [(2023, 1), (2023, 2), (2023, 3), (2023, 4)]
+    pd.testing.assert_frame_equal(sort_keys(read_features(store_dir)), sort_keys(df), check_dtype=False)
+
+
+def test_date_range_reads_only_matching_partitions(store):
+    store_dir, df = store
+    # An unreadable month outside the range must never be opened (the first
+    # file is still read for the dataset schema)
+    (store_dir / 'year=2023' / 'month=4' / 'part-0.parquet').write_bytes(b'not parquet')
+    got = read_features(store_dir, start='2023-02-10', end='2023-03-05')
+    expected = df[(df['date'] >= '2023-02-10') & (df['date'] <= '2023-03-05')]
+    pd.testing.assert_frame_equal(sort_keys(got), sort_keys(expected), check_dtype=False)
+
+
+def test_columns_are_projected_with_keys(store):
+    store_dir, df = store
+    got = read_features(store_dir, object_ids=[2], columns=['mean_SM'])
+    assert list(got.columns) == ['OBJECTID', 'date', 'mean_SM']
+    expected = df.loc[df['OBJECTID'] == 2, ['OBJECTID', 'date', 'mean_SM']]
+    pd.testing.assert_frame_equal(sort_keys(got), sort_keys(expected), check_dtype=False)
+
+
+def test_rewritten_month_replaces_the_old_one(feature_days, store):
+    store_dir, df = store
+    # Fewer parcels and new values for February only
+    new_feb = feature_days('2023-02-01', 28, parcels=(1, 2), seed=1)
+    append_month(new_feb, store_dir)
+
+    got = read_features(store_dir)
+    feb = (got['date'] >= '2023-02-01') & (got['date'] < '2023-03-01')
+    pd.testing.assert_frame_equal(sort_keys(got[feb]), sort_keys(new_feb), check_dtype=False)
+    old_feb = (df['date'] >= '2023-02-01') & (df['date'] < '2023-03-01')
+    pd.testing.assert_frame_equal(sort_keys(got[~feb]), sort_keys(df[~old_feb]), check_dtype=False)
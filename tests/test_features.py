@@ -0,0 +1,88 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from features import RainfallAccumulator, merge_index_csvs, rolling_rainfall, widen_combined_export
+
+
+def index_frames(seed=0):
+    rng = np.random.default_rng(seed)
+    dates = pd.date_range('2023-01-01', periods=6, freq='5D').strftime('%Y-%m-%d')
+    frames = {}
+    for name in ('EVI', 'LST', 'RAINFALL', 'SM'):
+        n = 15
+        frames[name] = pd.DataFrame({
+            'OBJECTID': rng.integers(1, 4, n),
+            'date': rng.choice(dates, n),
+            'mean': rng.random(n),
+        })
+    return frames
+
+
+def test_combined_export_widens_like_per_index_csvs(tmp_path):
+    frames = index_frames()
+    per_index = tmp_path / 'per_index'
+    per_index.mkdir()
+    for name, df in frames.items():
+        df.to_csv(per_index / f'{name}.csv', index=False)
+    combined = pd.concat([df.assign(index=name) for name, df in frames.items()])
+    combined.sample(frac=1, random_state=0).to_csv(tmp_path / 'ALL.csv', index=False)
+
+    pd.testing.assert_frame_equal(
+        widen_combined_export(tmp_path / 'ALL.csv'),
+        merge_index_csvs(per_index),
+    )
+
+
+# ==================== ROLLING RAINFALL ====================
+@pytest.fixture
+def daily_rain(synthetic_features):
+    def make(days, parcels=(1, 2, 3), seed=0):
+        return synthetic_features(seed=seed, parcels=parcels, days=days, missing=0.2)
+    return make
+
+
+def naive_windows(df, windows):
+    """Sum over the w days before each day, one parcel-day at a time."""
+    days = pd.date_range(df['date'].min(), df['date'].max())
+    rows = []
+    for parcel in sorted(df['OBJECTID'].unique()):
+        rain = df[df['OBJECTID'] == parcel].set_index('date')['mean_RAINFALL']
+        for day in days:
+            row = {'OBJECTID': parcel, 'date': day}
+            for w in windows:
+                row[f'Rain_{w}d'] = rain[(rain.index >= day - pd.Timedelta(days=w)) & (rain.index < day)].sum()
+            rows.append(row)
+    return pd.DataFrame(rows)
+
+
+def test_rolling_rainfall_matches_naive_windows(daily_rain):
+    df = daily_rain(pd.date_range('2023-01-01', periods=90))
+    expected = naive_windows(df, (7, 30, 60))
+    got = rolling_rainfall(df)
+    pd.testing.assert_frame_equal(got, expected, check_dtype=False)
+
+
+def test_incremental_extend_matches_one_shot(daily_rain):
+    df = daily_rain(pd.date_range('2023-01-01', periods=120))
+    # Parcel 4 only starts reporting in the second chunk
+    df = pd.concat([df, daily_rain(pd.date_range('2023-02-15', periods=20), parcels=(4,), seed=1)])
+    one_shot = rolling_rainfall(df)
+
+    acc = RainfallAccumulator()
+    cuts = [pd.Timestamp('2023-02-10'), pd.Timestamp('2023-03-20')]
+    chunks = [df[df['date'] < cuts[0]],
+              df[(df['date'] >= cuts[0]) & (df['date'] < cuts[1])],
+              df[df['date'] >= cuts[1]]]
+    parts = [acc.extend(chunk) for chunk in chunks]
+    incremental = pd.concat(parts).sort_values(['OBJECTID', 'date']).reset_index(drop=True)
+    # Parcel 4 is only known from its first day on in the incremental run
+    one_shot = one_shot.merge(incremental[['OBJECTID', 'date']])
+    pd.testing.assert_frame_equal(incremental, one_shot)
+
+
+def test_extend_rejects_days_already_seen(daily_rain):
+    acc = RainfallAccumulator()
+    acc.extend(daily_rain(pd.date_range('2023-01-01', periods=10)))
+    with pytest.raises(ValueError):
+        acc.extend(daily_rain(pd.date_range('2023-01-10', periods=5)))
@@ -0,0 +1,72 @@
+import numpy as np
+import pytest
+from sklearn.ensemble import RandomForestRegressor
+
+import forest_engine
+from forest_engine import FlatForest, compile_forest
+
+
+@pytest.fixture(scope='module')
+def data():
+    rng = np.random.default_rng(0)
+    X = rng.normal(size=(600, 4))
+    y = X[:, 0] - 0.5 * X[:, 1] ** 2 + rng.normal(0, 0.1, len(X))
+    X[rng.random(X.shape) < 0.05] = np.nan
+    return X, y
+
+
+@pytest.fixture(scope='module')
+def rf(data):
+    X, y = data
+    return RandomForestRegressor(n_estimators=25, random_state=0).fit(X, y)
+
+
+def test_predict_matches_sklearn(rf, data):
+    X, _ = data
+    flat = compile_forest(rf)
+    np.testing.assert_allclose(flat.predict(X), rf.predict(X), rtol=0, atol=1e-12)
+
+
+def test_apply_matches_sklearn_leaves(rf, data):
+    X, _ = data
+    flat = compile_forest(rf)
+    offsets = flat.roots.astype(np.int64)
+    np.testing.assert_array_equal(flat.apply(X) - offsets, rf.apply(X))
+
+
+@pytest.mark.parametrize('block_pairs', [1, 100, 10**6])
+def test_traversal_blocks_and_chunks_agree(rf, data, monkeypatch, block_pairs):
+    X, _ = data
+    expected = rf.predict(X)
+    monkeypatch.setattr(forest_engine, 'BLOCK_PAIRS', block_pairs)
+    monkeypatch.setattr(forest_engine, 'CHUNK_ROWS', 128)
+    np.testing.assert_allclose(compile_forest(rf).predict(X), expected, rtol=0, atol=1e-12)
+
+
+def test_predict_one_matches_predict(rf, data):
+    X, _ = data
+    flat = compile_forest(rf)
+    for row in X[:20]:
+        assert flat.predict_one(row) == pytest.approx(flat.predict(row)[0], abs=1e-12)
+
+
+def test_save_load_is_memory_mapped(rf, data, tmp_path):
+    X, _ = data
+    flat = compile_forest(rf)
+    path = tmp_path / 'model.npz'
+    flat.save(path)
+
+    loaded = FlatForest.load(path)
+    assert not loaded.feature.flags.owndata
+    assert not loaded.feature.flags.writeable
+    np.testing.assert_array_equal(loaded.predict(X), flat.predict(X))
+    assert loaded.max_depth == flat.max_depth
+    assert loaded.n_features_in_ == flat.n_features_in_
+
+
+def test_load_reads_compressed_artifacts(rf, data, tmp_path):
+    X, _ = data
+    flat = compile_forest(rf)
+    path = tmp_path / 'old.npz'
+    np.savez_compressed(path, **flat.to_arrays())
+    np.testing.assert_array_equal(FlatForest.load(path).predict(X), flat.predict(X))
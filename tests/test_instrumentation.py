@@ -0,0 +1,110 @@
+import json
+
+import pytest
+
+import instrumentation
+from instrumentation import Profiler
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(instrumentation.time, 'perf_counter', clock)
+    return clock
+
+
+def memo(fn):
+    """Stand-in for ``st.cache_data``: caches on positional arguments."""
+    store = {}
+
+    def cached(*args):
+        if args not in store:
+            store[args] = fn(*args)
+        return store[args]
+
+    cached.clear = store.clear
+    return cached
+
+
+def test_disabled_profiler_records_nothing():
+    profiler = Profiler(enabled=False)
+    with profiler.span('a'):
+        profiler.count('rows')
+        profiler.observe('batch', 5)
+    assert profiler.span('a') is profiler.span('b')
+    assert profiler.cache(memo, 'f') is memo
+    assert profiler.end_rerun() is None
+    assert (profiler.spans, profiler.counters, profiler.observations) == ({}, {}, {})
+
+
+def test_nested_spans_are_timed_by_path(clock):
+    profiler = Profiler(enabled=True)
+    with profiler.span('rerun'):
+        clock.now += 1
+        for _ in range(2):
+            with profiler.span('predict'):
+                clock.now += 2
+    assert profiler.spans == {'rerun/predict': [2, 4.0, 2.0], 'rerun': [1, 5.0, 5.0]}
+
+
+def test_stages_are_consecutive_not_nested(clock, capsys):
+    profiler = Profiler(enabled=True)
+    profiler.stage('load')
+    clock.now += 3
+    profiler.stage('train')
+    clock.now += 7
+    profiler.stage(None)
+    assert profiler.spans == {'load': [1, 3.0, 3.0], 'train': [1, 7.0, 7.0]}
+    out = capsys.readouterr().out
+    assert 'load: 3.00s' in out and 'train: 7.00s' in out
+
+
+def test_cache_counts_calls_and_misses():
+    profiler = Profiler(enabled=True)
+    calls = []
+
+    @profiler.cache(memo, 'square')
+    def square(x):
+        calls.append(x)
+        return x * x
+
+    assert [square(x) for x in (2, 3, 2, 2)] == [4, 9, 4, 4]
+    assert calls == [2, 3]
+    assert profiler.cache_stats() == {'square': (4, 2, 2)}
+    assert profiler.spans['cache:square'][0] == 4
+
+    square.clear()
+    square(2)
+    assert profiler.cache_stats() == {'square': (5, 3, 2)}
+
+
+def test_rerun_report_is_logged_and_exported(clock, tmp_path):
+    log, prom = tmp_path / 'profile.jsonl', tmp_path / 'profile.prom'
+    profiler = Profiler(enabled=True, log_path=str(log), prom_path=str(prom))
+    for rows in (3, 5):
+        profiler.start_rerun()
+        with profiler.span('score'):
+            clock.now += 0.5
+            profiler.observe('batch_rows', rows)
+        clock.now += 0.25
+        record = profiler.end_rerun()
+
+    assert record['rerun_s'] == 0.75
+    assert record['spans'] == [['score', 0.5]]
+    lines = [json.loads(line) for line in log.read_text().splitlines()]
+    assert [line['spans'] for line in lines] == [[['score', 0.5]]] * 2
+
+    text = prom.read_text()
+    assert 'mkulima_span_seconds_count{span="score"} 2' in text
+    assert 'mkulima_span_seconds_sum{span="score"} 1.000000' in text
+    assert 'mkulima_batch_rows_count 2' in text
+    assert 'mkulima_batch_rows_max 5.000000' in text
+    assert 'mkulima_rerun_seconds_sum 1.500000' in text
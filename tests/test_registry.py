@@ -0,0 +1,98 @@
+import os
+
+import numpy as np
+import pytest
+from sklearn.ensemble import RandomForestRegressor
+
+from registry import SURFACE_NAME, ModelRegistry
+from response_surface import ResponseSurface
+
+
+@pytest.fixture(scope='module')
+def rf():
+    rng = np.random.default_rng(0)
+    X = rng.random((200, 4))
+    return RandomForestRegressor(n_estimators=5, random_state=0).fit(X, X[:, 0])
+
+
+def small_surface(value=0.5):
+    return ResponseSurface.build(lambda S: np.full(len(S), value), shape=(3, 3, 3))
+
+
+def test_artifacts_are_in_the_version_when_it_goes_live(rf, tmp_path):
+    registry = ModelRegistry(str(tmp_path))
+    seen = []
+
+    def write(path):
+        # Nothing is visible to readers while artifacts are written
+        seen.append(registry.latest_version())
+        small_surface().save(path)
+
+    version = registry.publish(rf, artifacts={SURFACE_NAME: write})
+    assert seen == [None]
+    assert registry.latest_version() == version
+    assert registry.load_manifest(version)['artifacts'] == [SURFACE_NAME]
+    assert ResponseSurface.load(registry.surface_path(version)).query([[30, 50, 0.5]])[0] == 0.5
+
+
+def test_failing_artifact_publishes_nothing(rf, tmp_path):
+    registry = ModelRegistry(str(tmp_path))
+    v1 = registry.publish(rf)
+
+    def broken(path):
+        raise RuntimeError("surface build failed")
+
+    with pytest.raises(RuntimeError):
+        registry.publish(rf, artifacts={SURFACE_NAME: broken})
+    assert registry.latest_version() == v1
+    assert registry.versions() == [v1]
+    assert not [d for d in os.listdir(tmp_path) if d.startswith('.staging-')]
+
+
+@pytest.mark.parametrize('predict', [
+    lambda S: np.full(len(S), np.nan),
+    lambda S: np.zeros(len(S) + 1),
+])
+def test_surface_build_rejects_bad_predictions(predict):
+    with pytest.raises(ValueError):
+        ResponseSurface.build(predict, shape=(3, 3, 3))
+
+
+def test_surrogate_is_staged_with_the_version(rf, tmp_path):
+    from functools import partial
+
+    from forest_engine import compile_forest
+    from registry import SURROGATE_NAME
+    from surrogate import load_surrogate, save_surrogate
+
+    registry = ModelRegistry(str(tmp_path))
+    version = registry.publish(rf, artifacts={
+        SURROGATE_NAME: partial(save_surrogate, compile_forest(rf.estimators_[:1]), metrics={'name': 'tree'}),
+    })
+    flat, metrics = load_surrogate(registry.surrogate_path(version))
+    assert metrics == {'name': 'tree'}
+    assert flat.n_estimators == 1
+
+
+def test_loaded_versions_map_the_stored_child_table(rf, tmp_path):
+    registry = ModelRegistry(str(tmp_path))
+    version = registry.publish(rf)
+    a, _ = registry.load(version)
+    b, _ = registry.load(version)
+    # Read-only views of the file, not per-replica copies built by _children()
+    for forest in (a, b):
+        assert forest._children_cache is not None
+        assert not forest._children_cache.flags.writeable
+    X = np.random.default_rng(1).random((10, 4))
+    np.testing.assert_allclose(a.predict(X), rf.predict(X))
+
+
+def test_files_without_a_child_table_still_load(rf, tmp_path):
+    from forest_engine import FlatForest, compile_forest, save_npz_aligned
+
+    flat = compile_forest(rf)
+    arrays = flat.to_arrays()
+    del arrays['children']
+    save_npz_aligned(tmp_path / 'old.npz', arrays)
+    X = np.random.default_rng(2).random((10, 4))
+    np.testing.assert_allclose(FlatForest.load(tmp_path / 'old.npz').predict(X), rf.predict(X))
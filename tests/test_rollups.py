@@ -0,0 +1,41 @@
+import pandas as pd
+import pytest
+
+from compositing import composite_features
+from features import FEATURE_COLS
+from rollups import derive_tables, monthly_rollup
+
+RAIN_MM_PER_DAY = 2.4
+
+
+@pytest.fixture
+def daily_rows(synthetic_features):
+    days = pd.date_range('2022-01-01', '2023-12-31')
+    # Constant rainfall, so yearly totals are known exactly
+    return synthetic_features(parcels=range(3), days=days).assign(
+        mean_RAINFALL=RAIN_MM_PER_DAY, Predicted_CSI=0.4)
+
+
+def yearly_rain(scored):
+    monthly = monthly_rollup(scored, ward_of=lambda _: 'Chania Ward')
+    yearly, _ = derive_tables(monthly)
+    return yearly.set_index('Year')['Rainfall (mm)']
+
+
+def test_daily_rows_give_annual_totals(daily_rows):
+    rain = yearly_rain(daily_rows)
+    assert rain[2022] == pytest.approx(365 * RAIN_MM_PER_DAY)
+    assert rain[2023] == pytest.approx(365 * RAIN_MM_PER_DAY)
+
+
+@pytest.mark.parametrize('freq', ['10D', 'dekad', 'MS'])
+def test_composites_keep_rainfall_in_mm(daily_rows, freq):
+    daily = daily_rows
+    composites, _ = composite_features(daily, FEATURE_COLS, freq=freq)
+    rain = yearly_rain(composites.assign(Predicted_CSI=0.4))
+
+    # Every day is counted exactly once overall ...
+    assert rain.sum() == pytest.approx(daily['date'].nunique() * RAIN_MM_PER_DAY)
+    # ... and a year is off by at most the part of one interval spilling over
+    for year in (2022, 2023):
+        assert abs(rain[year] - 365 * RAIN_MM_PER_DAY) <= 10 * RAIN_MM_PER_DAY
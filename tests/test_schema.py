@@ -0,0 +1,25 @@
+import pytest
+
+from schema import DEFAULT_DERIVATIONS, FeatureSchema
+
+
+@pytest.fixture
+def training_rows(synthetic_features):
+    # EVI exactly linear in NDVI, so the fitted mapping is known
+    data = synthetic_features(50)
+    data['mean_NDVI'] = data['mean_EVI']
+    data['mean_EVI'] = 0.6 * data['mean_NDVI'] + 0.05
+    return data
+
+
+def test_fit_maps_ndvi_to_evi_from_pairs(training_rows):
+    data = training_rows
+    evi = FeatureSchema.fit(data, ndvi_pairs=data).derivations['mean_EVI']
+    assert evi['scale'] == pytest.approx(0.6)
+    assert evi['offset'] == pytest.approx(0.05)
+
+
+def test_fit_without_ndvi_column_keeps_default_mapping(training_rows):
+    data = training_rows.drop(columns='mean_NDVI')
+    schema = FeatureSchema.fit(data, ndvi_pairs=data)
+    assert schema.derivations['mean_EVI'] == DEFAULT_DERIVATIONS['mean_EVI']
@@ -0,0 +1,79 @@
+import warnings
+
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.ensemble import RandomForestRegressor
+
+from schema import DASHBOARD_INPUTS, FeatureSchema, SchemaError
+from scoring import predict_stress, score_batch, simulated_stress
+from tiering import DASHBOARD_TIERS, INSURANCE_TIERS
+
+
+class ColumnModel:
+    """Stress = first model column."""
+
+    def predict(self, X):
+        return np.asarray(X)[:, 0]
+
+
+class ProbaModel:
+    def predict(self, X):
+        raise AssertionError("classifiers are scored through predict_proba")
+
+    def predict_proba(self, X):
+        p = np.full(len(X), 0.7)
+        return np.column_stack([1 - p, p])
+
+
+def test_without_a_model_the_formula_scores_single_rows_and_batches():
+    rows = np.array([[30.0, 40.0, 0.5], [20.0, 80.0, 0.8]])
+    np.testing.assert_allclose(predict_stress(None, rows), simulated_stress(rows))
+    np.testing.assert_allclose(predict_stress(None, rows[0]), simulated_stress(rows[:1]))
+
+
+def test_classifiers_use_the_positive_class_probability():
+    np.testing.assert_allclose(predict_stress(ProbaModel(), np.zeros((3, 4))), 0.7)
+
+
+def test_ward_multipliers_scale_stress_before_tiering():
+    X = np.array([[0.55], [0.55], [0.55]])
+    out = score_batch(ColumnModel(), X, wards=['Gituamba', 'Kamwangi', 'Elsewhere'])
+    np.testing.assert_allclose(out['Stress Probability'], [0.66, 0.495, 0.55])
+    assert list(out['Risk Level']) == ['HIGH', 'MODERATE', 'MODERATE']
+    assert list(out['Premium']) == [DASHBOARD_TIERS.premiums[2]] + [DASHBOARD_TIERS.premiums[1]] * 2
+
+
+def test_tiers_match_the_scheme(synthetic_features):
+    X = synthetic_features(200)
+    rf = RandomForestRegressor(n_estimators=5, random_state=0).fit(X, X['mean_EVI'])
+    out = score_batch(rf, X, tiers=INSURANCE_TIERS)
+    np.testing.assert_allclose(out['Stress Probability'], rf.predict(X))
+    assert list(out['Risk Level']) == list(INSURANCE_TIERS.classify(out['Stress Probability']))
+
+
+def test_frames_keep_their_feature_names(synthetic_features):
+    X = synthetic_features(200)
+    rf = RandomForestRegressor(n_estimators=3, random_state=0).fit(X, X['mean_LST'])
+    with warnings.catch_warnings():
+        warnings.simplefilter('error')
+        np.testing.assert_allclose(predict_stress(rf, X), rf.predict(X))
+
+
+def test_schema_maps_dashboard_inputs_to_model_columns():
+    schema = FeatureSchema.default().compile(DASHBOARD_INPUTS)
+    inputs = pd.DataFrame([[30.0, 40.0, 0.5]], columns=list(DASHBOARD_INPUTS))
+    stress = predict_stress(ColumnModel(), inputs, schema)
+    # The first model column is mean_LST, taken straight from the temperature
+    np.testing.assert_allclose(stress, [30.0])
+
+
+@pytest.mark.parametrize('bad', [
+    pd.DataFrame({'NDVI': [0.5]}),
+    np.array([[30.0, np.nan, 0.5]]),
+    np.zeros((2, 4)),
+])
+def test_schema_rejects_bad_inputs(bad):
+    schema = FeatureSchema.default().compile(DASHBOARD_INPUTS)
+    with pytest.raises(SchemaError):
+        score_batch(ColumnModel(), bad, schema=schema)
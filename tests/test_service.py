@@ -0,0 +1,86 @@
+import asyncio
+
+import numpy as np
+import pytest
+
+from service import LatencyTracker, MicroBatcher
+
+
+class ConstantModel:
+    def __init__(self, value):
+        self.value = value
+        self.calls = []
+
+    def predict(self, X):
+        self.calls.append(len(X))
+        return np.full(len(X), self.value)
+
+
+class BrokenModel:
+    def predict(self, X):
+        raise RuntimeError("model failed")
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+async def score_all(requests, max_wait_ms=20.0):
+    batcher = MicroBatcher(LatencyTracker(), max_wait_ms=max_wait_ms).start()
+    results = await asyncio.gather(
+        *(batcher.submit(X, None, model) for X, model in requests), return_exceptions=True)
+    batcher._task.cancel()
+    return results
+
+
+def test_requests_are_coalesced_into_one_call():
+    model = ConstantModel(0.2)
+    results = run(score_all([(np.zeros((n, 4)), model) for n in (1, 2, 3)]))
+    assert model.calls == [6]
+    assert [len(r['stress']) for r in results] == [1, 2, 3]
+
+
+def test_each_request_is_scored_by_its_own_model():
+    old, new = ConstantModel(0.2), ConstantModel(0.7)
+    results = run(score_all([(np.zeros((1, 4)), old), (np.zeros((2, 4)), new), (np.zeros((1, 4)), old)]))
+    assert [r['stress'] for r in results] == [[0.2], [0.7, 0.7], [0.2]]
+    assert old.calls == [2] and new.calls == [2]
+
+
+def test_failures_only_fail_their_own_batch():
+    good = ConstantModel(0.2)
+    results = run(score_all([(np.zeros((1, 4)), BrokenModel()), (np.zeros((1, 4)), good)]))
+    assert isinstance(results[0], RuntimeError)
+    assert results[1]['stress'] == [0.2]
+
+
+def test_batcher_survives_rows_that_cannot_be_stacked():
+    async def scenario():
+        model = ConstantModel(0.2)
+        batcher = MicroBatcher(LatencyTracker(), max_wait_ms=20.0).start()
+        bad = await asyncio.gather(
+            batcher.submit(np.zeros((1, 4)), None, model),
+            batcher.submit(np.zeros((1, 3)), None, model),
+            return_exceptions=True,
+        )
+        ok = await asyncio.wait_for(batcher.submit(np.zeros((1, 4)), None, model), 1)
+        batcher._task.cancel()
+        return bad, ok
+
+    bad, ok = run(scenario())
+    assert all(isinstance(r, ValueError) for r in bad)
+    assert ok['stress'] == [0.2]
+
+
+@pytest.mark.parametrize('rows', [1, 5])
+def test_tracker_records_batch_sizes(rows):
+    tracker = LatencyTracker()
+    batcher = MicroBatcher(tracker, max_wait_ms=1.0)
+
+    async def scenario():
+        batcher.start()
+        await batcher.submit(np.zeros((rows, 4)), None, ConstantModel(0.1))
+        batcher._task.cancel()
+
+    run(scenario())
+    assert list(tracker.batch_sizes) == [rows]
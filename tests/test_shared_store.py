@@ -0,0 +1,50 @@
+import os
+
+import numpy as np
+from sklearn.ensemble import RandomForestRegressor
+
+from forest_engine import compile_forest
+from shared_store import FOREST_DIR, attach_forest, has_forest, publish_forest
+
+
+def forest(seed):
+    rng = np.random.default_rng(seed)
+    X = rng.random((100, 4))
+    return compile_forest(RandomForestRegressor(n_estimators=3, random_state=seed).fit(X, X[:, seed % 4]))
+
+
+X = np.random.default_rng(9).random((20, 4))
+
+
+def version_dirs(serve_dir):
+    return sorted(d for d in os.listdir(serve_dir) if d.startswith(f'.{FOREST_DIR}-'))
+
+
+def test_publish_swaps_a_symlink_and_keeps_the_previous_version(tmp_path):
+    serve_dir = str(tmp_path)
+    assert not has_forest(serve_dir)
+    forests = [forest(seed) for seed in range(3)]
+    for f in forests:
+        publish_forest(f, serve_dir)
+        assert os.path.islink(tmp_path / FOREST_DIR)
+        np.testing.assert_array_equal(attach_forest(serve_dir).predict(X), f.predict(X))
+    assert has_forest(serve_dir)
+    assert len(version_dirs(serve_dir)) == 2
+
+
+def test_attached_forest_survives_a_later_publish(tmp_path):
+    serve_dir = str(tmp_path)
+    old = forest(0)
+    publish_forest(old, serve_dir)
+    attached = attach_forest(serve_dir)
+    for seed in (1, 2):
+        publish_forest(forest(seed), serve_dir)
+    np.testing.assert_array_equal(attached.predict(X), old.predict(X))
+
+
+def test_plain_directory_from_older_publishes_is_replaced(tmp_path):
+    (tmp_path / FOREST_DIR).mkdir()
+    (tmp_path / FOREST_DIR / 'roots.npy').write_bytes(b'stale')
+    new = forest(1)
+    publish_forest(new, str(tmp_path))
+    np.testing.assert_array_equal(attach_forest(str(tmp_path)).predict(X), new.predict(X))
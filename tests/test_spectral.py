@@ -0,0 +1,73 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from spectral import compute_indices_array, reduce_indices
+from zonal import ParcelPixelIndex, zonal_stats
+
+
+def add_indices(bands):
+    """The ``add_indices`` expressions from mkulima.py, one index at a time."""
+    nir, red, blue = (bands[b].astype(np.float64) for b in ('B8', 'B4', 'B2'))
+    return {
+        'NDVI': (nir - red) / (nir + red),
+        'EVI': 2.5 * ((nir - red) / (nir + 6 * red - 7.5 * blue + 1)),
+        'SAVI': ((nir - red) / (nir + red + 0.5)) * (1 + 0.5),
+    }
+
+
+def scene(shape=(37, 23), seed=0):
+    rng = np.random.default_rng(seed)
+    return {band: rng.integers(1, 10_000, shape).astype(np.uint16) for band in ('B2', 'B4', 'B8')}
+
+
+def read_band(bands):
+    return lambda name, start, stop: bands[name][start:stop]
+
+
+@pytest.mark.parametrize('tile_rows', [5, 512])
+def test_fused_indices_match_add_indices(tile_rows):
+    bands = scene()
+    expected = add_indices(bands)
+    got = compute_indices_array(bands, tile_rows=tile_rows)
+    for name in ('NDVI', 'EVI', 'SAVI'):
+        assert got[name].dtype == np.float32
+        np.testing.assert_allclose(got[name], expected[name], rtol=1e-5)
+
+
+def test_requested_subset_is_computed_alone():
+    bands = scene()
+    got = compute_indices_array(bands, indices=('SAVI',), tile_rows=8, scale=1e-4)
+    scaled = {b: v * 1e-4 for b, v in bands.items()}
+    assert list(got) == ['SAVI']
+    np.testing.assert_allclose(got['SAVI'], add_indices(scaled)['SAVI'], rtol=1e-4)
+
+
+def test_strip_reduction_matches_zonal_stats_on_full_grids():
+    bands = scene()
+    shape = bands['B8'].shape
+    rng = np.random.default_rng(1)
+    labels = rng.integers(0, 6, shape)
+    index = ParcelPixelIndex.from_labels(labels, object_ids=[11, 12, 13, 14, 15])
+
+    grids = compute_indices_array(bands)
+    got = reduce_indices(read_band(bands), shape, index, tile_rows=6)
+    for name, grid in grids.items():
+        pd.testing.assert_frame_equal(got[name], zonal_stats(grid, index))
+
+
+def test_strip_reduction_handles_shared_pixels():
+    bands = scene()
+    shape = bands['B8'].shape
+    # Two parcels on the same pixel, as on coarse grids
+    index = ParcelPixelIndex.from_pairs([40, 40, 500], [0, 1, 2], [1, 2, 3], shape)
+    ndvi = add_indices(bands)['NDVI'].ravel()
+    got = reduce_indices(read_band(bands), shape, index, indices=('NDVI',), tile_rows=4)
+    np.testing.assert_allclose(got['NDVI']['mean'], ndvi[[40, 40, 500]], rtol=1e-6)
+
+
+def test_strip_reduction_rejects_other_grids():
+    bands = scene()
+    index = ParcelPixelIndex.from_labels(np.ones((5, 5), dtype=int))
+    with pytest.raises(ValueError):
+        reduce_indices(read_band(bands), bands['B8'].shape, index)
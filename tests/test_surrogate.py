@@ -0,0 +1,23 @@
+import numpy as np
+from sklearn.ensemble import RandomForestRegressor
+
+import surrogate
+from forest_engine import compile_forest
+
+
+def small_forest():
+    X = np.random.default_rng(0).random((200, 4))
+    return compile_forest(RandomForestRegressor(n_estimators=3, random_state=0).fit(X, X[:, 0])), X
+
+
+def test_large_forests_are_not_converted_for_predict_one(monkeypatch):
+    flat, X = small_forest()
+    monkeypatch.setattr(surrogate, 'PREDICT_ONE_MAX_NODES', flat.n_nodes - 1)
+    assert surrogate._row_latency_us(flat, X, repeat=2) > 0
+    assert getattr(flat, '_lists_cache', None) is None
+
+
+def test_small_forests_time_predict_one_too():
+    flat, X = small_forest()
+    surrogate._row_latency_us(flat, X, repeat=2)
+    assert flat._lists_cache is not None
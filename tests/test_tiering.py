@@ -0,0 +1,37 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from tiering import DASHBOARD_TIERS, INSURANCE_TIERS, MISSING_CODE, TierScheme
+
+
+def test_score_must_exceed_a_cut_point_to_move_up():
+    scores = [0.0, 0.3, np.nextafter(0.3, 1), 0.6, 0.61, 1.2]
+    assert list(INSURANCE_TIERS.classify(scores)) == [
+        'Low Risk', 'Low Risk', 'Medium Risk', 'Medium Risk', 'High Risk', 'High Risk']
+
+
+def test_matches_the_dashboard_comparisons():
+    scores = np.linspace(0, 1, 101)
+    expected = ['HIGH' if s > 0.6 else ('MODERATE' if s > 0.3 else 'LOW') for s in scores]
+    assert list(DASHBOARD_TIERS.classify(scores)) == expected
+
+
+def test_premiums_follow_the_same_tiers():
+    assert list(INSURANCE_TIERS.premium([0.3, 0.6])) == list(INSURANCE_TIERS.premiums[:2])
+
+
+@pytest.mark.parametrize('breakpoints, labels', [((0.6, 0.3), 'abc'), ((0.3, 0.6), 'ab')])
+def test_invalid_schemes_are_rejected(breakpoints, labels):
+    with pytest.raises(ValueError):
+        TierScheme(breakpoints, tuple(labels))
+
+
+def test_nan_scores_have_no_tier():
+    scores = [0.1, np.nan, 0.9]
+    assert INSURANCE_TIERS.codes(scores).tolist() == [0, MISSING_CODE, 2]
+    assert INSURANCE_TIERS.codes(np.nan) == MISSING_CODE
+    risk = INSURANCE_TIERS.classify(scores)
+    assert risk[0] == 'Low Risk' and risk[2] == 'High Risk'
+    assert pd.isna(risk[1])
+    assert pd.isna(INSURANCE_TIERS.premium(scores)[1])
@@ -0,0 +1,80 @@
+import joblib
+import numpy as np
+import pandas as pd
+import pytest
+
+from csi import CSINormalizer, stats_path
+from features import FEATURE_COLS
+from registry import ModelRegistry
+from schema import FeatureSchema, schema_path
+from training import TARGET_COL, grouped_splits, refresh_model, time_blocks, train_final
+
+
+@pytest.fixture
+def parcel_days(synthetic_features):
+    return synthetic_features(parcels=range(40), days=pd.date_range('2022-01-01', periods=60, freq='8D'))
+
+
+# ==================== SPLITS ====================
+def test_parcel_splits_hold_out_whole_parcels(parcel_days):
+    df = parcel_days
+    splits = grouped_splits(df, by='parcel', n_splits=5)
+    tested = np.concatenate([test for _, test in splits])
+    assert np.array_equal(np.sort(tested), np.arange(len(df)))
+    for train, test in splits:
+        assert not set(df['OBJECTID'].iloc[train]) & set(df['OBJECTID'].iloc[test])
+
+
+def test_time_splits_hold_out_contiguous_periods(parcel_days):
+    df = parcel_days
+    for train, test in grouped_splits(df, by='time', n_splits=4):
+        test_dates = df['date'].iloc[test]
+        inside = df['date'].iloc[train].between(test_dates.min(), test_dates.max())
+        assert not inside.any()
+
+
+def test_both_drops_rows_sharing_the_parcel_fold_or_the_period(parcel_days):
+    df = parcel_days
+    blocks = time_blocks(df['date'], 5)
+    for train, test in grouped_splits(df, by='both', n_splits=5):
+        assert not set(df['OBJECTID'].iloc[train]) & set(df['OBJECTID'].iloc[test])
+        assert not set(blocks[train]) & set(blocks[test])
+
+
+def test_unknown_grouping_is_rejected(parcel_days):
+    with pytest.raises(ValueError):
+        grouped_splits(parcel_days, by='ward')
+
+
+# ==================== INCREMENTAL REFRESH ====================
+@pytest.fixture
+def saved_model(synthetic_features, tmp_path):
+    data = synthetic_features(300, 0)
+    normalizer = CSINormalizer().fit([data])
+    data[TARGET_COL] = normalizer.transform(data)
+    model = train_final(data, {'n_estimators': 10})
+    path = str(tmp_path / 'model.pkl')
+    joblib.dump(model, path)
+    normalizer.save(stats_path(path))
+    FeatureSchema.default().save(schema_path(path))
+    return path, normalizer
+
+
+def test_refresh_publishes_with_schema_and_stats(synthetic_features, saved_model, tmp_path):
+    path, normalizer = saved_model
+    registry = ModelRegistry(str(tmp_path / 'registry'))
+    model = refresh_model(path, synthetic_features(50, 1), n_new_trees=5, max_trees=12, registry=registry)
+
+    forest, manifest = registry.load()
+    assert manifest['n_estimators'] == 12
+    assert FeatureSchema.from_dict(manifest['feature_schema']).columns == tuple(FEATURE_COLS)
+    assert manifest['csi_stats'] == normalizer.to_dict()
+    X = synthetic_features(20, 2)
+    np.testing.assert_allclose(forest.predict(X[FEATURE_COLS]), model.predict(X), atol=1e-12)
+
+
+def test_refresh_without_registry_only_rewrites_files(synthetic_features, saved_model, tmp_path):
+    path, _ = saved_model
+    refresh_model(path, synthetic_features(50, 1), n_new_trees=5)
+    assert len(joblib.load(path).estimators_) == 15
+    assert not (tmp_path / 'registry').exists()
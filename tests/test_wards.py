@@ -0,0 +1,100 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from wards import WardIndex, aggregate_by_ward, parcel_wards, points_in_polygon, polygon_centroids
+
+
+def polygon(*rings):
+    return {'type': 'Polygon', 'coordinates': [list(map(list, r)) for r in rings]}
+
+
+def ward(name, geometry):
+    return {'type': 'Feature', 'properties': {'Ward': name}, 'geometry': geometry}
+
+
+# West and east halves sharing a jagged border; the east ward has a hole
+# and a second, detached part
+FEATURES = [
+    ward('West', polygon([(0, 0), (5, 0), (4, 3), (6, 6), (5, 10), (0, 10), (0, 0)])),
+    ward('East', {'type': 'MultiPolygon', 'coordinates': [
+        [[[5, 0], [10, 0], [10, 10], [5, 10], [6, 6], [4, 3], [5, 0]],
+         [[7, 7], [9, 7], [9, 9], [7, 9], [7, 7]]],
+        [[[11, 0], [13, 0], [13, 2], [11, 2], [11, 0]]],
+    ]}),
+]
+
+
+def brute_force(index, xy):
+    codes = np.full(len(xy), -1)
+    for w, edges in enumerate(index.edges):
+        codes[points_in_polygon(xy, edges)] = w
+    return codes
+
+
+@pytest.mark.parametrize('grid_cells', [1, 8, 64])
+def test_grid_lookup_matches_brute_force(grid_cells):
+    index = WardIndex.from_features(FEATURES, grid_cells=grid_cells)
+    xy = np.random.default_rng(0).uniform(-1, 14, (20_000, 2))
+    np.testing.assert_array_equal(index.assign(xy), brute_force(index, xy))
+
+
+def test_holes_detached_parts_and_outside_points():
+    index = WardIndex.from_features(FEATURES, grid_cells=16)
+    names = index.ward_names(index.assign([(1, 1), (9.5, 1), (8, 8), (12, 1), (20, 20)]))
+    assert list(names) == ['West', 'East', None, 'East', None]
+
+
+def test_parcel_wards_cache_is_keyed_by_coordinates(tmp_path):
+    index = WardIndex.from_features(FEATURES)
+    ids = np.array([1, 2])
+    table = parcel_wards(index, ids, [(1, 1), (9, 1)], str(tmp_path))
+    assert list(table['Ward']) == ['West', 'East']
+    assert list(parcel_wards(index, ids, [(1, 1), (9, 1)], str(tmp_path))['Ward']) == ['West', 'East']
+    assert list(parcel_wards(index, ids, [(9, 1), (1, 1)], str(tmp_path))['Ward']) == ['East', 'West']
+
+
+def test_aggregate_by_ward_matches_groupby():
+    rng = np.random.default_rng(0)
+    ward_table = pd.DataFrame({'OBJECTID': np.arange(30), 'Ward': rng.choice(['A', 'B', 'C'], 30)})
+    scored = pd.DataFrame({'OBJECTID': rng.integers(0, 35, 500), 'Predicted_CSI': rng.random(500)})
+    exposure = dict(zip(range(30), rng.uniform(0.5, 3, 30)))
+
+    out = aggregate_by_ward(scored, ward_table, exposure).set_index('Ward')
+    joined = scored.merge(ward_table, on='OBJECTID')
+    joined['w'] = joined['OBJECTID'].map(exposure)
+    grouped = joined.groupby('Ward')
+    np.testing.assert_array_equal(out['Rows'], grouped.size())
+    np.testing.assert_allclose(out['Mean Stress'], grouped['Predicted_CSI'].mean())
+    np.testing.assert_allclose(out['Max Stress'], grouped['Predicted_CSI'].max())
+    np.testing.assert_allclose(
+        out['Exposure-weighted Stress'],
+        grouped.apply(lambda g: np.average(g['Predicted_CSI'], weights=g['w']), include_groups=False))
+    shares = out[[c for c in out if c.endswith(' share')]].sum(axis=1)
+    np.testing.assert_allclose(shares, 1.0)
+
+
+def test_polygon_centroids_are_area_weighted():
+    # L shape: a 2x2 square plus a 2x1 strip, listed clockwise
+    l_shape = [(0, 0), (0, 2), (2, 2), (2, 1), (4, 1), (4, 0), (0, 0)]
+    degenerate = [(1, 1), (3, 3), (1, 1)]
+    expected = [[(1 * 4 + 3 * 2) / 6, (1 * 4 + 0.5 * 2) / 6], [5 / 3, 5 / 3]]
+    np.testing.assert_allclose(polygon_centroids([l_shape, degenerate]), expected)
+
+
+def test_wards_without_exposure_have_no_risk_level():
+    ward_table = pd.DataFrame({'OBJECTID': [1, 2, 3], 'Ward': ['A', 'B', 'B']})
+    scored = pd.DataFrame({'OBJECTID': [1, 2, 3], 'Predicted_CSI': [0.1, 0.2, 0.9]})
+    out = aggregate_by_ward(scored, ward_table, exposure={1: 0.0, 2: 1.0, 3: 1.0}).set_index('Ward')
+    assert np.isnan(out.loc['A', 'Exposure-weighted Stress'])
+    assert pd.isna(out.loc['A', 'Risk Level'])
+    assert out.loc['B', 'Risk Level'] == 'Medium Risk'
+    assert out['Risk Level'].dtype == 'category'
+
+
+def test_unscored_rows_count_towards_no_tier_share():
+    ward_table = pd.DataFrame({'OBJECTID': [1, 2], 'Ward': ['A', 'A']})
+    scored = pd.DataFrame({'OBJECTID': [1, 2], 'Predicted_CSI': [0.1, np.nan]})
+    out = aggregate_by_ward(scored, ward_table)
+    assert out.loc[0, 'Low Risk share'] == 0.5
+    assert out.loc[0, 'High Risk share'] == 0.0
@@ -0,0 +1,120 @@
+import numpy as np
+import pytest
+
+from zonal import ParcelPixelIndex, geometry_centroids, pixel_under, zonal_stats
+
+# North-up grids anchored at (x0, y0): x = x0 + res * col, y = y0 - res * row
+X0, Y0 = 500_000.0, 9_900_000.0
+
+
+def grid_transform(res):
+    return (res, 0.0, X0, 0.0, -res, Y0)
+
+
+def square(x, y, size):
+    ring = [(x, y), (x + size, y), (x + size, y + size), (x, y + size), (x, y)]
+    return {'type': 'Polygon', 'coordinates': [ring]}
+
+
+def brute_force(image, pixel_lists):
+    """Per-parcel mean / median / std over explicit lists of (row, col) pixels."""
+    rows = []
+    for pixels in pixel_lists:
+        values = np.array([image[r, c] for r, c in pixels], dtype=np.float64)
+        values = values[~np.isnan(values)]
+        if values.size:
+            rows.append((values.mean(), np.median(values), values.std()))
+        else:
+            rows.append((np.nan, np.nan, np.nan))
+    return np.array(rows).reshape(-1, 3)
+
+
+def assert_stats(stats, expected, object_ids):
+    np.testing.assert_array_equal(stats['OBJECTID'], object_ids)
+    np.testing.assert_allclose(stats[['mean', 'median', 'stdDev']].to_numpy(), expected, atol=1e-12)
+
+
+def test_fine_grid_matches_brute_force():
+    rng = np.random.default_rng(0)
+    image = rng.random((40, 50))
+    image[rng.random(image.shape) < 0.1] = np.nan
+    labels = np.zeros(image.shape, dtype=np.int32)
+    boxes = [(0, 10, 0, 10), (5, 25, 12, 30), (30, 40, 0, 50), (12, 14, 40, 41)]
+    for k, (r0, r1, c0, c1) in enumerate(boxes, start=1):
+        labels[r0:r1, c0:c1] = k
+    object_ids = np.array([101, 102, 103, 104, 105])  # 105 covers no pixels
+
+    index = ParcelPixelIndex.from_labels(labels, object_ids)
+    pixels = [list(zip(*np.nonzero(labels == k))) for k in range(1, 6)]
+    assert_stats(zonal_stats(image, index), brute_force(image, pixels), object_ids)
+
+
+def test_coarse_grid_gives_every_parcel_the_pixel_under_its_centroid():
+    res = 1000.0
+    rng = np.random.default_rng(1)
+    image = rng.random((6, 8))
+    # 60 m parcels, several per 1 km pixel; rasterizing them leaves no labels
+    corners = np.column_stack([X0 + rng.uniform(0, 7900, 200), Y0 - rng.uniform(100, 6000, 200)])
+    geoms = [square(x, y, 60.0) for x, y in corners]
+    object_ids = np.arange(1, 201)
+    centroids = geometry_centroids(geoms)
+    np.testing.assert_allclose(centroids, corners + 30.0)
+
+    labels = np.zeros(image.shape, dtype=np.int32)
+    index = ParcelPixelIndex.from_labels(labels, object_ids, centroids, grid_transform(res))
+    cols = ((centroids[:, 0] - X0) // res).astype(int)
+    rows = ((Y0 - centroids[:, 1]) // res).astype(int)
+    pixels = [[(r, c)] for r, c in zip(rows, cols)]
+
+    stats = zonal_stats(image, index)
+    assert stats['mean'].notna().all()
+    assert_stats(stats, brute_force(image, pixels), object_ids)
+    # Parcels sharing a pixel all keep it
+    assert len(set(zip(rows, cols))) < len(object_ids)
+
+
+def test_parcels_covering_pixel_centres_keep_them_and_small_ones_fall_back():
+    res = 1000.0
+    image = np.arange(12, dtype=np.float64).reshape(3, 4)
+    labels = np.zeros(image.shape, dtype=np.int32)
+    labels[0:2, 0:2] = 1  # a large parcel over four pixel centres
+    centroids = np.array([[X0 + 1000, Y0 - 1000], [X0 + 3100, Y0 - 2200], [X0 + 3900, Y0 - 2900]])
+    index = ParcelPixelIndex.from_labels(labels, [1, 2, 3], centroids, grid_transform(res))
+    pixels = [[(0, 0), (0, 1), (1, 0), (1, 1)], [(2, 3)], [(2, 3)]]
+    assert_stats(zonal_stats(image, index), brute_force(image, pixels), [1, 2, 3])
+
+
+def test_points_off_the_grid_get_nan():
+    index = ParcelPixelIndex.from_points([[X0 + 10, Y0 - 10], [X0 - 10, Y0 - 10]], [7, 8],
+                                         grid_transform(100.0), (2, 2))
+    stats = zonal_stats(np.ones((2, 2)), index)
+    assert stats['mean'].tolist()[0] == 1.0
+    assert np.isnan(stats['mean'].tolist()[1])
+
+
+def test_pixel_under_follows_the_affine_transform():
+    points = [[X0 + 0.5, Y0 - 0.5], [X0 + 250, Y0 - 150], [X0 + 399.9, Y0 - 299.9], [X0 + 400, Y0 - 1]]
+    assert pixel_under(points, grid_transform(100.0), (3, 4)).tolist() == [0, 6, 11, -1]
+
+
+@pytest.mark.parametrize('res', [30.0, 1000.0])
+def test_from_polygons_matches_brute_force(res):
+    pytest.importorskip('rasterio')
+    from affine import Affine
+
+    rng = np.random.default_rng(2)
+    image = rng.random((20, 20))
+    geoms = [square(X0 + x, Y0 - y, size) for x, y, size in
+             [(100, 400, 250), (3000, 3000, 60), (3050, 3100, 60), (400, 5000, 90)]]
+    transform = Affine(*grid_transform(res))
+    index = ParcelPixelIndex.from_polygons(geoms, [1, 2, 3, 4], transform, image.shape)
+
+    pixels = []
+    centroids = geometry_centroids(geoms)
+    for g, (cx, cy) in zip(geoms, centroids):
+        (x0, y0), _, (x1, y1) = g['coordinates'][0][:3]
+        rows, cols = np.mgrid[0:20, 0:20]
+        px, py = X0 + (cols + 0.5) * res, Y0 - (rows + 0.5) * res
+        inside = list(zip(*np.nonzero((px > x0) & (px < x1) & (py > y0) & (py < y1))))
+        pixels.append(inside or [(int((Y0 - cy) // res), int((cx - X0) // res))])
+    assert_stats(zonal_stats(image, index), brute_force(image, pixels), [1, 2, 3, 4])
@@ -0,0 +1,74 @@
+"""Risk / insurance tiering shared by the training pipeline and the dashboard.
+
+A ``TierScheme`` holds the breakpoints, labels, premium bands and display
+colours. ``classify`` maps any number of scores to tiers in one
+``np.searchsorted`` call and returns a compact ``pd.Categorical`` (int8
+codes) rather than one Python string per row.
+"""
+
+import numpy as np
+import pandas as pd
+
+# Code of scores that have no tier (NaN); a missing value once categorical
+MISSING_CODE = -1
+
+
+class TierScheme:
+    """Tiers split at ``breakpoints``; a score must exceed a breakpoint to
+    move up a tier (``csi <= 0.3`` is Low, ``0.3 < csi <= 0.6`` is Medium)."""
+
+    def __init__(self, breakpoints, labels, premiums=None, colors=None):
+        breakpoints = np.asarray(breakpoints, dtype=np.float64)
+        if np.any(np.diff(breakpoints) <= 0):
+            raise ValueError("Tier breakpoints must be strictly increasing")
+        if len(labels) != len(breakpoints) + 1:
+            raise ValueError(f"{len(breakpoints)} breakpoints need {len(breakpoints) + 1} labels")
+        self.breakpoints = breakpoints
+        self.labels = tuple(labels)
+        self.premiums = tuple(premiums) if premiums is not None else None
+        self.colors = tuple(colors) if colors is not None else None
+
+    def relabel(self, labels):
+        """Same breakpoints and premiums under different tier names."""
+        return TierScheme(self.breakpoints, labels, self.premiums, self.colors)
+
+    def codes(self, scores):
+        """Tier index per score (0 = lowest) as int8; ``MISSING_CODE`` for NaN."""
+        scores = np.asarray(scores, dtype=np.float64)
+        codes = np.searchsorted(self.breakpoints, scores, side='left')
+        # searchsorted sorts NaN above every breakpoint, i.e. into the top tier
+        return np.where(np.isnan(scores), MISSING_CODE, codes).astype(np.int8)
+
+    def classify(self, scores):
+        """Tier label per score as an ordered ``pd.Categorical`` (NaN: missing)."""
+        return pd.Categorical.from_codes(
+            self.codes(scores),
+            categories=pd.Index(self.labels),
+            ordered=True,
+        )
+
+    def premium(self, scores):
+        """Premium recommendation text per score."""
+        if self.premiums is None:
+            raise ValueError("This tier scheme has no premium bands")
+        return pd.Categorical.from_codes(self.codes(scores), categories=pd.Index(self.premiums))
+
+    def color_map(self):
+        """{label: colour} for Plotly ``color_discrete_map``."""
+        return dict(zip(self.labels, self.colors or ()))
+
+
+# Cut points 0.3 / 0.6, as documented in the README
+INSURANCE_TIERS = TierScheme(
+    breakpoints=(0.3, 0.6),
+    labels=('Low Risk', 'Medium Risk', 'High Risk'),
+    premiums=(
+        "**Low Premium (0-10% increase)** - Basic coverage sufficient",
+        "**Moderate Premium (10-20% increase)** - Standard coverage with monitoring",
+        "**High Premium (25-40% increase)** - Consider yield protection insurance",
+    ),
+    colors=('#4CAF50', '#FFC107', '#F44336'),
+)
+
+# Dashboard display names for the same tiers
+DASHBOARD_TIERS = INSURANCE_TIERS.relabel(('LOW', 'MODERATE', 'HIGH'))
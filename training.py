@@ -0,0 +1,283 @@
+"""Training runner for the stress Random Forest.
+
+* Cross-validation grouped by parcel (OBJECTID), by time block, or both, so
+  the same parcel / period never appears on both sides of a split.
+* A bounded hyperparameter search over trees, depth and ``max_samples``
+  that evaluates configs fold by fold and drops any config whose running
+  score falls clearly behind the best one.
+* Every fit uses all cores (``n_jobs=-1``) and is timed, with the peak RSS
+  growth recorded per config.
+* Incremental monthly refresh: grow the saved forest with trees fitted on
+  the new month only, optionally retiring the oldest trees.
+"""
+
+import itertools
+import os
+import shutil
+import threading
+import time
+
+import joblib
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import RandomForestRegressor
+from sklearn.metrics import mean_squared_error, r2_score
+
+from csi import CSINormalizer, stats_path
+from features import FEATURE_COLS
+from forest_engine import compile_forest
+from schema import FeatureSchema, schema_path
+
+TARGET_COL = 'CSI_ref'
+
+PARAM_GRID = {
+    'n_estimators': [100, 200, 400],
+    'max_depth': [None, 12, 20],
+    'max_samples': [None, 0.5, 0.25],
+}
+
+
+# ==================== SPLITS ====================
+def _fold_ids(keys, n_splits, seed=42):
+    """Randomly assign each unique key to one of ``n_splits`` folds."""
+    uniq, inverse = np.unique(keys, return_inverse=True)
+    rng = np.random.default_rng(seed)
+    folds = rng.permutation(len(uniq)) % n_splits
+    return folds[inverse]
+
+
+def time_blocks(dates, n_blocks):
+    """Contiguous time blocks of (roughly) equal row counts."""
+    dates = pd.to_datetime(pd.Series(dates)).to_numpy()
+    edges = np.quantile(dates.astype('int64'), np.linspace(0, 1, n_blocks + 1)[1:-1])
+    return np.searchsorted(edges, dates.astype('int64'), side='right')
+
+
+def grouped_splits(df, by='parcel', n_splits=5, seed=42):
+    """(train_idx, test_idx) pairs with no parcel and/or time-block leakage.
+
+    ``by='both'`` holds out one parcel fold inside one time block and drops
+    every row sharing either the parcel fold or the time block from training.
+    """
+    n = len(df)
+    if by in ('parcel', 'both'):
+        parcel_fold = _fold_ids(df['OBJECTID'].to_numpy(), n_splits, seed)
+    if by in ('time', 'both'):
+        time_fold = time_blocks(df['date'], n_splits)
+
+    splits = []
+    for k in range(n_splits):
+        if by == 'parcel':
+            test = parcel_fold == k
+            train = ~test
+        elif by == 'time':
+            test = time_fold == k
+            train = ~test
+        elif by == 'both':
+            test = (parcel_fold == k) & (time_fold == k)
+            train = (parcel_fold != k) & (time_fold != k)
+        else:
+            raise ValueError(f"Unknown grouping: {by!r}")
+        if test.any() and train.any():
+            splits.append((np.flatnonzero(train), np.flatnonzero(test)))
+    if not splits:
+        raise ValueError(f"No usable {by} splits for {n} rows")
+    return splits
+
+
+# ==================== MEMORY ====================
+def _rss_bytes():
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError):
+        return 0
+
+
+class PeakMemory:
+    """Context manager sampling process RSS; ``peak_mb`` is growth over entry."""
+
+    def __init__(self, interval=0.05):
+        self.interval = interval
+        self.peak_mb = 0.0
+
+    def __enter__(self):
+        self._base = _rss_bytes()
+        self._peak = self._base
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._sample, daemon=True)
+        self._thread.start()
+        return self
+
+    def _sample(self):
+        while not self._stop.wait(self.interval):
+            self._peak = max(self._peak, _rss_bytes())
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self._peak = max(self._peak, _rss_bytes())
+        self.peak_mb = (self._peak - self._base) / 2**20
+        return False
+
+
+# ==================== TRAINING ====================
+def make_model(params, seed=42):
+    return RandomForestRegressor(random_state=seed, n_jobs=-1, **params)
+
+
+def fit_fold(params, X, y, train_idx, test_idx, seed=42):
+    """Fit one fold; returns (r2, mse, fit_seconds, peak_mb)."""
+    with PeakMemory() as mem:
+        start = time.perf_counter()
+        model = make_model(params, seed).fit(X[train_idx], y[train_idx])
+        elapsed = time.perf_counter() - start
+    pred = model.predict(X[test_idx])
+    return r2_score(y[test_idx], pred), mean_squared_error(y[test_idx], pred), elapsed, mem.peak_mb
+
+
+def param_configs(grid=PARAM_GRID, max_configs=None, seed=42):
+    """All grid combinations, or a random subset of ``max_configs`` of them."""
+    keys = list(grid)
+    configs = [dict(zip(keys, vals)) for vals in itertools.product(*(grid[k] for k in keys))]
+    if max_configs is not None and max_configs < len(configs):
+        rng = np.random.default_rng(seed)
+        configs = [configs[i] for i in sorted(rng.choice(len(configs), max_configs, replace=False))]
+    return configs
+
+
+def search(df, grid=PARAM_GRID, by='parcel', n_splits=5, max_configs=12,
+           stop_margin=0.05, features=FEATURE_COLS, target=TARGET_COL, seed=42):
+    """Grouped-CV hyperparameter search with early stopping.
+
+    All surviving configs are evaluated on fold 1, then fold 2, ... After
+    each fold a config is dropped if its mean R2 so far trails the best mean
+    by more than ``stop_margin``. Returns a DataFrame, best config first.
+    """
+    X = df[features].to_numpy(dtype=np.float64)
+    y = df[target].to_numpy(dtype=np.float64)
+    splits = grouped_splits(df, by, n_splits, seed)
+
+    configs = param_configs(grid, max_configs, seed)
+    runs = [{'params': p, 'r2': [], 'mse': [], 'seconds': 0.0, 'peak_mb': 0.0, 'stopped': False}
+            for p in configs]
+
+    for fold, (train_idx, test_idx) in enumerate(splits, 1):
+        alive = [r for r in runs if not r['stopped']]
+        for run in alive:
+            r2, mse, seconds, peak = fit_fold(run['params'], X, y, train_idx, test_idx, seed)
+            run['r2'].append(r2)
+            run['mse'].append(mse)
+            run['seconds'] += seconds
+            run['peak_mb'] = max(run['peak_mb'], peak)
+
+        best = max(np.mean(r['r2']) for r in alive)
+        for run in alive:
+            if np.mean(run['r2']) < best - stop_margin:
+                run['stopped'] = True
+        print(f" Fold {fold}/{len(splits)}: {sum(not r['stopped'] for r in runs)} configs still running")
+
+    report = pd.DataFrame([
+        {
+            **run['params'],
+            'mean_r2': np.mean(run['r2']),
+            'std_r2': np.std(run['r2']),
+            'mean_mse': np.mean(run['mse']),
+            'folds': len(run['r2']),
+            'fit_seconds': run['seconds'],
+            'peak_mb': run['peak_mb'],
+            'stopped_early': run['stopped'],
+        }
+        for run in runs
+    ])
+    # Configs that saw every fold rank ahead of early-stopped ones
+    return report.sort_values(['folds', 'mean_r2'], ascending=False).reset_index(drop=True)
+
+
+def best_params(report, grid=PARAM_GRID):
+    """Hyperparameters of the top row of a ``search`` report."""
+    row = report.iloc[0]
+    params = {}
+    for key in grid:
+        value = row[key]
+        if pd.isna(value):
+            value = None
+        elif key in ('n_estimators', 'max_depth'):
+            value = int(value)
+        params[key] = value
+    return params
+
+
+def train_final(df, params, features=FEATURE_COLS, target=TARGET_COL, seed=42):
+    """Fit the production model on all rows, using every core."""
+    model = make_model(params, seed)
+    model.fit(df[features], df[target])
+    return model
+
+
+# ==================== INCREMENTAL REFRESH ====================
+def grow_forest(model, df_new, n_new_trees=20, max_trees=None,
+                features=FEATURE_COLS, target=TARGET_COL):
+    """Add ``n_new_trees`` trees fitted on ``df_new`` only.
+
+    Existing trees are kept as they are (``warm_start``), so the cost is
+    proportional to the new data. With ``max_trees`` the oldest trees are
+    retired to keep the ensemble at that size.
+    """
+    n_old = len(model.estimators_)
+    model.set_params(warm_start=True, n_estimators=n_old + n_new_trees, oob_score=False)
+    model.fit(df_new[features], df_new[target])
+    model.set_params(warm_start=False)
+
+    if max_trees is not None and len(model.estimators_) > max_trees:
+        model.estimators_ = model.estimators_[-max_trees:]
+        model.set_params(n_estimators=max_trees)
+    return model
+
+
+def refresh_model(model_path, df_new, n_new_trees=20, max_trees=None, out_path=None,
+                  features=FEATURE_COLS, registry=None):
+    """Load a saved forest, grow it on ``df_new`` and save the new version.
+
+    ``CSI_ref`` for the new rows is computed with the normalization stats
+    saved next to the model, so the target stays on the training scale. The
+    compiled flat forest (``.npz``) is rewritten alongside the pickle, and
+    the normalization stats and feature schema are carried over. With a
+    ``registry`` (``registry.ModelRegistry``) the refreshed model is also
+    published there with that schema and those stats, so running
+    dashboards and the scoring service pick it up.
+    """
+    out_path = out_path or model_path
+    model = joblib.load(model_path)
+    normalizer = CSINormalizer.load(stats_path(model_path))
+    schema = (FeatureSchema.load(schema_path(model_path))
+              if os.path.exists(schema_path(model_path)) else FeatureSchema.default())
+
+    df_new = df_new.dropna(subset=list(features))
+    if TARGET_COL not in df_new:
+        df_new = df_new.assign(**{TARGET_COL: normalizer.transform(df_new)})
+
+    start = time.perf_counter()
+    grow_forest(model, df_new, n_new_trees, max_trees, features)
+    print(f" Grew {n_new_trees} trees on {len(df_new)} new rows in "
+          f"{time.perf_counter() - start:.1f}s ({len(model.estimators_)} trees total)")
+
+    tmp = f"{out_path}.tmp"
+    joblib.dump(model, tmp)
+    os.replace(tmp, out_path)
+    flat = compile_forest(model)
+    flat.save(f"{os.path.splitext(out_path)[0]}.npz")
+    if out_path != model_path:
+        shutil.copyfile(stats_path(model_path), stats_path(out_path))
+        if os.path.exists(schema_path(model_path)):
+            shutil.copyfile(schema_path(model_path), schema_path(out_path))
+
+    if registry is not None:
+        version = registry.publish(
+            flat,
+            feature_schema=schema,
+            csi_stats=normalizer.to_dict(),
+            extra={'refresh': {'n_new_trees': n_new_trees, 'new_rows': len(df_new)}},
+        )
+        print(f" Published refreshed model as {version}")
+    return model
@@ -0,0 +1,257 @@
+"""Parcel -> ward spatial join and ward-level aggregation of predictions.
+
+Ward boundaries are loaded from GeoJSON into a ``WardIndex``: a uniform
+grid over the wards' extent where every cell either lies wholly inside one
+ward (or outside all of them) or is crossed by a ward boundary. Points in
+the first kind of cell are assigned by a single lookup; only points in
+boundary cells go through an (even-odd, vectorized) point-in-polygon test
+against the few wards touching that cell. Parcels are joined by centroid,
+the mapping is cached on disk keyed by the boundaries and coordinates, and
+ward statistics are plain ``bincount`` reductions over the ward codes.
+"""
+
+import hashlib
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from tiering import INSURANCE_TIERS, MISSING_CODE
+
+GRID_CELLS = 64
+# Points x edges processed per point-in-polygon block
+PIP_BLOCK = 4_000_000
+
+PARCEL_WARDS_FILE = 'parcel_wards.csv'
+
+
+def _polygon_rings(geometry):
+    """Closed (N x 2) rings of a GeoJSON Polygon / MultiPolygon."""
+    if geometry['type'] == 'Polygon':
+        polygons = [geometry['coordinates']]
+    elif geometry['type'] == 'MultiPolygon':
+        polygons = geometry['coordinates']
+    else:
+        raise ValueError(f"Unsupported ward geometry: {geometry['type']}")
+    rings = []
+    for polygon in polygons:
+        for ring in polygon:
+            ring = np.asarray(ring, dtype=np.float64)[:, :2]
+            if not np.array_equal(ring[0], ring[-1]):
+                ring = np.vstack([ring, ring[:1]])
+            rings.append(ring)
+    return rings
+
+
+def points_in_polygon(points, edges):
+    """Even-odd test of (N x 2) ``points`` against (E x 4) ``edges``.
+
+    Holes and multi-part wards need no special handling: every ring's edges
+    are in ``edges`` and crossings are counted modulo 2.
+    """
+    points = np.asarray(points, dtype=np.float64)
+    inside = np.zeros(len(points), dtype=bool)
+    if len(points) == 0 or len(edges) == 0:
+        return inside
+    x0, y0, x1, y1 = (edges[:, i] for i in range(4))
+    step = max(1, PIP_BLOCK // len(edges))
+    for start in range(0, len(points), step):
+        px = points[start:start + step, 0:1]
+        py = points[start:start + step, 1:2]
+        spans = (y0 > py) != (y1 > py)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            x_cross = x0 + (py - y0) * (x1 - x0) / (y1 - y0)
+        crossings = np.count_nonzero(spans & (px < x_cross), axis=1)
+        inside[start:start + step] = crossings % 2 == 1
+    return inside
+
+
+class WardIndex:
+    """Uniform grid over ward polygons for bulk point -> ward lookups."""
+
+    def __init__(self, names, edges, grid_cells=GRID_CELLS):
+        self.names = list(names)
+        self.edges = [np.asarray(e, dtype=np.float64) for e in edges]
+        all_edges = np.vstack(self.edges)
+        self.lows = np.array([all_edges[:, [0, 2]].min(), all_edges[:, [1, 3]].min()])
+        self.highs = np.array([all_edges[:, [0, 2]].max(), all_edges[:, [1, 3]].max()])
+        self.grid_cells = grid_cells
+        self.cell_size = (self.highs - self.lows) / grid_cells
+        self._build_grid()
+
+    @classmethod
+    def from_features(cls, features, name_field='Ward', grid_cells=GRID_CELLS):
+        names, edges = [], []
+        for feature in features:
+            rings = _polygon_rings(feature['geometry'])
+            names.append(feature['properties'][name_field])
+            edges.append(np.vstack([np.hstack([r[:-1], r[1:]]) for r in rings]))
+        return cls(names, edges, grid_cells)
+
+    @classmethod
+    def from_geojson(cls, path, name_field='Ward', grid_cells=GRID_CELLS):
+        with open(path) as f:
+            collection = json.load(f)
+        return cls.from_features(collection['features'], name_field, grid_cells)
+
+    @property
+    def n_wards(self):
+        return len(self.names)
+
+    def fingerprint(self):
+        digest = hashlib.sha1(str(self.grid_cells).encode())
+        for name, edges in zip(self.names, self.edges):
+            digest.update(name.encode())
+            digest.update(edges.tobytes())
+        return digest.hexdigest()
+
+    # ==================== GRID ====================
+    def _cell_coords(self, xy):
+        cell = np.floor((xy - self.lows) / self.cell_size).astype(np.int64)
+        return np.clip(cell, 0, self.grid_cells - 1)
+
+    def _build_grid(self):
+        n = self.grid_cells
+        # boundary[w, cell]: ward w has an edge whose bbox touches the cell
+        boundary = np.zeros((self.n_wards, n * n), dtype=bool)
+        for w, edges in enumerate(self.edges):
+            lo = self._cell_coords(np.minimum(edges[:, :2], edges[:, 2:]))
+            hi = self._cell_coords(np.maximum(edges[:, :2], edges[:, 2:]))
+            span = hi - lo + 1
+            counts = span[:, 0] * span[:, 1]
+            # Expand every edge into the cells of its bounding box
+            owner = np.repeat(np.arange(len(edges)), counts)
+            offset = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+            ix = lo[owner, 0] + offset % span[owner, 0]
+            iy = lo[owner, 1] + offset // span[owner, 0]
+            boundary[w, iy * n + ix] = True
+
+        # Cells no boundary crosses are wholly inside one ward (or none):
+        # classify them by their centre point
+        self.is_boundary = boundary.any(axis=0)
+        self.candidates = boundary
+        iy, ix = np.divmod(np.arange(n * n), n)
+        centres = self.lows + (np.column_stack([ix, iy]) + 0.5) * self.cell_size
+        self.cell_ward = np.full(n * n, -1, dtype=np.int32)
+        clear = np.flatnonzero(~self.is_boundary)
+        for w, edges in enumerate(self.edges):
+            self.cell_ward[clear[points_in_polygon(centres[clear], edges)]] = w
+
+    # ==================== LOOKUP ====================
+    def assign(self, xy):
+        """Ward code per (lon, lat) row; -1 outside every ward."""
+        xy = np.asarray(xy, dtype=np.float64).reshape(-1, 2)
+        n = self.grid_cells
+        cell_xy = self._cell_coords(xy)
+        cells = cell_xy[:, 1] * n + cell_xy[:, 0]
+        outside = ((xy < self.lows) | (xy > self.highs)).any(axis=1)
+
+        codes = self.cell_ward[cells].copy()
+        codes[outside] = -1
+        pending = np.flatnonzero(self.is_boundary[cells] & ~outside)
+        for w, edges in enumerate(self.edges):
+            test = pending[self.candidates[w, cells[pending]]]
+            hit = test[points_in_polygon(xy[test], edges)]
+            codes[hit] = w
+            pending = np.setdiff1d(pending, hit, assume_unique=True)
+        return codes
+
+    def ward_names(self, codes):
+        """Ward names for ``assign`` codes (None outside every ward)."""
+        names = np.array(self.names + [None], dtype=object)
+        return names[np.asarray(codes)]
+
+
+def polygon_centroids(rings):
+    """Area-weighted centroids of single-ring parcel polygons."""
+    out = np.empty((len(rings), 2))
+    for i, ring in enumerate(rings):
+        ring = np.asarray(ring, dtype=np.float64)[:, :2]
+        x, y = ring[:, 0], ring[:, 1]
+        cross = x[:-1] * y[1:] - x[1:] * y[:-1]
+        area = cross.sum() / 2
+        if area == 0:
+            out[i] = ring.mean(axis=0)
+        else:
+            out[i, 0] = ((x[:-1] + x[1:]) * cross).sum() / (6 * area)
+            out[i, 1] = ((y[:-1] + y[1:]) * cross).sum() / (6 * area)
+    return out
+
+
+def parcel_wards(index, object_ids, xy, cache_dir=None):
+    """OBJECTID -> Ward table for parcel centroids ``xy``, cached on disk.
+
+    The cache (``parcel_wards.csv`` + ``.key``) is reused while the ward
+    boundaries and parcel coordinates are unchanged.
+    """
+    object_ids = np.asarray(object_ids)
+    xy = np.ascontiguousarray(xy, dtype=np.float64)
+    key = hashlib.sha1(index.fingerprint().encode() + object_ids.tobytes() + xy.tobytes()).hexdigest()
+
+    if cache_dir is not None:
+        path = os.path.join(cache_dir, PARCEL_WARDS_FILE)
+        try:
+            with open(f"{path}.key") as f:
+                if f.read().strip() == key:
+                    return pd.read_csv(path)
+        except FileNotFoundError:
+            pass
+
+    table = pd.DataFrame({'OBJECTID': object_ids, 'Ward': index.ward_names(index.assign(xy))})
+
+    if cache_dir is not None:
+        os.makedirs(cache_dir, exist_ok=True)
+        table.to_csv(path, index=False)
+        with open(f"{path}.key", 'w') as f:
+            f.write(key)
+    return table
+
+
+def aggregate_by_ward(scored, ward_table, exposure=None, value_col='Predicted_CSI',
+                      tiers=INSURANCE_TIERS):
+    """Ward-level stress, exposure-weighted risk and tier mix.
+
+    ``scored`` has one row per parcel (or parcel x date) with OBJECTID and
+    ``value_col``; ``exposure`` optionally maps OBJECTID -> insured
+    exposure (e.g. hectares), defaulting to 1 per row.
+    """
+    wards = pd.Categorical(scored['OBJECTID'].map(ward_table.set_index('OBJECTID')['Ward']))
+    codes = wards.codes
+    keep = codes >= 0
+    codes = codes[keep]
+    n = len(wards.categories)
+
+    stress = scored[value_col].to_numpy(dtype=np.float64)[keep]
+    if exposure is None:
+        weight = np.ones(len(codes))
+    else:
+        weight = scored['OBJECTID'].map(exposure).fillna(0).to_numpy(dtype=np.float64)[keep]
+
+    rows = np.bincount(codes, minlength=n)
+    total_exposure = np.bincount(codes, weights=weight, minlength=n)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        weighted = np.bincount(codes, weights=stress * weight, minlength=n) / total_exposure
+    peak = np.full(n, -np.inf)
+    np.fmax.at(peak, codes, stress)
+
+    out = pd.DataFrame({
+        'Ward': wards.categories,
+        'Rows': rows,
+        'Mean Stress': np.bincount(codes, weights=stress, minlength=n) / np.maximum(rows, 1),
+        'Max Stress': peak,
+        'Exposure': total_exposure,
+        'Exposure-weighted Stress': weighted,
+    })
+    # No insured exposure means a NaN weighted stress and no Risk Level
+    out['Risk Level'] = tiers.classify(weighted)
+
+    # Share of exposure in each tier
+    tier_codes = tiers.codes(stress)
+    scored_rows = tier_codes != MISSING_CODE
+    share = np.zeros((n, len(tiers.labels)))
+    np.add.at(share, (codes[scored_rows], tier_codes[scored_rows]), weight[scored_rows])
+    share /= np.maximum(total_exposure, 1e-12)[:, None]
+    for j, label in enumerate(tiers.labels):
+        out[f"{label} share"] = share[:, j]
+    return out
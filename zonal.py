@@ -0,0 +1,238 @@
+"""Offline per-parcel zonal statistics on local raster stacks.
+
+Equivalent of ``compute_stats`` in ``mkulima.py`` (mean / median / stdDev
+per parcel per image) without Earth Engine. Parcel polygons are rasterized
+once per grid into a ``ParcelPixelIndex`` that is reused for every date on
+that grid (parcels smaller than a pixel take the pixel under their
+centroid), and each image is reduced for all parcels in one vectorized pass,
+so the cost scales with the number of pixels rather than parcels x images.
+"""
+
+import numpy as np
+import pandas as pd
+
+from wards import polygon_centroids
+
+try:
+    import rasterio
+    from rasterio import features as rio_features
+except ImportError:  # optional dependency, only needed for GeoTIFFs/polygons
+    rasterio = None
+    rio_features = None
+
+# Native scale (m) of each collection, as used by compute_stats()
+GRID_SCALES = {
+    'NDVI': 30,
+    'EVI': 30,
+    'SAVI': 30,
+    'LST': 1000,
+    'RAINFALL': 5000,
+    'SM': 10000,
+}
+
+
+def pixel_under(points, transform, shape):
+    """Flat index of the pixel containing each (x, y) point, -1 off the grid.
+
+    ``transform`` is the grid's affine transform (``rasterio``/``affine``
+    order: ``x = a*col + b*row + c``, ``y = d*col + e*row + f``).
+    """
+    points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+    a, b, c, d, e, f = tuple(transform)[:6]
+    det = a * e - b * d
+    x, y = points[:, 0] - c, points[:, 1] - f
+    col = np.floor((e * x - b * y) / det).astype(np.int64)
+    row = np.floor((a * y - d * x) / det).astype(np.int64)
+    inside = (col >= 0) & (col < shape[1]) & (row >= 0) & (row < shape[0])
+    return np.where(inside, row * shape[1] + col, -1)
+
+
+def geometry_centroids(geometries):
+    """(N x 2) centroids of GeoJSON-like Polygon / MultiPolygon parcels.
+
+    Uses the exterior ring (of the largest part, for multi-part parcels).
+    """
+    rings = []
+    for geom in geometries:
+        geom = getattr(geom, '__geo_interface__', geom)
+        if geom['type'] == 'Polygon':
+            parts = [geom['coordinates']]
+        elif geom['type'] == 'MultiPolygon':
+            parts = geom['coordinates']
+        else:
+            raise ValueError(f"Unsupported parcel geometry: {geom['type']}")
+        exteriors = [np.asarray(part[0], dtype=np.float64)[:, :2] for part in parts]
+        rings.append(max(exteriors, key=_ring_area))
+    return polygon_centroids(rings)
+
+
+def _ring_area(ring):
+    x, y = ring[:, 0], ring[:, 1]
+    return abs(np.dot(x, np.roll(y, -1)) - np.dot(y, np.roll(x, -1))) / 2
+
+
+def _require_rasterio():
+    if rasterio is None:
+        raise ImportError("Reading rasters / rasterizing parcels needs rasterio: pip install rasterio")
+
+
+class ParcelPixelIndex:
+    """Pixels of a grid grouped by parcel.
+
+    ``order`` holds flat pixel positions sorted by parcel, and parcel ``i``
+    (OBJECTID ``object_ids[i]``) owns the positions where ``group == i``.
+    On coarse grids several parcels can own the same pixel.
+    """
+
+    def __init__(self, order, group, object_ids, shape):
+        self.order = order
+        self.group = group
+        self.object_ids = object_ids
+        self.shape = tuple(shape)
+
+    @classmethod
+    def from_pairs(cls, pixels, parcels, object_ids, shape):
+        """Build from (flat pixel, parcel position) pairs."""
+        pixels = np.asarray(pixels, dtype=np.int64)
+        parcels = np.asarray(parcels, dtype=np.int64)
+        srt = np.argsort(parcels, kind='stable')
+        return cls(pixels[srt], parcels[srt].astype(np.int32), np.asarray(object_ids), shape)
+
+    @classmethod
+    def from_labels(cls, labels, object_ids=None, points=None, transform=None):
+        """Build from a label raster where 0 means "no parcel".
+
+        Label ``k`` is parcel ``object_ids[k - 1]``. With ``points`` (one
+        (x, y) per parcel, e.g. its centroid) and the grid ``transform``,
+        parcels that cover no pixel centre get the pixel under their point,
+        shared with any other parcel there: on the 1-10 km grids most
+        parcels are smaller than a pixel, and this matches what
+        ``reduceRegions`` returns for them.
+        """
+        labels = np.asarray(labels)
+        flat = labels.ravel()
+        pixels = np.flatnonzero(flat)
+        if object_ids is None:
+            ids, parcels = np.unique(flat[pixels], return_inverse=True)
+            return cls.from_pairs(pixels, parcels, ids, labels.shape)
+
+        parcels = flat[pixels].astype(np.int64) - 1
+        if points is not None:
+            missing = np.setdiff1d(np.arange(len(object_ids)), parcels)
+            under = pixel_under(np.asarray(points, dtype=np.float64)[missing], transform, labels.shape)
+            found = under >= 0
+            pixels = np.concatenate([pixels, under[found]])
+            parcels = np.concatenate([parcels, missing[found]])
+        return cls.from_pairs(pixels, parcels, object_ids, labels.shape)
+
+    @classmethod
+    def from_points(cls, points, object_ids, transform, shape):
+        """One pixel per parcel: the pixel under its point (e.g. centroid)."""
+        under = pixel_under(points, transform, shape)
+        found = np.flatnonzero(under >= 0)
+        return cls.from_pairs(under[found], found, object_ids, shape)
+
+    @classmethod
+    def from_polygons(cls, geometries, object_ids, transform, shape, all_touched=False):
+        """Rasterize parcel polygons onto a grid given by an affine ``transform``.
+
+        Parcels containing no pixel centre fall back to the pixel under their
+        centroid (see ``from_labels``), so every parcel on the grid gets stats.
+        """
+        _require_rasterio()
+        geometries = list(geometries)
+        labels = rio_features.rasterize(
+            ((geom, i + 1) for i, geom in enumerate(geometries)),
+            out_shape=shape,
+            transform=transform,
+            fill=0,
+            all_touched=all_touched,
+            dtype='int32',
+        )
+        return cls.from_labels(labels, object_ids, geometry_centroids(geometries), transform)
+
+    @property
+    def n_parcels(self):
+        return len(self.object_ids)
+
+    def save(self, path):
+        np.savez(path, order=self.order, group=self.group,
+                 object_ids=self.object_ids, shape=np.array(self.shape))
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            return cls(data['order'], data['group'], data['object_ids'], data['shape'])
+
+
+def zonal_stats(image, index):
+    """Mean, median and population std of ``image`` for every parcel.
+
+    NaN pixels are ignored; parcels with no valid pixels get NaN.
+    Returns a DataFrame with OBJECTID, mean, median, stdDev.
+    """
+    image = np.asarray(image)
+    if image.shape != index.shape:
+        raise ValueError(f"Image shape {image.shape} does not match index grid {index.shape}")
+
+    return parcel_stats(image.ravel()[index.order], index)
+
+
+def parcel_stats(values, index):
+    """``zonal_stats`` from values already gathered at ``index.order``.
+
+    Lets callers that produce an image strip by strip keep only the parcel
+    pixels instead of a full grid.
+    """
+    # Accumulate in float64 whatever the input dtype
+    values = np.asarray(values).astype(np.float64)
+    valid = ~np.isnan(values)
+    values, group = values[valid], index.group[valid]
+    n = index.n_parcels
+
+    count = np.bincount(group, minlength=n)
+    total = np.bincount(group, weights=values, minlength=n)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean = total / count
+        sq = np.bincount(group, weights=(values - mean[group]) ** 2, minlength=n)
+        std = np.sqrt(sq / count)
+
+    # Median: one sort by (parcel, value), then pick the middle of each run
+    srt = values[np.lexsort((values, group))]
+    starts = np.concatenate([[0], np.cumsum(count)[:-1]])
+    has = count > 0
+    lo = starts + (count - 1) // 2
+    hi = starts + count // 2
+    median = np.full(n, np.nan)
+    median[has] = (srt[lo[has]] + srt[hi[has]]) / 2
+
+    return pd.DataFrame({
+        'OBJECTID': index.object_ids,
+        'mean': mean,
+        'median': median,
+        'stdDev': std,
+    })
+
+
+def zonal_stats_stack(images, dates, index):
+    """Zonal statistics for a stack of same-grid images (one per date).
+
+    ``images`` is a (T, H, W) array or any iterable of (H, W) arrays. The
+    result has the same columns as the Earth Engine CSV exports.
+    """
+    frames = []
+    for image, day in zip(images, dates):
+        stats = zonal_stats(image, index)
+        stats.insert(1, 'date', pd.Timestamp(day))
+        frames.append(stats)
+    return pd.concat(frames, ignore_index=True)
+
+
+def read_raster(path, band=1):
+    """Read one band of a GeoTIFF as float64 (nodata -> NaN) plus its transform."""
+    _require_rasterio()
+    with rasterio.open(path) as src:
+        image = src.read(band).astype(np.float64)
+        if src.nodata is not None:
+            image[image == src.nodata] = np.nan
+        return image, src.transform